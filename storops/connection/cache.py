@@ -0,0 +1,228 @@
+# coding=utf-8
+# Copyright (c) 2015 EMC Corporation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+from __future__ import unicode_literals
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+
+def get_response_size(result):
+    """ estimate the size in bytes of a cached `(resp, body)` result.
+
+    :param result: tuple returned by `HTTPClient.request`
+    :return: size of the raw response payload
+    """
+    resp = result[0] if isinstance(result, (tuple, list)) else result
+    content = getattr(resp, 'content', None)
+    if content is None:
+        # raw content might be released after parsing
+        headers = getattr(resp, 'headers', None) or {}
+        content_length = headers.get('Content-Length')
+        if content_length is not None and content_length.isdigit():
+            return int(content_length)
+    if not isinstance(content, bytes):
+        content = getattr(resp, 'text', None)
+    try:
+        ret = len(content) if content is not None else 0
+    except TypeError:
+        ret = 0
+    return ret
+
+
+class _CacheEntry(object):
+    __slots__ = ('value', 'expire_at', 'size')
+
+    def __init__(self, value, expire_at, size):
+        self.value = value
+        self.expire_at = expire_at
+        self.size = size
+
+
+class ResponseCache(object):
+    """ thread-safe LRU cache with per-entry TTL and size budget.
+
+    Entries are evicted when they expire, when the entry count exceeds
+    `max_entries` or when the total size exceeds `max_bytes`.  The least
+    recently used entries are evicted first.
+    """
+
+    def __init__(self, ttl=60, max_entries=1024, max_bytes=None,
+                 negative_ttl=0, sizer=None):
+        """ create a response cache.
+
+        :param ttl: seconds a cached response is valid.
+        :param max_entries: maximum number of cached responses.
+        :param max_bytes: maximum total size of cached responses.  `None`
+            means no byte budget.
+        :param negative_ttl: seconds a 404 response is cached.  0 disables
+            negative caching.
+        :param sizer: function returning the size of a cached value.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.negative_ttl = negative_ttl
+        if sizer is None:
+            sizer = get_response_size
+        self._sizer = sizer
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _now():
+        return time.time()
+
+    def get(self, key):
+        """ return the cached value or `None` on miss. """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expire_at <= self._now():
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                ret = None
+            else:
+                # move the entry to the most recently used end
+                del self._entries[key]
+                self._entries[key] = entry
+                self.hits += 1
+                ret = entry.value
+        return ret
+
+    def put(self, key, value, ttl=None):
+        """ cache a value.
+
+        :param key: key of the value, normally the url.
+        :param value: value to cache.
+        :param ttl: override the default ttl of the cache.
+        :return: True if the value is cached.
+        """
+        if ttl is None:
+            ttl = self.ttl
+        if ttl <= 0:
+            return False
+
+        size = self._sizer(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            log.debug('response of {} is too large to cache.'.format(key))
+            return False
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _CacheEntry(value, self._now() + ttl, size)
+            self._bytes += size
+            self._shrink()
+        return True
+
+    def put_response(self, key, result):
+        """ cache a `(resp, body)` result according to its status code. """
+        status = getattr(result[0], 'status_code', None)
+        if status == 404:
+            ret = self.put(key, result, ttl=self.negative_ttl)
+        elif status is None or status < 400:
+            ret = self.put(key, result)
+        else:
+            ret = False
+        return ret
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _is_over_budget(self):
+        if len(self._entries) > self.max_entries:
+            ret = True
+        elif self.max_bytes is not None and self._bytes > self.max_bytes:
+            ret = True
+        else:
+            ret = False
+        return ret
+
+    def _shrink(self):
+        if not self._is_over_budget():
+            return
+
+        # drop the expired entries before evicting the valid ones
+        now = self._now()
+        expired = [k for k, v in self._entries.items() if v.expire_at <= now]
+        for key in expired:
+            self._remove(key)
+            self.evictions += 1
+
+        while self._entries and self._is_over_budget():
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    @property
+    def size_in_bytes(self):
+        return self._bytes
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry.expire_at > self._now()
+
+    def get_stats(self):
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'entries': len(self._entries),
+                    'bytes': self._bytes}
+
+    def __getstate__(self):
+        # cached responses and the lock are not pickled
+        state = self.__dict__.copy()
+        state['_entries'] = OrderedDict()
+        state['_bytes'] = 0
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
@@ -19,30 +19,60 @@ from __future__ import unicode_literals
 import copy
 import json
 import logging
+import threading
 import time
 
 import requests
 import six
-from requests.exceptions import RequestException
+from requests.exceptions import RequestException, Timeout
 from retryz import retry
 
 from storops.connection import exceptions
+from storops.connection.cache import ResponseCache, get_response_size
+from storops.connection.codec import get_json_codec
+from storops.lib.circuit_breaker import CircuitBreaker, full_jitter
+from storops.lib.common import SingleFlight
+from storops.lib.telemetry import Telemetry, get_url_template
 
 log = logging.getLogger(__name__)
 
+# number of tries of the request running in the current thread
+_tries = threading.local()
+
 
 def _on_error_callback(e):
     return isinstance(e, RequestException)
 
 
+def _is_overloaded(result, error):
+    if error is not None:
+        ret = isinstance(error, Timeout)
+    else:
+        ret = getattr(result[0], 'status_code', None) in (429, 503)
+    return ret
+
+
+def _copy_response(result):
+    # each caller joining the request gets its own body
+    resp, body = result
+    return resp, copy.deepcopy(body)
+
+
 def _wait_callback(tried):
     return 2 ** (tried - 1)
 
 
+def _jitter_wait_callback(tried):
+    # randomize the wait so that clients don't retry in lock-step
+    return full_jitter(tried, cap=_wait_callback(tried))
+
+
 class HTTPClient(object):
     def __init__(self, base_url, headers, insecure=False, auth=None,
                  timeout=None, retries=None, ca_cert_path=None,
-                 cache_interval=0):
+                 cache_interval=0, cache=None, json_codec=None,
+                 release_content=False, single_flight=False,
+                 circuit_breaker=None, limiter=None):
         self.base_url = base_url
         if retries is None:
             retries = 2
@@ -52,7 +82,32 @@ class HTTPClient(object):
         self.headers = headers
         self.session = requests.session()
         self.cache_interval = cache_interval
-        self.cache_dict = {}
+        if cache is None and cache_interval > 0:
+            cache = ResponseCache(ttl=cache_interval)
+        self.cache = cache
+        self.json_codec = get_json_codec(json_codec)
+        # drop the raw response payload once it's parsed
+        self.release_content = release_content
+        # concurrent GET of the same url share one request
+        if single_flight:
+            self.single_flight = SingleFlight(copy_result=_copy_response)
+        else:
+            self.single_flight = None
+        # number of the finished writes.  a GET does not join the request
+        # started before the last write.
+        self._write_count = 0
+        # fail fast when the array is unreachable, opt-in as it raises
+        # `CircuitBreakerOpenError` instead of the connection errors
+        if circuit_breaker is True:
+            # only connection failures count, http errors mean it's alive
+            circuit_breaker = CircuitBreaker(
+                base_url, error_filter=_on_error_callback)
+        elif circuit_breaker is False:
+            circuit_breaker = None
+        self.circuit_breaker = circuit_breaker
+        self.telemetry = Telemetry()
+        # `ArrayLimiter` shared by the clients of the same array
+        self.limiter = limiter
 
     def __del__(self):
         self.session.close()
@@ -76,13 +131,14 @@ class HTTPClient(object):
         return options
 
     def request(self, full_url, method, **kwargs):
-        headers = copy.deepcopy(self.headers)
+        # shallow copies are enough, values are never modified in place
+        headers = dict(self.headers)
         headers.update(kwargs.get('headers', {}))
-        options = copy.deepcopy(self.request_options)
+        options = dict(self.request_options)
         content_type = headers.get('Content-Type', None)
         if kwargs.get('body', None):
             if content_type == 'application/json':
-                options['data'] = json.dumps(kwargs['body'])
+                options['data'] = self.json_codec.dumps(kwargs['body'])
             else:
                 options['data'] = kwargs['body']
         files = kwargs.get('files', None)
@@ -94,66 +150,161 @@ class HTTPClient(object):
                 files_opener[name] = open(path, 'rb')
         self.log_request(full_url, method, options.get('data', None))
         start = time.time()
-        resp = self.session.request(method, full_url, headers=headers,
-                                    files=files_opener, **options)
+        try:
+            resp = self.session.request(method, full_url, headers=headers,
+                                        files=files_opener, **options)
+        except Exception as e:
+            self.telemetry.record(self.get_endpoint(full_url, method),
+                                  time.time() - start, error=e)
+            raise
+        self.telemetry.record(self.get_endpoint(full_url, method),
+                              time.time() - start,
+                              size=get_response_size(resp),
+                              error=self._get_status_error(resp))
 
         self.log_response(full_url, method, resp, start)
 
+        if resp.status_code == 401:
+            raise exceptions.from_response(resp, method, full_url)
+
         body = None
-        if resp.text:
-            try:
-                if content_type == 'application/json':
-                    body = json.loads(resp.text)
+        raw = self._get_raw_content(resp)
+        if raw:
+            if content_type == 'application/json':
+                try:
+                    body = self.json_codec.loads(raw)
+                except ValueError:
+                    pass
                 else:
-                    body = resp.text
+                    if self.release_content:
+                        self._release_content(resp)
+            else:
+                body = resp.text
 
-            except ValueError:
-                pass
+        return resp, body
 
-        if resp.status_code == 401:
-            raise exceptions.from_response(resp, method, full_url)
+    @staticmethod
+    def get_endpoint(url, method):
+        return '{} {}'.format(method, get_url_template(url))
 
-        return resp, body
+    @staticmethod
+    def _get_status_error(resp):
+        status = getattr(resp, 'status_code', None)
+        if status is not None and status >= 400:
+            ret = exceptions.get_error_class(status)
+        else:
+            ret = None
+        return ret
+
+    @staticmethod
+    def _get_raw_content(resp):
+        # decode from bytes directly, `resp.text` detects the encoding
+        # and decodes the whole payload to text first.
+        ret = getattr(resp, 'content', None)
+        if not isinstance(ret, six.binary_type):
+            ret = resp.text
+        return ret
+
+    @staticmethod
+    def _release_content(resp):
+        if hasattr(resp, '_content'):
+            resp._content = None
 
     def _cs_request(self, url, method, **kwargs):
-        return self._cs_request_with_retries(
-            self.base_url + url,
-            method,
-            **kwargs)
+        _tries.count = 0
+        try:
+            if self.circuit_breaker is None:
+                ret = self._cs_request_with_retries(
+                    self.base_url + url,
+                    method,
+                    **kwargs)
+            else:
+                ret = self.circuit_breaker.call(
+                    self._cs_request_with_retries,
+                    self.base_url + url,
+                    method,
+                    **kwargs)
+        finally:
+            self.telemetry.record_retry(
+                self.get_endpoint(url, method), _tries.count - 1)
+        return ret
 
     def _get_limit(self):
         return self.retries
 
-    @retry(wait=_wait_callback, limit=_get_limit,
+    @retry(wait=_jitter_wait_callback, limit=_get_limit,
            on_error=_on_error_callback)
     def _cs_request_with_retries(self, url, method, **kwargs):
-        return self.request(url, method, **kwargs)
+        _tries.count += 1
+        if self.limiter is None:
+            ret = self.request(url, method, **kwargs)
+        else:
+            ret = self.limiter.call(_is_overloaded, self.request, url, method,
+                                    **kwargs)
+        return ret
 
     def get(self, url, **kwargs):
-        if self.cache_interval <= 0:
-            result = self._cs_request(url, 'GET', **kwargs)
+        if self.cache is None:
+            result = self._get(url, **kwargs)
         else:
-            current = time.time()
-            if url in self.cache_dict.keys() and (
-                    current - self.cache_dict.get(url)[
-                    0] < self.cache_interval):
-                result = self.cache_dict[url][1]
+            result = self.cache.get(url)
+            if result is not None:
                 log.debug('Read response from cache, URL: {}'.format(url))
             else:
-                result = self._cs_request(url, 'GET', **kwargs)
-                current = time.time()
-                log.debug('Write response to cache, URL: {}'.format(url))
-                self.cache_dict[url] = (current, result)
+                result = self._get(url, **kwargs)
+                if self.cache.put_response(url, result):
+                    log.debug('Write response to cache, URL: {}'.format(url))
         return result
 
+    def _get(self, url, **kwargs):
+        if self.single_flight is None or kwargs:
+            ret = self._cs_request(url, 'GET', **kwargs)
+        else:
+            key = (self.normalize_url(url), self._write_count)
+            ret = self.single_flight.do(key, self._cs_request, url, 'GET')
+        return ret
+
+    @staticmethod
+    def normalize_url(url):
+        parts = url.split('?', 1)
+        if len(parts) == 2:
+            params = sorted(p for p in parts[1].split('&') if p)
+            url = '{}?{}'.format(parts[0], '&'.join(params))
+        return url
+
+    def get_cache_stats(self):
+        if self.cache is None:
+            ret = {}
+        else:
+            ret = self.cache.get_stats()
+        return ret
+
+    def get_stats(self):
+        """ get the latency, size, retry and error statistics.
+
+        :return: dictionary of statistics keyed by `<method> <url template>`.
+        """
+        return self.telemetry.get_stats()
+
+    def reset_stats(self):
+        self.telemetry.reset()
+        if self.cache is not None:
+            self.cache.reset_stats()
+
+    def _write(self, url, method, **kwargs):
+        try:
+            return self._cs_request(url, method, **kwargs)
+        finally:
+            self._write_count += 1
+
     def post(self, url, **kwargs):
-        return self._cs_request(url, 'POST', **kwargs)
+        return self._write(url, 'POST', **kwargs)
 
     def put(self, url, **kwargs):
-        return self._cs_request(url, 'PUT', **kwargs)
+        return self._write(url, 'PUT', **kwargs)
 
     def delete(self, url, **kwargs):
-        return self._cs_request(url, 'DELETE', **kwargs)
+        return self._write(url, 'DELETE', **kwargs)
 
     @classmethod
     def log_request(cls, url, method, data=None):
@@ -183,7 +334,10 @@ class HTTPClient(object):
             dt = time.time() - start_time
             log.debug('REQ URL: [{}] {}, TIME: {}, RESP CODE: {}'
                       .format(method, full_url, dt, resp.status_code))
-            cls._debug_print_json(resp.text, 'RESP BODY:')
+            raw = cls._get_raw_content(resp)
+            if isinstance(raw, six.binary_type):
+                raw = raw.decode('utf-8', 'replace')
+            cls._debug_print_json(raw, 'RESP BODY:')
 
     def update_headers(self, headers):
         self.headers.update(headers)
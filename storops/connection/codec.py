@@ -0,0 +1,108 @@
+# coding=utf-8
+# Copyright (c) 2015 EMC Corporation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+from __future__ import unicode_literals
+
+import json
+import logging
+
+import six
+
+from storops.lib.common import try_import
+
+orjson = try_import('orjson')
+ujson = try_import('ujson')
+
+log = logging.getLogger(__name__)
+
+
+class JsonCodec(object):
+    """ json codec based on the standard library. """
+    name = 'json'
+
+    def loads(self, data):
+        if isinstance(data, six.binary_type):
+            data = data.decode('utf-8')
+        return json.loads(data)
+
+    def dumps(self, obj):
+        return json.dumps(obj)
+
+    @classmethod
+    def is_available(cls):
+        return True
+
+
+class OrjsonCodec(JsonCodec):
+    """ json codec based on `orjson`, decode from bytes directly. """
+    name = 'orjson'
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+    def dumps(self, obj):
+        return orjson.dumps(obj).decode('utf-8')
+
+    @classmethod
+    def is_available(cls):
+        return orjson is not None
+
+
+class UjsonCodec(JsonCodec):
+    """ json codec based on `ujson`. """
+    name = 'ujson'
+
+    def loads(self, data):
+        return ujson.loads(data)
+
+    def dumps(self, obj):
+        return ujson.dumps(obj)
+
+    @classmethod
+    def is_available(cls):
+        return ujson is not None
+
+
+# codecs in the order of preference
+_codecs = (OrjsonCodec, UjsonCodec, JsonCodec)
+
+
+def get_json_codec(name=None):
+    """ get the json codec.
+
+    :param name: name of the codec, `json`, `orjson` or `ujson`.
+        `auto` means the fastest one available.  `None` means the
+        standard library.  A codec instance is returned as is.
+    :return: the codec instance.
+    """
+    if name is None:
+        ret = JsonCodec()
+    elif not isinstance(name, six.string_types):
+        ret = name
+    elif name == 'auto':
+        ret = next(c() for c in _codecs if c.is_available())
+    else:
+        for clz in _codecs:
+            if clz.name == name:
+                if not clz.is_available():
+                    raise ValueError(
+                        'json codec {} is not installed.'.format(name))
+                ret = clz()
+                break
+        else:
+            raise ValueError('json codec {} is not supported.'.format(name))
+    log.debug('use json codec: {}.'.format(
+        getattr(ret, 'name', type(ret).__name__)))
+    return ret
@@ -16,10 +16,18 @@
 
 from __future__ import unicode_literals
 
+import contextlib
 import functools
+import json
 import logging
+import os
 import pipes
+import re
+import socket
+import threading
+import time
 
+import requests
 import six
 from retryz import retry
 
@@ -27,6 +35,7 @@ from storops.connection import client
 from storops.connection.exceptions import SFtpExecutionError, \
     SSHExecutionError, HTTPClientError
 from storops.lib import common
+from storops.lib.limiter import get_array_limiter
 
 paramiko = common.try_import('paramiko')
 
@@ -36,6 +45,8 @@ LOG = logging.getLogger(__name__)
 def require_csrf_token(func):
     @functools.wraps(func)
     def decorator(self, url, **kwargs):
+        # get the token before the first write instead of after a failure
+        self._ensure_csrf_token()
         wrapped = retry(on_error=self._http_authentication_error,
                         on_retry=self._update_csrf_token)(func)
         return wrapped(self, url, **kwargs)
@@ -43,6 +54,62 @@ def require_csrf_token(func):
     return decorator
 
 
+class UnitySessionCache(object):
+    """ on-disk cache of the session cookie and the csrf token.
+
+    Short-lived processes could reuse the session of the previous one
+    instead of authenticating again.  The file is only readable by the
+    current user.
+    """
+
+    def __init__(self, host, port, user, ttl=3600, folder=None):
+        if folder is None:
+            folder = os.path.join(common.get_local_folder(), 'session')
+        self.folder = folder
+        self.ttl = ttl
+        name = re.sub(r'[^\w.-]', '_', '{}_{}_{}'.format(host, port, user))
+        self.filename = os.path.join(folder, 'unity_{}.json'.format(name))
+
+    @staticmethod
+    def _now():
+        return time.time()
+
+    def load(self):
+        """ return the cached session or `None` if not valid. """
+        ret = None
+        try:
+            with open(self.filename, 'r') as f:
+                data = json.load(f)
+            if data.get('expires_at', 0) > self._now():
+                ret = data
+        except (IOError, OSError, ValueError):
+            pass
+        return ret
+
+    def save(self, cookies, csrf_token):
+        data = {'cookies': cookies,
+                'csrf_token': csrf_token,
+                'expires_at': self._now() + self.ttl}
+        try:
+            common.assure_folder(self.folder)
+            os.chmod(self.folder, 0o700)
+            fd = os.open(self.filename,
+                         os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            # make sure the permission is right if the file already exists
+            os.chmod(self.filename, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+        except (IOError, OSError) as ex:
+            LOG.warning('failed to save the unity session to {}: {}'
+                        .format(self.filename, ex))
+
+    def clear(self):
+        try:
+            os.remove(self.filename)
+        except OSError:
+            pass
+
+
 class UnityRESTConnector(object):
     HEADERS = {
         'Accept': 'application/json',
@@ -53,8 +120,12 @@ class UnityRESTConnector(object):
         'User-agent': 'EMC-OpenStack',
     }
 
+    CSRF_TOKEN = 'emc-csrf-token'
+
     def __init__(self, host, port=443, user='admin', password='',
-                 verify=False, retries=None, cache_interval=0):
+                 verify=False, retries=None, cache_interval=0,
+                 session_cache=False, limiter=None, single_flight=False,
+                 circuit_breaker=None):
         base_url = 'https://{host}:{port}'.format(host=host, port=port)
 
         insecure = False
@@ -63,16 +134,37 @@ class UnityRESTConnector(object):
             insecure = not verify
         else:
             ca_cert_path = verify
+        if limiter is True:
+            limiter = get_array_limiter(host)
+        elif limiter is False:
+            limiter = None
+        # copy the headers, the csrf token is different for each connector
         self.http_client = client.HTTPClient(base_url=base_url,
-                                             headers=self.HEADERS,
+                                             headers=dict(self.HEADERS),
                                              auth=(user, password),
                                              insecure=insecure,
                                              retries=retries,
                                              ca_cert_path=ca_cert_path,
-                                             cache_interval=cache_interval)
+                                             cache_interval=cache_interval,
+                                             limiter=limiter,
+                                             single_flight=single_flight,
+                                             circuit_breaker=circuit_breaker)
+        self._csrf_token = None
+        if session_cache:
+            if isinstance(session_cache, UnitySessionCache):
+                self._session_cache = session_cache
+            else:
+                self._session_cache = UnitySessionCache(host, port, user)
+            self._load_session()
+        else:
+            self._session_cache = None
 
     def get(self, url, **kwargs):
-        return self.http_client.get(url, **kwargs)
+        ret = self.http_client.get(url, **kwargs)
+        if self._csrf_token is None:
+            # the token comes with the response of the authenticated request
+            self._set_csrf_token(ret[0])
+        return ret
 
     @staticmethod
     def _http_authentication_error(err):
@@ -86,11 +178,47 @@ class UnityRESTConnector(object):
     def delete(self, url, **kwargs):
         return self.http_client.delete(url, **kwargs)
 
+    def login(self):
+        """ authenticate and retrieve the csrf token for later writes. """
+        path_user = '/api/types/user/instances?compact=True&fields=id' \
+                    '&per_page=1'
+        # noinspection PyProtectedMember
+        resp, _ = self.http_client._cs_request(path_user, 'GET')
+        self._set_csrf_token(resp)
+        return self._csrf_token
+
     def _update_csrf_token(self):
-        path_user = '/api/types/user/instances'
-        resp, body = self.get(path_user)
-        headers = {'emc-csrf-token': resp.headers['emc-csrf-token']}
-        self.http_client.update_headers(headers)
+        self._csrf_token = None
+        self.login()
+
+    def _ensure_csrf_token(self):
+        if self._csrf_token is None:
+            self.login()
+
+    def _set_csrf_token(self, resp):
+        headers = getattr(resp, 'headers', None)
+        token = headers.get(self.CSRF_TOKEN) if headers else None
+        if token and token != self._csrf_token:
+            self._csrf_token = token
+            self.http_client.update_headers({self.CSRF_TOKEN: token})
+            self._save_session()
+
+    def _load_session(self):
+        data = self._session_cache.load()
+        if data is not None and data.get('csrf_token'):
+            LOG.debug('reuse the unity session in {}.'.format(
+                self._session_cache.filename))
+            self.http_client.session.cookies.update(
+                requests.utils.cookiejar_from_dict(data.get('cookies', {})))
+            self._csrf_token = data['csrf_token']
+            self.http_client.update_headers(
+                {self.CSRF_TOKEN: self._csrf_token})
+
+    def _save_session(self):
+        if self._session_cache is not None:
+            cookies = requests.utils.dict_from_cookiejar(
+                self.http_client.session.cookies)
+            self._session_cache.save(cookies, self._csrf_token)
 
 
 class XMLAPIConnector(object):
@@ -131,10 +259,38 @@ class XMLAPIConnector(object):
 
 
 class SSHConnector(object):
-    """SSH Connection to the specified host."""
-
-    def __init__(self, host, username, password, port=22):
+    """SSH Connection to the specified host.
+
+    One transport is shared by all the commands.  It's kept alive with
+    keepalive packets and reconnected transparently if broken.
+    """
+
+    # seconds to wait when no output is ready
+    POLL_INTERVAL = 0.01
+    RECV_SIZE = 32768
+
+    def __init__(self, host, username, password, port=22, keepalive=30,
+                 max_sessions=4, sftp_pool_size=2, max_output=64 * 1024 ** 2):
+        """ create the ssh connection.
+
+        :param keepalive: seconds between keepalive packets.  0 to disable.
+        :param max_sessions: maximum concurrent command sessions.
+        :param sftp_pool_size: maximum idle sftp clients kept for reuse.
+        :param max_output: maximum bytes buffered for stdout and for
+            stderr of one command.  The exceeded output is drained and
+            discarded.
+        """
         self.transport = None
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.keepalive = keepalive
+        self.sftp_pool_size = sftp_pool_size
+        self.max_output = max_output
+        self._lock = threading.Lock()
+        self._sessions = threading.BoundedSemaphore(max_sessions)
+        self._sftp_pool = []
         self.init_connection(host, password, port, username)
         self.isLive = True
 
@@ -149,18 +305,99 @@ class SSHConnector(object):
                              'Reason:%s.' % six.text_type(ex))
                 LOG.error(error_msg)
                 raise ex
+        if self.keepalive:
+            self.transport.set_keepalive(self.keepalive)
+
+    def _reconnect(self, broken):
+        with self._lock:
+            if self.transport is not broken:
+                # already reconnected by another thread
+                return
+            LOG.info('SSH connection to {} is broken, '
+                     'reconnect.'.format(self.host))
+            self._close_sftp_pool()
+            try:
+                broken.close()
+            except Exception as ex:
+                LOG.debug('failed to close the broken transport: '
+                          '{}'.format(ex))
+            self.init_connection(self.host, self.password, self.port,
+                                 self.username)
+            self.isLive = True
+
+    def _open(self, open_func):
+        """ open a channel on the transport, reconnect once if broken.
+
+        Only the channel opening is retried.  A command is never executed
+        twice.
+        """
+        transport = self.transport
+        if transport is None or not transport.is_active():
+            self._reconnect(transport)
+            transport = self.transport
+        try:
+            return open_func(transport)
+        except (paramiko.ssh_exception.SSHException, EOFError,
+                socket.error) as ex:
+            LOG.debug('failed to open channel: {}'.format(ex))
+            self._reconnect(transport)
+            return open_func(self.transport)
+
+    def _drain(self, channel, cmd, timeout):
+        """ read stdout and stderr while waiting for the command to exit.
+
+        Reading the output only after the exit blocks the command forever
+        if the output is larger than the channel window.
+        """
+        outputs = {'stdout': [0, []], 'stderr': [0, []]}
+
+        def read(name, recv):
+            size, chunks = outputs[name]
+            data = recv(self.RECV_SIZE)
+            if size < self.max_output:
+                chunks.append(data[:self.max_output - size])
+            outputs[name][0] = size + len(data)
+            return len(data)
+
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            received = 0
+            if channel.recv_ready():
+                received += read('stdout', channel.recv)
+            if channel.recv_stderr_ready():
+                received += read('stderr', channel.recv_stderr)
+            if received:
+                continue
+            if channel.exit_status_ready() and not (
+                    channel.recv_ready() or channel.recv_stderr_ready()):
+                break
+            if deadline is not None and time.time() > deadline:
+                channel.close()
+                raise SSHExecutionError(
+                    cmd=cmd, description='Command timed out after {} '
+                                         'seconds.'.format(timeout))
+            time.sleep(self.POLL_INTERVAL)
+
+        ret = []
+        for name in ('stdout', 'stderr'):
+            size, chunks = outputs[name]
+            if size > self.max_output:
+                LOG.warning('{} of command {} is {} bytes, truncated to {} '
+                            'bytes.'.format(name, cmd, size,
+                                            self.max_output))
+            ret.append(b''.join(chunks))
+        return ret
 
     def execute(self, command, timeout=None, check_exit_code=True):
         cmd = ' '.join(pipes.quote(cmd_arg) for cmd_arg in command)
-        channel = self.transport.open_session()
-        channel.exec_command(cmd)
-        channel.settimeout(timeout)
-        exit_status = channel.recv_exit_status()
-
-        stdout = channel.makefile('r').read()
-        stderr = channel.makefile_stderr('r').read()
-
-        channel.makefile('wb').close()
+        with self._sessions:
+            channel = self._open(lambda t: t.open_session())
+            try:
+                channel.exec_command(cmd)
+                stdout, stderr = self._drain(channel, cmd, timeout)
+                exit_status = channel.recv_exit_status()
+            finally:
+                channel.close()
         self._ssh_command_log(cmd, stdout, stderr)
 
         # exit_status == -1 if no exit code was returned
@@ -174,18 +411,52 @@ class SSHConnector(object):
 
         return stdout, stderr
 
+    @contextlib.contextmanager
+    def _sftp(self):
+        """ borrow an sftp client from the pool. """
+        transport = self.transport
+        if transport is None or not transport.is_active():
+            # the pooled clients are closed along with the broken transport
+            self._reconnect(transport)
+        with self._lock:
+            sftp_client = self._sftp_pool.pop() if self._sftp_pool else None
+        if sftp_client is None:
+            sftp_client = self._open(lambda t: t.open_sftp_client())
+        transport = self.transport
+        try:
+            yield sftp_client
+        except Exception:
+            # the client may be broken, do not reuse it
+            sftp_client.close()
+            raise
+        with self._lock:
+            if (transport is self.transport and
+                    len(self._sftp_pool) < self.sftp_pool_size):
+                self._sftp_pool.append(sftp_client)
+                sftp_client = None
+        if sftp_client is not None:
+            sftp_client.close()
+
+    def _close_sftp_pool(self):
+        pool, self._sftp_pool = self._sftp_pool, []
+        for sftp_client in pool:
+            try:
+                sftp_client.close()
+            except Exception as ex:
+                LOG.debug('failed to close sftp client: {}'.format(ex))
+
     def copy_file_to_remote(self, local_path, remote_path):
         """scp the local file to remote folder.
 
         :param local_path: local path
         :param remote_path: remote path
         """
-        sftp_client = self.transport.open_sftp_client()
         LOG.debug('Copy the local file to remote. '
                   'Source=%(src)s. Target=%(target)s.' %
                   {'src': local_path, 'target': remote_path})
         try:
-            sftp_client.put(local_path, remote_path)
+            with self._sftp() as sftp_client:
+                sftp_client.put(local_path, remote_path)
         except Exception as ex:
             LOG.error('Failed to copy the local file to remote. '
                       'Reason: %s.' % six.text_type(ex))
@@ -197,12 +468,12 @@ class SSHConnector(object):
         :param remote_path: remote path
         :param local_path: local path
         """
-        sftp_client = self.transport.open_sftp_client()
         LOG.debug('Get the remote file. '
                   'Source=%(src)s. Target=%(target)s.' %
                   {'src': remote_path, 'target': local_path})
         try:
-            sftp_client.get(remote_path, local_path)
+            with self._sftp() as sftp_client:
+                sftp_client.get(remote_path, local_path)
         except Exception as ex:
             LOG.error('Failed to secure copy. Reason: %s.' %
                       six.text_type(ex))
@@ -211,6 +482,8 @@ class SSHConnector(object):
     def close(self):
         """Closes the ssh connection."""
         if 'isLive' in self.__dict__ and self.isLive:
+            with self._lock:
+                self._close_sftp_pool()
             self.transport.close()
             self.isLive = False
 
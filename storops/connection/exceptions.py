@@ -120,16 +120,22 @@ def from_response(response, method, url):
     elif content_type.startswith("text/"):
         kwargs["details"] = response.text
 
+    cls = get_error_class(response.status_code)
+    return cls(**kwargs)
+
+
+def get_error_class(status_code):
+    """Returns the :class:`HttpError` subclass of the http status code."""
     try:
-        cls = _code_map[response.status_code]
+        cls = _code_map[status_code]
     except KeyError:
-        if 500 <= response.status_code < 600:
+        if 500 <= status_code < 600:
             cls = HttpServerError
-        elif 400 <= response.status_code < 500:
+        elif 400 <= status_code < 500:
             cls = HTTPClientError
         else:
             cls = HttpError
-    return cls(**kwargs)
+    return cls
 
 
 class SSHExecutionError(ClientException):
@@ -159,3 +165,7 @@ class SSHExecutionError(ClientException):
 
 class SFtpExecutionError(ClientException):
     message = "[EMC] Failed to execute sftp operation. %(err)s."
+
+    def __init__(self, err=None):
+        self.err = err
+        super(SFtpExecutionError, self).__init__(self.message % {'err': err})
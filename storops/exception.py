@@ -274,6 +274,11 @@ class NoIndexException(StoropsException):
     pass
 
 
+class CircuitBreakerOpenError(StoropsException):
+    message_template = ('circuit breaker of {name} is open.  '
+                        'retry after {remaining} seconds.')
+
+
 class UnityPerfMonNotEnabledError(UnityException):
     message = ('Performance metric is not available, because performance '
                'monitoring is not enabled for this unity resource.  '
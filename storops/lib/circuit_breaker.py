@@ -0,0 +1,178 @@
+# coding=utf-8
+# Copyright (c) 2015 EMC Corporation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+from __future__ import unicode_literals
+
+import logging
+import random
+import threading
+import time
+
+from storops.exception import CircuitBreakerOpenError
+
+__author__ = 'Cedric Zhuang'
+
+log = logging.getLogger(__name__)
+
+
+def full_jitter(tried, base=1, cap=60):
+    """ exponential backoff with full jitter.
+
+    :param tried: number of tries already made.
+    :param base: seconds to wait after the first try.
+    :param cap: maximum seconds to wait.
+    :return: random seconds between 0 and `base * 2 ** (tried - 1)`.
+    """
+    return random.uniform(0, min(cap, base * 2 ** (tried - 1)))
+
+
+class CircuitBreaker(object):
+    """ fail fast when an endpoint keeps failing.
+
+    The breaker opens after `failure_threshold` consecutive failures.
+    Calls fail with `CircuitBreakerOpenError` while it is open.  After
+    `recovery_timeout` seconds, the breaker is half-open and lets one trial
+    call through.  The breaker closes if the trial succeeds and opens again
+    if it fails.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30,
+                 error_filter=None, clock=None):
+        """ create a circuit breaker.
+
+        :param name: name of the endpoint.
+        :param failure_threshold: consecutive failures to open the breaker.
+        :param recovery_timeout: seconds before a trial call is allowed.
+        :param error_filter: function to check whether an exception is a
+            failure of the endpoint.  All exceptions are failures if `None`.
+        :param clock: function returning the current time in seconds.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.error_filter = error_filter
+        if clock is None:
+            clock = time.time
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failure_count = 0
+        self._opened_at = None
+        self._trial_in_progress = False
+
+    @property
+    def state(self):
+        return self._state
+
+    @property
+    def failure_count(self):
+        return self._failure_count
+
+    def before_call(self):
+        """ check whether a call is allowed.
+
+        :raise CircuitBreakerOpenError: if the breaker is open or a trial
+            call is already in progress.
+        """
+        with self._lock:
+            if self._state == self.OPEN:
+                remaining = (self._opened_at + self.recovery_timeout -
+                             self._clock())
+                if remaining > 0:
+                    raise CircuitBreakerOpenError(
+                        name=self.name, remaining=round(remaining, 1))
+                log.info('circuit breaker of {} is half-open, '
+                         'try one call.'.format(self.name))
+                self._state = self.HALF_OPEN
+                self._trial_in_progress = True
+            elif self._state == self.HALF_OPEN:
+                if self._trial_in_progress:
+                    raise CircuitBreakerOpenError(
+                        name=self.name, remaining=0)
+                self._trial_in_progress = True
+
+    def on_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                log.info('circuit breaker of {} is closed.'.format(
+                    self.name))
+            self._state = self.CLOSED
+            self._failure_count = 0
+            self._trial_in_progress = False
+
+    def on_failure(self):
+        with self._lock:
+            self._failure_count += 1
+            self._trial_in_progress = False
+            if (self._state == self.HALF_OPEN or
+                    self._failure_count >= self.failure_threshold):
+                if self._state != self.OPEN:
+                    log.warning('circuit breaker of {} is open after {} '
+                                'failures.'.format(self.name,
+                                                   self._failure_count))
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+    def is_failure(self, error):
+        if self.error_filter is None:
+            ret = True
+        else:
+            ret = self.error_filter(error)
+        return ret
+
+    def on_interrupted(self):
+        # the call tells nothing about the endpoint, give the trial back
+        with self._lock:
+            self._trial_in_progress = False
+
+    def call(self, func, *args, **kwargs):
+        self.before_call()
+        succeeded = None
+        try:
+            ret = func(*args, **kwargs)
+            succeeded = True
+        except Exception as e:
+            # the endpoint is reachable if the error is not a failure
+            succeeded = not self.is_failure(e)
+            raise
+        finally:
+            # `KeyboardInterrupt`, `SystemExit` or a killed greenlet leaves
+            # `succeeded` as `None`
+            if succeeded is None:
+                self.on_interrupted()
+            elif succeeded:
+                self.on_success()
+            else:
+                self.on_failure()
+        return ret
+
+    def reset(self):
+        self.on_success()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<CircuitBreaker {}: {}, failures: {}>'.format(
+            self.name, self._state, self._failure_count)
@@ -377,6 +377,77 @@ class SynchronizedDecorator(object):
 synchronized = SynchronizedDecorator.synchronized
 
 
+class _FlightCall(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exc_info = None
+        self.shared = 0
+
+
+class SingleFlight(object):
+    """ coalesce concurrent calls with the same key.
+
+    While a call of a key is in flight, the other callers with the same key
+    wait for it and share its result (or its exception) instead of calling
+    the function again.
+
+    :param copy_result: function to copy the result for each waiting
+        caller, so that they do not share a mutable result.
+    """
+
+    def __init__(self, copy_result=None):
+        self._copy_result = copy_result
+        self._lock = _init_lock()
+        self._calls = {}
+        self.call_count = 0
+        self.shared_count = 0
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _FlightCall()
+                self._calls[key] = call
+                self.call_count += 1
+            else:
+                call.shared += 1
+                self.shared_count += 1
+
+        if is_leader:
+            try:
+                call.result = func(*args, **kwargs)
+            except Exception:
+                call.exc_info = sys.exc_info()
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+            if call.exc_info is not None:
+                six.reraise(*call.exc_info)
+            if self._copy_result is not None:
+                return self._copy_result(call.result)
+        return call.result
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def __getstate__(self):
+        # locks and in-flight calls could not be pickled
+        return {'call_count': self.call_count,
+                'shared_count': self.shared_count,
+                '_copy_result': self._copy_result}
+
+    def __setstate__(self, state):
+        self.__init__(state.pop('_copy_result', None))
+        self.__dict__.update(state)
+
+
 def const_seconds(value):
     return value
 
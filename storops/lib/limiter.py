@@ -0,0 +1,248 @@
+# coding=utf-8
+# Copyright (c) 2015 EMC Corporation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+from __future__ import unicode_literals
+
+import logging
+import threading
+import time
+
+__author__ = 'Cedric Zhuang'
+
+log = logging.getLogger(__name__)
+
+
+class TokenBucket(object):
+    """ limit the rate of the requests.
+
+    `rate` tokens are added every second, up to `burst` tokens.  Each
+    request takes one token and waits if no token is left.
+    """
+
+    def __init__(self, rate, burst=None, clock=None, sleep=None):
+        self.rate = float(rate)
+        if burst is None:
+            burst = max(1, rate)
+        self.burst = burst
+        self._clock = time.time if clock is None else clock
+        self._sleep = time.sleep if sleep is None else sleep
+        self._tokens = float(burst)
+        self._updated_at = self._clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        elapsed = max(0, now - self._updated_at)
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    def try_acquire(self):
+        """ take a token if available.
+
+        :return: 0 if the token is taken, or the seconds to wait for the
+            next token.
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                ret = 0
+            else:
+                ret = (1 - self._tokens) / self.rate
+        return ret
+
+    def acquire(self):
+        """ wait for a token.
+
+        :return: seconds waited.
+        """
+        waited = 0
+        while True:
+            to_wait = self.try_acquire()
+            if to_wait <= 0:
+                break
+            self._sleep(to_wait)
+            waited += to_wait
+        return waited
+
+    @property
+    def tokens(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+class AimdWindow(object):
+    """ limit the in-flight requests with additive-increase and
+    multiplicative-decrease.
+
+    The window grows by `increase` every `limit` successful requests and
+    shrinks to `limit * decrease` when the array is overloaded.  Requests
+    sent before the last decrease do not decrease the window again, so that
+    one congestion event only halves the window once.
+    """
+
+    def __init__(self, initial=8, min_limit=1, max_limit=64, increase=1,
+                 decrease=0.5):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self._limit = float(max(min_limit, min(initial, max_limit)))
+        self._in_flight = 0
+        self._epoch = 0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self):
+        return self._limit
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def acquire(self):
+        """ wait for a free slot in the window.
+
+        :return: the ticket required by `release`.
+        """
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+            return self._epoch
+
+    def release(self, ticket, overloaded=False):
+        with self._cond:
+            self._in_flight -= 1
+            if overloaded:
+                if ticket == self._epoch:
+                    self._limit = max(self.min_limit,
+                                      self._limit * self.decrease)
+                    self._epoch += 1
+                    log.debug('array overloaded, shrink window to '
+                              '{:.1f}.'.format(self._limit))
+            else:
+                self._limit = min(self.max_limit,
+                                  self._limit + self.increase / self._limit)
+            self._cond.notify_all()
+
+
+class ArrayLimiter(object):
+    """ limit the requests sent to one array.
+
+    Combine a token bucket for the request rate with an AIMD window for the
+    in-flight requests.
+    """
+
+    def __init__(self, name, rate=None, burst=None, initial_window=8,
+                 min_window=1, max_window=64, clock=None, sleep=None):
+        """ create a limiter.
+
+        :param name: name of the array, normally the management ip.
+        :param rate: maximum requests per second.  `None` means no limit.
+        :param burst: maximum requests sent at once after idle.
+        :param initial_window: initial number of in-flight requests.
+        :param min_window: minimum number of in-flight requests.
+        :param max_window: maximum number of in-flight requests.
+        """
+        self.name = name
+        if rate is None:
+            self.bucket = None
+        else:
+            self.bucket = TokenBucket(rate, burst, clock=clock, sleep=sleep)
+        self.window = AimdWindow(initial_window, min_window, max_window)
+        self._lock = threading.Lock()
+        self.request_count = 0
+        self.overloaded_count = 0
+        self.wait_time = 0
+
+    def acquire(self):
+        """ wait until the request is allowed.
+
+        :return: the ticket required by `release`.
+        """
+        ticket = self.window.acquire()
+        if self.bucket is not None:
+            try:
+                waited = self.bucket.acquire()
+            except Exception:
+                self.window.release(ticket)
+                raise
+            if waited > 0:
+                with self._lock:
+                    self.wait_time += waited
+        return ticket
+
+    def release(self, ticket, overloaded=False):
+        with self._lock:
+            self.request_count += 1
+            if overloaded:
+                self.overloaded_count += 1
+        self.window.release(ticket, overloaded)
+
+    def call(self, is_overloaded, func, *args, **kwargs):
+        """ call the function under the limit.
+
+        :param is_overloaded: function accepting the return value and the
+            exception of the call.  returns True if the array is overloaded.
+        :param func: function to call.
+        :return: the return value of the function.
+        """
+        ticket = self.acquire()
+        try:
+            ret = func(*args, **kwargs)
+        except Exception as e:
+            self.release(ticket, is_overloaded(None, e))
+            raise
+        self.release(ticket, is_overloaded(ret, None))
+        return ret
+
+    def get_stats(self):
+        with self._lock:
+            return {'window': self.window.limit,
+                    'in_flight': self.window.in_flight,
+                    'rate': None if self.bucket is None else self.bucket.rate,
+                    'requests': self.request_count,
+                    'overloaded': self.overloaded_count,
+                    'wait_time': self.wait_time}
+
+    def __reduce__(self):
+        # the unpickled client shares the limiter of the array
+        return get_array_limiter, (self.name,)
+
+    def __repr__(self):
+        return '<ArrayLimiter {}: window {:.1f}>'.format(
+            self.name, self.window.limit)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_array_limiter(name, **kwargs):
+    """ get the limiter shared by all the clients of an array.
+
+    :param name: management ip of the array.
+    :param kwargs: options used to create the limiter if not existed.  They
+        are ignored if the limiter of the array already exists.
+    :return: the limiter of the array.
+    """
+    with _limiters_lock:
+        ret = _limiters.get(name)
+        if ret is None:
+            ret = ArrayLimiter(name, **kwargs)
+            _limiters[name] = ret
+    return ret
@@ -111,21 +111,46 @@ class PropDescriptor(PropMapper):
     def is_index(self):
         return self._is_index
 
-    def convert(self, value):
+    @property
+    def converter(self):
+        return self._converter
+
+    @converter.setter
+    def converter(self, value):
+        self._converter = value
+        self._convert_func = self._compile_converter()
+
+    def _compile_converter(self):
         c = self.converter
-        ret = value
+        ret = None
         if c is not None:
             if self.is_parser():
-                ret = c.parse_all(value)
+                ret = c.parse_all
             elif self.is_resource_clazz():
-                # value is raw output from cli.
-                ret = c().update(value)
+                def ret(value):
+                    # value is raw output from cli.
+                    return c().update(value)
             elif self.is_enum() or self.is_enum_list():
-                ret = c.parse(value)
+                ret = c.parse
             elif callable(c):
-                ret = c(value)
+                ret = c
         return ret
 
+    def get_convert_func(self):
+        """ get the function converting the value of this property.
+
+        The kind of the converter is checked once when it's set.
+
+        :return: the function, or `None` if the value is not converted.
+        """
+        return self._convert_func
+
+    def convert(self, value):
+        func = self._convert_func
+        if func is not None:
+            value = func(value)
+        return value
+
     def is_resource_list_clazz(self):
         rsc_list_clz = storops.lib.resource.ResourceList
         c = self.converter
@@ -207,6 +232,7 @@ class OutputParser(object):
     def __init__(self):
         self._property_map = {}
         self.resource_name = ''
+        self._plan = None
 
     @property
     def data_src(self):
@@ -220,12 +246,32 @@ class OutputParser(object):
 
     def set_property_map(self, value):
         self._property_map = value
+        self._plan = None
 
     def add_property(self, *props):
         for prop in props:
             seq = len(self._property_map)
             prop.sequence = seq
             self._property_map[prop.key.upper()] = prop
+        self._plan = None
+
+    @property
+    def plan(self):
+        """ conversion plan of all the properties compiled once. """
+        if self._plan is None:
+            self._plan = self._compile_plan()
+        return self._plan
+
+    def _compile_plan(self, properties=None):
+        """ compile the steps to parse the properties.
+
+        :param properties: the properties.  All the properties if `None`.
+        :return: list of the key, the label and the convert function of
+            each property.
+        """
+        if properties is None:
+            properties = self.properties
+        return [(p.key, p.label, p.get_convert_func()) for p in properties]
 
     def has_property_key(self, key):
         return key.upper() in self._property_map
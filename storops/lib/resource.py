@@ -15,10 +15,19 @@
 #    under the License.
 from __future__ import unicode_literals
 
+import hashlib
+import json
+import re
+import threading
+import time
+import weakref
+from collections import namedtuple
 from datetime import datetime, timedelta
 
+from enum import Enum
+
 import storops.exception as ex
-from storops.lib.common import JsonPrinter, clear_instance_cache
+from storops.lib.common import JsonPrinter, clear_instance_cache, cache
 
 __author__ = 'Cedric Zhuang'
 
@@ -64,6 +73,11 @@ class Resource(JsonPrinter):
         self.update_name_if_exists()
         return self
 
+    @clear_instance_cache
+    def _load_from(self, other):
+        """ take the properties retrieved by another instance. """
+        self._parsed_resource = other._parsed_resource
+
     def update_name_if_exists(self):
         if hasattr(self, '_name') and self._name is None:
             setattr(self, '_name', self._get_value_by_key("name"))
@@ -197,7 +211,86 @@ class Resource(JsonPrinter):
         return self._parsed_resource.get(item, None)
 
 
+class ResourceRecord(object):
+    """ compact storage of the properties of a resource in a list.
+
+    Properties are kept in the slots generated from the parser config.
+    Other attributes and methods are available after the record is
+    promoted to the full resource by the list.
+    """
+
+    __slots__ = ('_owner', '_resource', '_extra')
+    _keys = ()
+
+    def __init__(self, owner, parsed):
+        object.__setattr__(self, '_owner', owner)
+        object.__setattr__(self, '_resource', None)
+        object.__setattr__(self, '_extra', None)
+        for k, v in parsed.items():
+            if k in self._keys:
+                object.__setattr__(self, k, v)
+            else:
+                if self._extra is None:
+                    object.__setattr__(self, '_extra', {})
+                self._extra[k] = v
+
+    def _to_dict(self):
+        ret = {}
+        for k in self._keys:
+            try:
+                ret[k] = object.__getattribute__(self, k)
+            except AttributeError:
+                pass
+        if self._extra is not None:
+            ret.update(self._extra)
+        return ret
+
+    def _promote(self):
+        """ get the full resource of the record. """
+        if self._resource is None:
+            object.__setattr__(self, '_resource', self._owner._promote(self))
+        return self._resource
+
+    def __getattr__(self, item):
+        if item in self._keys and self._owner._is_loaded_field(item):
+            # retrieved but not in the output
+            ret = None
+        elif item.startswith('__'):
+            raise AttributeError(item)
+        else:
+            ret = getattr(self._promote(), item)
+        return ret
+
+    def __setattr__(self, key, value):
+        if key in self._keys:
+            object.__setattr__(self, key, value)
+        else:
+            setattr(self._promote(), key, value)
+
+    def __repr__(self):
+        return '<{} {}>'.format(self.__class__.__name__, self._to_dict())
+
+
+@cache
+def get_record_clz(rsc_clz):
+    """ get the record class of the resource class.
+
+    The slots of the record are the property keys in the parser config of
+    the resource.
+    """
+    keys = tuple(str(p.key) for p in rsc_clz._get_parser().properties
+                 if re.match(r'^[a-zA-Z_]\w*$', p.key) and
+                 not p.key.startswith('_'))
+    name = str('{}Record'.format(rsc_clz.__name__))
+    return type(name, (ResourceRecord,),
+                {'__slots__': keys, '_keys': frozenset(keys),
+                 '__module__': rsc_clz.__module__})
+
+
 class ResourceList(Resource):
+    # True to keep the resources as `ResourceRecord`
+    compact = False
+
     def __init__(self):
         super(ResourceList, self).__init__()
         self._list = None
@@ -232,12 +325,32 @@ class ResourceList(Resource):
             parsed_list = self._parse_raw(data)
 
         for i in parsed_list:
-            item = self._get_resource_instance()
-            item.update(i)
+            if self.compact:
+                item = self._get_record(i)
+            else:
+                item = self._get_resource_instance()
+                item.update(i)
             if self._filter(item):
                 self._list.append(item)
         return self
 
+    def _get_record(self, data):
+        clz = self.get_resource_class()
+        return get_record_clz(clz)(self, clz._get_parser().parse(data))
+
+    def _is_loaded_field(self, key):
+        """ check whether the property is retrieved for the records. """
+        return True
+
+    def _promote(self, record):
+        """ get the full resource of the record.
+
+        Override it to set the attributes of the resources like the client.
+        """
+        ret = self._get_resource_instance()
+        ret._parsed_resource = record._to_dict()
+        return ret
+
     def _apply_filter(self):
         result = []
         for item in self:
@@ -303,6 +416,51 @@ class ResourceList(Resource):
     def get_member_attr_list(self, v):
         return [getattr(i, v) for i in self]
 
+    def watch(self, interval=60, polls=None, include_existing=True,
+              clock=None, sleep=None):
+        """ poll the resources and yield the changes only.
+
+        A digest of each property is kept for each resource between the
+        polls instead of the resources.  Resources are built only for the
+        added and modified ones.
+
+        :param interval: seconds between the starts of two polls.
+        :param polls: number of polls.  Poll forever if `None`.
+        :param include_existing: True to yield the resources of the first
+            poll as added.
+        :param clock: function returning the current time in seconds.
+        :param sleep: function to sleep for the given seconds.
+        :return: generator of `ResourceChange`.
+        """
+        clock = time.time if clock is None else clock
+        sleep = time.sleep if sleep is None else sleep
+        watcher = ResourceWatcher()
+        count = 0
+        started = None
+        while polls is None or count < polls:
+            if count > 0:
+                sleep(max(0, started + interval - clock()))
+            started = clock()
+            changes = watcher.diff(self._get_watch_items(),
+                                   get_resource=self._get_watch_resource)
+            if count > 0 or include_existing:
+                for change in changes:
+                    yield change
+            count += 1
+
+    def _get_watch_items(self):
+        """ get the raw items to find the changes.
+
+        :return: iterable of the key, the property dictionary and the raw
+            item of each resource.  `_get_watch_resource` builds the
+            resource from the raw item.
+        """
+        raise NotImplementedError(
+            'watch is not supported by {}.'.format(self.__class__.__name__))
+
+    def _get_watch_resource(self, raw):
+        return raw
+
     def _is_updated(self):
         return self._list is not None
 
@@ -317,6 +475,130 @@ class ResourceList(Resource):
         return self.list.append(item)
 
 
+ResourceChange = namedtuple('ResourceChange',
+                            ['event', 'key', 'resource', 'changed'])
+
+
+def _to_digest_value(value):
+    if isinstance(value, Resource):
+        ret = value.parsed_resource
+    elif isinstance(value, Enum):
+        ret = value.value
+    elif isinstance(value, datetime):
+        ret = value.isoformat()
+    else:
+        ret = repr(value)
+    return ret
+
+
+def _identity(value):
+    return value
+
+
+def get_digest(value):
+    """ get the digest of the value in 8 bytes. """
+    content = json.dumps(value, sort_keys=True, default=_to_digest_value)
+    return hashlib.md5(content.encode('utf-8')).digest()[:8]
+
+
+class ResourceWatcher(object):
+    """ find the changes of a collection between the polls. """
+
+    ADDED = 'added'
+    REMOVED = 'removed'
+    MODIFIED = 'modified'
+
+    def __init__(self):
+        # key of the resource to the digest of each property
+        self._digests = {}
+
+    def diff(self, items, get_resource=None):
+        """ compare the resources with the previous ones.
+
+        :param items: iterable of the key, the property dictionary and the
+            raw item of each resource.
+        :param get_resource: function to build the resource from the raw
+            item.  Only called for the added and modified ones.  The raw
+            item is used as the resource if `None`.
+        :return: list of `ResourceChange`.  `changed` is the tuple of the
+            changed property names.
+        """
+        if get_resource is None:
+            get_resource = _identity
+        ret = []
+        digests = {}
+        for key, fields, raw in items:
+            current = {k: get_digest(v) for k, v in fields.items()}
+            digests[key] = current
+            previous = self._digests.get(key)
+            if previous is None:
+                ret.append(ResourceChange(
+                    self.ADDED, key, get_resource(raw),
+                    tuple(sorted(current))))
+            elif previous != current:
+                changed = tuple(sorted(
+                    k for k in set(previous) | set(current)
+                    if previous.get(k) != current.get(k)))
+                ret.append(ResourceChange(
+                    self.MODIFIED, key, get_resource(raw), changed))
+        for key in self._digests:
+            if key not in digests:
+                ret.append(ResourceChange(self.REMOVED, key, None, ()))
+        self._digests = digests
+        return ret
+
+
+class IdentityMap(object):
+    """ map the class and the id of the resources to their instances.
+
+    Only one instance of each resource is kept for a client, so that the
+    properties retrieved by one reference are available to the others.
+    Instances are held with weak references and removed from the map once
+    not referenced anywhere else.
+    """
+
+    def __init__(self):
+        self._map = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, clz, key):
+        return self._map.get((clz, key))
+
+    def merge(self, rsc, key, fresh=True):
+        """ get the instance of the resource kept in the map.
+
+        The resource is kept in the map if no instance of it is there.
+
+        :param rsc: the resource.
+        :param key: id of the resource.
+        :param fresh: True if the properties of the resource are just
+            retrieved.  They are merged into the instance kept.  Otherwise
+            they are merged only if the instance kept is not retrieved.
+        :return: the instance kept in the map.
+        """
+        map_key = (type(rsc), key)
+        with self._lock:
+            ret = self._map.get(map_key)
+            if ret is None:
+                self._map[map_key] = rsc
+                ret = rsc
+        if (ret is not rsc and rsc.parsed_resource is not None and
+                (fresh or not ret._is_updated())):
+            ret._load_from(rsc)
+        return ret
+
+    def clear(self):
+        with self._lock:
+            self._map.clear()
+
+    def __len__(self):
+        return len(self._map)
+
+    def __reduce__(self):
+        # instances are not pickled along with the client
+        return IdentityMap, ()
+
+
 class ResourceListCollection(object):
     def __init__(self, init_list=None):
         if init_list:
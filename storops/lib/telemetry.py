@@ -0,0 +1,222 @@
+# coding=utf-8
+# Copyright (c) 2015 EMC Corporation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+from __future__ import unicode_literals
+
+import bisect
+import logging
+import re
+import threading
+
+import six
+
+__author__ = 'Cedric Zhuang'
+
+log = logging.getLogger(__name__)
+
+# upper bounds of the latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+                   30, 60, 120, 300)
+
+# upper bounds of the size buckets in bytes
+SIZE_BUCKETS = tuple(256 * 4 ** i for i in range(10))
+
+
+class Histogram(object):
+    """ histogram with fixed buckets.
+
+    Recording a value is a binary search plus a few additions, cheap enough
+    to keep on for every request.
+    """
+    __slots__ = ('bounds', 'counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        # the last bucket holds values larger than all the bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def record(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def mean(self):
+        if self.count == 0:
+            ret = None
+        else:
+            ret = self.total / float(self.count)
+        return ret
+
+    def percentile(self, percent):
+        """ estimate the percentile with the upper bound of the bucket.
+
+        :param percent: percentile between 0 and 100.
+        :return: upper bound of the bucket the percentile falls in.  The max
+            value is returned if it's in the overflow bucket.
+        """
+        if self.count == 0:
+            return None
+        rank = percent / 100.0 * self.count
+        accumulated = 0
+        for i, count in enumerate(self.counts):
+            accumulated += count
+            if accumulated >= rank and count > 0:
+                if i < len(self.bounds):
+                    ret = min(self.bounds[i], self.max)
+                else:
+                    ret = self.max
+                break
+        else:
+            ret = self.max
+        return ret
+
+    def to_dict(self):
+        buckets = [(bound, count)
+                   for bound, count in zip(self.bounds, self.counts)
+                   if count > 0]
+        if self.counts[-1] > 0:
+            buckets.append(('+inf', self.counts[-1]))
+        return {'count': self.count,
+                'total': self.total,
+                'min': self.min,
+                'max': self.max,
+                'mean': self.mean,
+                'p50': self.percentile(50),
+                'p90': self.percentile(90),
+                'p99': self.percentile(99),
+                'buckets': buckets}
+
+
+class _EndpointStats(object):
+    __slots__ = ('count', 'retries', 'errors', 'latency', 'size')
+
+    def __init__(self):
+        self.count = 0
+        self.retries = 0
+        self.errors = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+
+    def to_dict(self):
+        return {'count': self.count,
+                'retries': self.retries,
+                'errors': dict(self.errors),
+                'latency': self.latency.to_dict(),
+                'size': self.size.to_dict()}
+
+
+class Telemetry(object):
+    """ in-process latency, size, retry and error statistics by endpoint.
+
+    The endpoint is a key like `GET /api/types/lun/instances` or a cli verb
+    like `lun -list`.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        ret = self._stats.get(key)
+        if ret is None:
+            ret = _EndpointStats()
+            self._stats[key] = ret
+        return ret
+
+    def record(self, key, latency, size=None, error=None):
+        """ record one call of the endpoint.
+
+        :param key: the endpoint.
+        :param latency: seconds consumed by the call.
+        :param size: size of the response in bytes.
+        :param error: the exception, or the exception class, of a failed
+            call.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._get(key)
+            stats.count += 1
+            stats.latency.record(latency)
+            if size is not None:
+                stats.size.record(size)
+            if error is not None:
+                if not isinstance(error, six.class_types):
+                    error = type(error)
+                name = error.__name__
+                stats.errors[name] = stats.errors.get(name, 0) + 1
+
+    def record_retry(self, key, count=1):
+        if not self.enabled or count <= 0:
+            return
+        with self._lock:
+            self._get(key).retries += count
+
+    def get_stats(self, key=None):
+        """ get a snapshot of the statistics.
+
+        :param key: the endpoint.  Statistics of all the endpoints are
+            returned if `None`.
+        :return: dictionary of the statistics.
+        """
+        with self._lock:
+            if key is None:
+                ret = {k: v.to_dict() for k, v in self._stats.items()}
+            elif key in self._stats:
+                ret = self._stats[key].to_dict()
+            else:
+                ret = _EndpointStats().to_dict()
+        return ret
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_stats'] = {}
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+_instance_id_pattern = re.compile(r'(/api/instances/[^/?]+/)[^/?]+')
+_number_pattern = re.compile(r'(?<=/)\d+(?=/|$)')
+
+
+def get_url_template(url):
+    """ replace the resource ids in the url with `{id}`.
+
+    :param url: url of the request, with or without the host.
+    :return: the path with the ids replaced and the query removed.
+    """
+    path = url.split('?', 1)[0]
+    if '://' in path:
+        path = '/' + path.split('://', 1)[1].partition('/')[2]
+    path = _instance_id_pattern.sub(r'\1{id}', path)
+    return _number_pattern.sub('{id}', path)
@@ -15,17 +15,27 @@
 #    under the License.
 from __future__ import unicode_literals
 
+import json
 import logging
+import math
+import os
+import re
+import threading
+from contextlib import contextmanager
 from functools import wraps
+from multiprocessing.pool import ThreadPool
 
 import six
 
+import storops.unity.resource.metric
 import storops.unity.resource.system
 import storops.unity.resource.type_resource
 from storops.connection.connector import UnityRESTConnector
 from storops.exception import UnityResourceNotSupportedError
-from storops.lib.common import instance_cache, EnumList
+from storops.lib.common import instance_cache, EnumList, get_local_folder, \
+    assure_folder
 from storops.lib.metric import PerfManager
+from storops.lib.resource import IdentityMap
 from storops.unity.enums import UnityEnum, UnityEnumList
 from storops.unity.resource import UnityResource, UnityResourceList
 from storops.unity.resp import RestResponse
@@ -47,53 +57,349 @@ def wrap_not_supported(func):
     return _wrap
 
 
+class UnityMetadataCache(object):
+    """ on-disk cache of the type metadata of an array.
+
+    The attributes of the resource types, the metric paths and the system
+    version are kept in one file for each array serial.  The whole cache is
+    dropped when the software version of the array changes.
+    """
+
+    def __init__(self, serial_number, software_version, folder=None):
+        if folder is None:
+            folder = os.path.join(get_local_folder(), 'metadata')
+        self.folder = folder
+        self.serial_number = serial_number
+        self.software_version = software_version
+        name = re.sub(r'[^\w.-]', '_', '{}'.format(serial_number))
+        self.filename = os.path.join(folder, 'unity_{}.json'.format(name))
+        self._lock = threading.Lock()
+        self._data = self._new_data()
+        # saving is deferred to the end of the outermost batch
+        self._batch_depth = 0
+        self._dirty = False
+
+    def _new_data(self):
+        return {'serial_number': self.serial_number,
+                'software_version': self.software_version,
+                'types': {},
+                'unsupported_types': [],
+                'metric_paths': None}
+
+    def load(self):
+        try:
+            with open(self.filename, 'r') as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            data = None
+        with self._lock:
+            if data is None:
+                self._data = self._new_data()
+            elif data.get('software_version') != self.software_version:
+                log.info('software version of {} changed from {} to {}, '
+                         'drop the metadata cache.'.format(
+                             self.serial_number,
+                             data.get('software_version'),
+                             self.software_version))
+                self._data = self._new_data()
+            else:
+                self._data = data
+        return self
+
+    def save(self):
+        with self._lock:
+            content = json.dumps(self._data)
+            self._dirty = False
+        # write to a temporary file first, other processes might be
+        # reading the cache.
+        tmp = '{}.{}.tmp'.format(self.filename, os.getpid())
+        try:
+            assure_folder(self.folder)
+            with open(tmp, 'w') as f:
+                f.write(content)
+            getattr(os, 'replace', os.rename)(tmp, self.filename)
+        except (IOError, OSError) as ex:
+            log.warning('failed to save the metadata cache to {}: {}'
+                        .format(self.filename, ex))
+
+    def clear(self):
+        with self._lock:
+            self._data = self._new_data()
+        try:
+            os.remove(self.filename)
+        except OSError:
+            pass
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._batch_depth = 0
+
+    @contextmanager
+    def batch(self):
+        """ save the cache once after the changes made in the block. """
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                save = self._batch_depth == 0 and self._dirty
+            if save:
+                self.save()
+
+    def _on_changed(self, save):
+        if save:
+            with self._lock:
+                deferred = self._batch_depth > 0
+                if deferred:
+                    self._dirty = True
+            if not deferred:
+                self.save()
+
+    def get_type(self, type_name):
+        """ return the cached content of the type or `None`. """
+        with self._lock:
+            return self._data['types'].get(type_name)
+
+    def set_type(self, type_name, content, save=True):
+        with self._lock:
+            self._data['types'][type_name] = content
+        self._on_changed(save)
+
+    def is_unsupported(self, type_name):
+        with self._lock:
+            return type_name in self._data['unsupported_types']
+
+    def set_unsupported(self, type_name, save=True):
+        with self._lock:
+            if type_name not in self._data['unsupported_types']:
+                self._data['unsupported_types'].append(type_name)
+        self._on_changed(save)
+
+    def get_metric_paths(self):
+        with self._lock:
+            return self._data['metric_paths']
+
+    def set_metric_paths(self, paths, save=True):
+        with self._lock:
+            self._data['metric_paths'] = list(paths)
+        self._on_changed(save)
+
+
+# the client is pickled with the instance cache, do not keep a lock in it
+_metadata_cache_lock = threading.Lock()
+
+
 class UnityClient(PerfManager):
     def __init__(self, ip, username, password, port=443, verify=False,
-                 retries=None, cache_interval=0):
+                 retries=None, cache_interval=0, session_cache=False,
+                 limiter=None, metadata_cache=False, identity_map=False,
+                 single_flight=False, circuit_breaker=None, lazy_parse=False,
+                 per_page=None, page_workers=1):
         super(UnityClient, self).__init__()
         self.ip = ip
         self._rest = UnityRESTConnector(ip, port=port, user=username,
                                         password=password,
                                         verify=verify,
                                         retries=retries,
-                                        cache_interval=cache_interval)
+                                        cache_interval=cache_interval,
+                                        session_cache=session_cache,
+                                        limiter=limiter,
+                                        single_flight=single_flight,
+                                        circuit_breaker=circuit_breaker)
         self._system_version = None
+        # number of threads used to retrieve the pages of a collection.
+        # pages are retrieved one by one if it's less than 2.
+        self.page_workers = page_workers
+        # entry count of each page, use the page size of the system if
+        # `None`.
+        self.per_page = per_page
+        # `True` to cache the type metadata under the local folder.  A
+        # `UnityMetadataCache` could also be specified.
+        self._metadata_cache_option = metadata_cache
+        self._metadata_cache = None
+        # `True` to keep only one instance of each resource retrieved by
+        # this client.
+        self.identity_map = IdentityMap() if identity_map else None
+        # `True` to keep the raw records of the resources and convert each
+        # property on the first access.
+        self.lazy_parse = lazy_parse
 
     @wrap_not_supported
     def get_all(self, type_name, base_fields=None, the_filter=None,
-                nested_fields=None):
+                nested_fields=None, per_page=None, page_workers=None):
         """Get the resource by resource id.
 
         :param nested_fields: nested resource fields
         :param base_fields: fields of this resource
         :param the_filter: dictionary of filter like `{'name': 'abc'}`
         :param type_name: Resource type. For example, pool, lun, nasServer.
+        :param per_page: entry count of each page.
+        :param page_workers: number of threads used to retrieve the pages
+            after the first one.
         :return: List of resource class objects
         """
         fields = self.get_fields(type_name, base_fields, nested_fields)
         the_filter = self.dict_to_filter_string(the_filter)
+        if per_page is None:
+            per_page = self.per_page
+        if page_workers is None:
+            page_workers = self.page_workers
+
+        url = '/api/types/{}/instances'.format(type_name)
+
+        if page_workers > 1:
+            ret = self._get_all_concurrently(url, fields, the_filter,
+                                             per_page, page_workers)
+        else:
+            ret = None
+            for resp in self._iter_pages(url, fields, the_filter, per_page):
+                if ret is None:
+                    ret = self._detach_entries(resp)
+                else:
+                    self._add_page(ret, resp)
+        return ret
+
+    @staticmethod
+    def _add_page(ret, resp):
+        # the error of the first page is returned to the caller.  entries
+        # of a failed page after it are missing, raise instead.
+        resp.raise_if_err()
+        ret.entries.extend(resp.entries)
+
+    @staticmethod
+    def _detach_entries(resp):
+        # the body of the first page might be shared with other callers
+        # through the response cache or the in-flight requests, copy the
+        # entries before extending them.
+        if 'entries' in resp.body:
+            resp.body = dict(resp.body, entries=list(resp.entries))
+        return resp
 
+    def iter_all(self, type_name, base_fields=None, the_filter=None,
+                 nested_fields=None, per_page=None):
+        """Iterate the pages of a collection.
+
+        Each page is retrieved only when the previous one is consumed, so
+        that only one page is kept in memory.
+
+        :param type_name: Resource type. For example, pool, lun, nasServer.
+        :param base_fields: fields of this resource
+        :param the_filter: dictionary of filter like `{'name': 'abc'}`
+        :param nested_fields: nested resource fields
+        :param per_page: entry count of each page.
+        :return: generator of `RestResponse`, one for each page
+        """
+        try:
+            fields = self.get_fields(type_name, base_fields, nested_fields)
+        except UnityResourceNotSupportedError:
+            return
+        the_filter = self.dict_to_filter_string(the_filter)
+        if per_page is None:
+            per_page = self.per_page
         url = '/api/types/{}/instances'.format(type_name)
+        try:
+            for resp in self._iter_pages(url, fields, the_filter, per_page):
+                yield resp
+        except UnityResourceNotSupportedError:
+            return
 
-        resp = self.rest_get(url, fields=fields, filter=the_filter)
-        ret = resp
-        while resp.has_next_page:
+    def _iter_pages(self, url, fields, the_filter, per_page, page=None):
+        while True:
             resp = self.rest_get(url, fields=fields, filter=the_filter,
-                                 page=resp.next_page)
-            ret.entries.extend(resp.entries)
+                                 per_page=per_page, page=page)
+            page = resp.next_page
+            yield resp
+            if page is None:
+                break
+
+    def _get_all_concurrently(self, url, fields, the_filter, per_page,
+                              page_workers):
+        resp = self.rest_get(url, fields=fields, filter=the_filter,
+                             per_page=per_page, with_entrycount=True)
+        ret = self._detach_entries(resp)
+        if not resp.has_next_page:
+            return ret
+
+        if per_page is None:
+            # use the page size of the system
+            per_page = len(resp.entries)
+        entry_count = resp.entry_count
+        if entry_count is None or per_page <= 0:
+            log.debug('entry count not available, retrieve the pages of {} '
+                      'one by one.'.format(url))
+            while resp.has_next_page:
+                resp = self.rest_get(url, fields=fields, filter=the_filter,
+                                     per_page=per_page, page=resp.next_page)
+                self._add_page(ret, resp)
+            return ret
+
+        page_count = int(math.ceil(float(entry_count) / per_page))
+        current_page = resp.current_page or 1
+        pages = list(range(current_page + 1, page_count + 1))
+        if pages:
+            def get_page(page):
+                return self.rest_get(url, fields=fields, filter=the_filter,
+                                     per_page=per_page, page=page)
+
+            pool = ThreadPool(min(page_workers, len(pages)))
+            try:
+                # `map` keeps the order of the pages
+                for page_resp in pool.map(get_page, pages):
+                    self._add_page(ret, page_resp)
+            finally:
+                pool.close()
+                pool.join()
+        return ret
+
+    # comparison operators of the rest filter.  `in` is translated to `eq`
+    # joined with `or`.
+    FILTER_OPERATORS = ('eq', 'ne', 'lt', 'le', 'gt', 'ge', 'lk', 'in')
+
+    @classmethod
+    def split_filter_key(cls, key):
+        """ split the filter key like `sizeTotal__gt` to label and operator.
+
+        :return: tuple of the label and the operator.  The operator is `eq`
+            if not specified.
+        """
+        label, sep, op = key.rpartition('__')
+        if not sep:
+            ret = key, 'eq'
+        elif op in cls.FILTER_OPERATORS:
+            ret = label, op
+        else:
+            raise ValueError('"{}" is not a valid filter operator, supported '
+                             'operators: {}.'.format(
+                                 op, ', '.join(cls.FILTER_OPERATORS)))
         return ret
 
     @classmethod
     def dict_to_filter_string(cls, the_filter):
-        def _get_non_list_value(k, v):
+        """ convert the dictionary to the rest filter string.
+
+        The keys could be suffixed with an operator like `sizeTotal__gt`.
+        List values are joined with `or`.
+
+        :param the_filter: dictionary like `{'name__lk': 'lun%'}`.
+        :return: filter string like `name lk "lun%"`.
+        """
+        def _get_non_list_value(k, v, op='eq'):
             if isinstance(v, six.string_types):
-                r = '{} eq "{}"'.format(k, v)
+                r = '{} {} "{}"'.format(k, op, v)
             elif isinstance(v, UnityEnum):
-                r = '{} eq {}'.format(k, v.value[0])
+                r = '{} {} {}'.format(k, op, v.value[0])
             elif isinstance(v, UnityResource):
-                r = '{} eq "{}"'.format(k, v.get_id())
+                r = '{} {} "{}"'.format(k, op, v.get_id())
             else:
-                r = '{} eq {}'.format(k, v)
+                r = '{} {} {}'.format(k, op, v)
             return r
 
         if the_filter:
@@ -102,14 +408,26 @@ class UnityClient(PerfManager):
                 value = the_filter[key]
                 if value is None:
                     continue
-                if isinstance(value, (list, tuple, UnityEnumList)):
-                    list_ret = ' or '.join([_get_non_list_value(key, item)
+                label, op = cls.split_filter_key(key)
+                if op == 'in' and not isinstance(
+                        value, (list, tuple, set, UnityEnumList)):
+                    value = [value]
+                if isinstance(value, (list, tuple, set, UnityEnumList)):
+                    if op not in ('eq', 'in'):
+                        raise ValueError('operator "{}" of {} does not '
+                                         'accept a list.'.format(op, label))
+                    list_ret = ' or '.join([_get_non_list_value(label, item)
                                             for item in value])
-                    items.append(list_ret)
+                    items.append((list_ret, len(value) > 1))
                 else:
-                    items.append(_get_non_list_value(key, value))
-            if items:
-                ret = ' and '.join(items)
+                    items.append((_get_non_list_value(label, value, op),
+                                  False))
+            if len(items) > 1:
+                # `and` takes precedence over `or`
+                ret = ' and '.join('({})'.format(item) if is_or else item
+                                   for item, is_or in items)
+            elif items:
+                ret = items[0][0]
             else:
                 ret = None
         else:
@@ -148,7 +466,121 @@ class UnityClient(PerfManager):
     @instance_cache
     def _get_type_resource(self, type_name):
         type_clz = storops.unity.resource.type_resource.UnityType
-        return type_clz(type_name, self)
+        ret = type_clz(type_name, self)
+        cache = self.metadata_cache
+        if cache is not None and type_name != 'type':
+            ret.update(self._get_type_content(cache, ret))
+        return ret
+
+    @staticmethod
+    def _get_type_content(cache, unity_type):
+        type_name = unity_type.get_id()
+        if cache.is_unsupported(type_name):
+            raise UnityResourceNotSupportedError('Resource is not supported.')
+        ret = cache.get_type(type_name)
+        if ret is None:
+            try:
+                # noinspection PyProtectedMember
+                ret = unity_type._get_raw_resource().first_content
+            except UnityResourceNotSupportedError:
+                cache.set_unsupported(type_name)
+                raise
+            cache.set_type(type_name, ret)
+        return ret
+
+    def _get_system_identity(self):
+        """ get the serial number and the software version of the array.
+
+        The fields are specified explicitly so that the type metadata is
+        not required.
+        """
+        resp = self.rest_get('/api/instances/system/0',
+                             fields=['serialNumber'])
+        resp.raise_if_err()
+        serial_number = resp.first_content.get('serialNumber')
+        resp = self.rest_get('/api/instances/basicSystemInfo/0',
+                             fields=['softwareVersion'])
+        resp.raise_if_err()
+        software_version = resp.first_content.get('softwareVersion')
+        return serial_number, software_version
+
+    @property
+    def metadata_cache(self):
+        """ the metadata cache or `None` if not enabled. """
+        option = self._metadata_cache_option
+        if not option:
+            return None
+        cache = self._metadata_cache
+        if cache is None:
+            if isinstance(option, UnityMetadataCache):
+                cache = option
+            else:
+                # retrieve outside of the lock, it's shared by all the
+                # clients of the process.
+                serial_number, version = self._get_system_identity()
+                cache = UnityMetadataCache(serial_number, version).load()
+            with _metadata_cache_lock:
+                if self._metadata_cache is None:
+                    self._metadata_cache = cache
+                    if self._system_version is None:
+                        self.set_system_version(cache.software_version)
+                cache = self._metadata_cache
+        return cache
+
+    @contextmanager
+    def metadata_batch(self):
+        """ save the metadata cache once after the types loaded in the
+        block.
+        """
+        cache = self.metadata_cache
+        if cache is None:
+            yield None
+        else:
+            with cache.batch():
+                yield cache
+
+    def get_metric_paths(self):
+        """ get the paths of all the metrics supported by the array. """
+        cache = self.metadata_cache
+        ret = None if cache is None else cache.get_metric_paths()
+        if ret is None:
+            clz = storops.unity.resource.metric.UnityMetricList
+            ret = sorted(m.path for m in clz(cli=self, fields=['path']))
+            if cache is not None:
+                cache.set_metric_paths(ret)
+        return ret
+
+    def warm_up_metadata(self, type_names=None):
+        """ populate the metadata cache in one pass.
+
+        The attributes of all the types are retrieved with one collection
+        query instead of one query for each type.
+
+        :param type_names: only cache these types if specified.
+        :return: the metadata cache.
+        """
+        cache = self.metadata_cache
+        if cache is None:
+            raise ValueError('metadata cache is not enabled.')
+        type_clz = storops.unity.resource.type_resource.UnityType
+        # noinspection PyProtectedMember
+        fields = type_clz._fields
+        found = set()
+        for resp in self._iter_pages('/api/types', fields, None, None):
+            resp.raise_if_err()
+            for content in resp.contents:
+                name = content.get('name')
+                if type_names is None or name in type_names:
+                    cache.set_type(name, content, save=False)
+                    found.add(name)
+        if type_names is not None:
+            for name in set(type_names) - found:
+                cache.set_unsupported(name, save=False)
+        clz = storops.unity.resource.metric.UnityMetricList
+        paths = sorted(m.path for m in clz(cli=self, fields=['path']))
+        cache.set_metric_paths(paths, save=False)
+        cache.save()
+        return cache
 
     def get_fields(self, type_name, base_fields=None, nested_fields=None):
         if base_fields is not None:
@@ -201,8 +633,14 @@ class UnityClient(PerfManager):
 
     def type_action(self, type_name, action, **kwargs):
         url = '/api/types/{}/action/{}'.format(type_name, action)
+        url_params = {}
+        if 'async' in kwargs:
+            async = kwargs['async']
+            del kwargs['async']
+            if async:
+                url_params['timeout'] = 0
         body = self.make_body(kwargs)
-        return self.rest_post(url, body)
+        return self.rest_post(url, body, **url_params)
 
     def delete(self, type_name, _id, **kwargs):
         url = '/api/instances/{}/{}'.format(type_name, _id)
@@ -244,6 +682,17 @@ class UnityClient(PerfManager):
             ret = value
         return ret
 
+    def get_stats(self):
+        """ get the statistics of the rest requests.
+
+        :return: dictionary of latency, size, retry and error statistics
+            keyed by `<method> <url template>`.
+        """
+        return self._rest.http_client.get_stats()
+
+    def reset_stats(self):
+        self._rest.http_client.reset_stats()
+
     def set_system_version(self, version):
         self._system_version = version
 
@@ -19,6 +19,11 @@ import logging
 import re
 import six
 
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
 from storops.lib.common import cache
 from storops.lib.parser import ParserConfigFactory, OutputParser
 
@@ -45,12 +50,20 @@ def get_unity_parser(name):
     return _factory_singleton.get(name)
 
 
+@cache
+def get_unity_list_clz(clz):
+    """ get the resource list class of the resource class. """
+    return _factory_singleton.get_resource_clz_by_name(
+        '{}List'.format(clz.__name__))
+
+
 class UnityRestParser(OutputParser):
     data_src = 'rest'
 
     def __init__(self):
         super(UnityRestParser, self).__init__()
         self.name = None
+        self._key_plan = None
 
     def parse_all(self, output, properties=None):
         try:
@@ -59,39 +72,132 @@ class UnityRestParser(OutputParser):
             pass
         return output
 
-    def parse(self, output, properties=None):
+    def parse(self, output, properties=None, lazy=False):
+        """ parse the record of the resource.
+
+        :param output: raw record or the rest response.
+        :param properties: preloaded properties of the resource.
+        :param lazy: True to keep the raw record and convert each property
+            on the first access.
+        :return: dictionary of the properties.
+        """
         try:
             output = output.first_content
         except AttributeError:
             pass
-        return self._parse_object(output, properties=None,
-                                  preloaded_props=properties)
+        if lazy and isinstance(output, dict):
+            ret = LazyParsedRecord(self, output, properties)
+        else:
+            ret = self._parse_object(output, properties=None,
+                                     preloaded_props=properties)
+        return ret
+
+    def _compile_plan(self, properties=None):
+        """ compile the steps to parse the properties.
+
+        :return: dictionary of the label to the key and the convert
+            function of the properties, so that only the labels in the
+            record are looked up.
+        """
+        ret = {}
+        plan = super(UnityRestParser, self)._compile_plan(properties)
+        for key, label, func in plan:
+            ret[label] = ret.get(label, ()) + ((key, func),)
+        return ret
 
     def _parse_object(self, obj, properties=None, preloaded_props=None):
+        if isinstance(obj, list):
+            log.error('cannot parse list: {}.  '
+                      'a list converter must be specified.'.format(obj))
+            return {}
         if properties is None:
-            properties = self.properties
+            plan = self.plan
+        else:
+            plan = self._compile_plan(properties)
+        if not isinstance(preloaded_props, NestedProperties):
+            preloaded_props = None
 
         ret = {}
-        for p in properties:
-            if isinstance(obj, list):
-                log.error('cannot parse list: {}.  '
-                          'a list converter must be specified.'.format(obj))
+        for label, raw in obj.items():
+            steps = plan.get(label)
+            if steps is None:
                 continue
-            if p.label in obj.keys():
-                value = p.convert(obj[p.label])
-                if preloaded_props is not None and isinstance(
-                        preloaded_props, NestedProperties):
-                    subtree = preloaded_props.get_child_subtree(p.key)
-                    if (subtree is not None and
-                            hasattr(value, 'set_preloaded_properties')):
-                        value.set_preloaded_properties(subtree)
-                ret[p.key] = value
+            for key, func in steps:
+                ret[key] = self._convert(key, func, raw, preloaded_props)
         return ret
 
+    @staticmethod
+    def _convert(key, func, raw, preloaded_props=None):
+        value = raw if func is None else func(raw)
+        if preloaded_props is not None:
+            subtree = preloaded_props.get_child_subtree(key)
+            if (subtree is not None and
+                    hasattr(value, 'set_preloaded_properties')):
+                value.set_preloaded_properties(subtree)
+        return value
+
+    @property
+    def key_plan(self):
+        """ dictionary of the key to the label and the convert function. """
+        plan = self.plan
+        if self._key_plan is None or self._key_plan[0] is not plan:
+            # rebuilt along with the plan when the properties change
+            ret = {}
+            for label, steps in plan.items():
+                for key, func in steps:
+                    ret[key] = (label, func)
+            self._key_plan = (plan, ret)
+        return self._key_plan[1]
+
     def init_from_config(self, config):
         self.name = config.name
 
 
+class LazyParsedRecord(Mapping):
+    """ properties of a raw record converted on the first access.
+
+    Converted values are kept so that each property is converted only once.
+    """
+
+    def __init__(self, parser, raw, preloaded_props=None):
+        self._parser = parser
+        self._raw = raw
+        if not isinstance(preloaded_props, NestedProperties):
+            preloaded_props = None
+        self._preloaded_props = preloaded_props
+        self._converted = {}
+
+    def __getitem__(self, key):
+        try:
+            return self._converted[key]
+        except KeyError:
+            pass
+        step = self._parser.key_plan.get(key)
+        if step is None or step[0] not in self._raw:
+            raise KeyError(key)
+        label, func = step
+        ret = self._parser._convert(key, func, self._raw[label],
+                                    self._preloaded_props)
+        self._converted[key] = ret
+        return ret
+
+    def __iter__(self):
+        plan = self._parser.plan
+        for label in self._raw:
+            for key, _ in plan.get(label, ()):
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __reduce__(self):
+        # converted when pickled, the parser is not kept
+        return dict, (dict(self),)
+
+    def __repr__(self):
+        return '<LazyParsedRecord {}>'.format(self._raw)
+
+
 class NestedProperty(object):
     def __init__(self, key):
         self.key = key
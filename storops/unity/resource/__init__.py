@@ -16,6 +16,11 @@
 from __future__ import unicode_literals
 
 import os
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+import six
+from six.moves.urllib.parse import quote
 
 from storops.exception import NoIndexException, UnityResourceNotFoundError, \
     UnityNameNotUniqueError, UnityActionNotAllowedError, \
@@ -23,7 +28,8 @@ from storops.exception import NoIndexException, UnityResourceNotFoundError, \
 from storops.lib.common import clear_instance_cache, instance_cache, \
     get_local_folder
 from storops.lib.metric import MetricsDumper
-from storops.lib.resource import Resource, ResourceList
+from storops.lib.resource import Resource, ResourceList, IdentityMap, \
+    ResourceRecord
 from storops.unity import parser
 from storops.unity.calculator import calculators
 from storops.unity.parser import NestedProperties
@@ -37,6 +43,8 @@ class UnityResource(Resource):
         self._id = _id
         self._cli = cli
         self._preloaded_properties = None
+        # keys of the properties retrieved if only part of them retrieved
+        self._loaded_fields = None
 
     @classmethod
     def _get_parser(cls):
@@ -94,6 +102,8 @@ class UnityResource(Resource):
         # Rest the preloaded the properties to the nested_properties after
         # fetching data from backend
         self.set_preloaded_properties(nested_obj)
+        # all the fields are retrieved
+        self._loaded_fields = None
         return res
 
     def _is_updated(self):
@@ -126,7 +136,9 @@ class UnityResource(Resource):
         return props
 
     def _parse_raw(self, data):
-        return self._get_parser().parse(data, self._preloaded_properties)
+        lazy = getattr(self._cli, 'lazy_parse', False) is True
+        return self._get_parser().parse(data, self._preloaded_properties,
+                                        lazy=lazy)
 
     def get_preloaded_prop_keys(self):
         # Returns the preloaded property keys of this object
@@ -140,11 +152,67 @@ class UnityResource(Resource):
         if item in self.metric_names():
             value = self.get_metric_value(item)
         else:
+            if self._is_partial(item):
+                self.update()
             value = super(UnityResource, self)._get_property_from_raw(item)
             if isinstance(value, UnityResource):
                 value.set_cli(self._cli)
+                value = value._merge_identity(fresh=False)
         return value
 
+    def _is_partial(self, item):
+        """ check if the property is not retrieved with the other fields. """
+        return (self._loaded_fields is not None and
+                self._parsed_resource is not None and
+                item not in self._loaded_fields and
+                item in self.property_names())
+
+    def set_loaded_fields(self, fields):
+        self._loaded_fields = fields
+
+    @clear_instance_cache
+    def _load_from(self, other):
+        """ take the properties retrieved by another instance. """
+        if other._loaded_fields is not None and self._is_updated():
+            # only part of the properties retrieved by the other one
+            parsed = dict(self._parsed_resource)
+            parsed.update(other._parsed_resource)
+            if self._loaded_fields is None:
+                loaded_fields = None
+            else:
+                loaded_fields = self._loaded_fields | other._loaded_fields
+        else:
+            parsed = other._parsed_resource
+            loaded_fields = other._loaded_fields
+        self._parsed_resource = parsed
+        self._loaded_fields = loaded_fields
+        self._preloaded_properties = other._preloaded_properties
+        self.set_cli(other._cli)
+
+    def update(self, data=None):
+        ret = super(UnityResource, self).update(data)
+        if data is None:
+            # keep the instance in the identity map up to date
+            self._merge_identity()
+        return ret
+
+    def _merge_identity(self, fresh=True):
+        """ merge this instance into the identity map of the client.
+
+        :param fresh: False if the properties are not retrieved along with
+            this instance, like the id of a related resource.
+        :return: the instance kept in the identity map, or this instance if
+            the identity map is not enabled.
+        """
+        identity_map = getattr(self._cli, 'identity_map', None)
+        if not isinstance(identity_map, IdentityMap):
+            return self
+        try:
+            _id = self.get_id()
+        except NoIndexException:
+            return self
+        return identity_map.merge(self, _id, fresh)
+
     def property_names(self):
         names = super(UnityResource, self).property_names()
         if self._cli is not None and self._cli.is_perf_metric_enabled(self):
@@ -179,7 +247,7 @@ class UnityResource(Resource):
     @classmethod
     def get(cls, cli, _id=None):
         if not isinstance(_id, cls):
-            ret = cls(_id=_id, cli=cli)
+            ret = cls(_id=_id, cli=cli)._merge_identity(fresh=False)
         else:
             ret = _id
         return ret
@@ -271,12 +339,94 @@ class UnityAttributeResource(UnityResource):
         raise '{} is not a independent resource.'.format(
             self.__class__.__name__)
 
+    def _merge_identity(self, fresh=True):
+        # attributes are not kept in the identity map
+        return self
+
 
 class UnityResourceList(UnityResource, ResourceList):
-    def __init__(self, cli=None, **the_filter):
+    def __init__(self, cli=None, fields=None, prefetch=None, compact=False,
+                 **the_filter):
+        """ create the list of resources.
+
+        :param cli: the unity client.
+        :param fields: properties to retrieve, like `['name', 'size_total']`
+            or `'id,name,sizeTotal'`.  Both the property names and the rest
+            labels are accepted.  Other properties of the resources are
+            retrieved on the first access.  All the properties are
+            retrieved if `None`.
+        :param prefetch: related resources to retrieve along with the list,
+            like `('pool', 'host_access.host')`.  Resources of each relation
+            are retrieved with `id` filters of a few requests instead of
+            one request for each resource on the first access.
+        :param compact: True to keep the resources as records with slots
+            instead of full resources to save memory.  A record is promoted
+            to the resource when an attribute other than the properties is
+            accessed.
+        :param the_filter: filter of the resources.
+        """
         UnityResource.__init__(self, cli=cli)
         ResourceList.__init__(self)
+        self.compact = compact
         self._rsc_filter = the_filter
+        self._fields = self._get_projection(fields)
+        self._prefetch = self._get_prefetch_paths(prefetch)
+        if self._fields is not None:
+            # the relations must be retrieved to prefetch them
+            _parser = self._get_parser()
+            for keys in self._prefetch:
+                self._fields.setdefault(
+                    keys[0], _parser.get_property_label(keys[0]))
+
+    @classmethod
+    def _get_projection(cls, fields):
+        """ get the property keys and the rest labels of the fields. """
+        if fields is None:
+            return None
+        if isinstance(fields, six.string_types):
+            fields = fields.split(',')
+        _parser = cls._get_parser()
+        ret = OrderedDict([('id', 'id')])
+        for field in fields:
+            field = field.strip()
+            label = _parser.get_property_label(field)
+            if label:
+                key = _parser.get_property(field).key
+            else:
+                key = _parser.get_property_key(field)
+                label = field
+            if not key:
+                raise ValueError(
+                    '"{}" is not a valid property of {}.'.format(
+                        field, cls.get_resource_class().__name__))
+            ret[key] = label
+        return ret
+
+    @classmethod
+    def _get_prefetch_paths(cls, prefetch):
+        """ get the property keys of each relation to prefetch. """
+        if prefetch is None:
+            return ()
+        if isinstance(prefetch, six.string_types):
+            prefetch = prefetch.split(',')
+        ret = []
+        for path in prefetch:
+            path = path.strip()
+            clz = cls.get_resource_class()
+            keys = []
+            for name in path.split('.'):
+                prop = clz._get_parser().get_property(name)
+                if prop is not None and prop.is_resource_list_clazz():
+                    clz = prop.converter.get_resource_class()
+                elif prop is not None and prop.is_resource_clazz():
+                    clz = prop.converter
+                else:
+                    raise ValueError(
+                        '"{}" is not a related resource of {}.'.format(
+                            path, cls.get_resource_class().__name__))
+                keys.append(prop.key)
+            ret.append(tuple(keys))
+        return tuple(ret)
 
     @classmethod
     def get_resource_class(cls):
@@ -289,17 +439,207 @@ class UnityResourceList(UnityResource, ResourceList):
 
     @clear_instance_cache
     def update(self, data=None):
-        ret = super(UnityResourceList, self).update(data)
+        ret = ResourceList.update(self, data)
+        loaded_fields = self._get_loaded_fields()
         for item in self._list:
-            item._cli = self._cli
+            if isinstance(item, ResourceRecord):
+                self._set_record_cli(item)
+            else:
+                item._cli = self._cli
+                item.set_loaded_fields(loaded_fields)
+        self._merge_identity()
+        self._prefetch_related(self._list)
+        return ret
+
+    def _merge_identity(self, fresh=True):
+        """ replace the resources with the ones in the identity map. """
+        if self._list is not None:
+            self._list = [item if isinstance(item, ResourceRecord)
+                          else item._merge_identity(fresh)
+                          for item in self._list]
+        return self
+
+    def _set_record_cli(self, record):
+        for value in record._to_dict().values():
+            if isinstance(value, UnityResource):
+                value.set_cli(self._cli)
+
+    def _is_loaded_field(self, key):
+        return self._fields is None or key in self._fields
+
+    def _promote(self, record):
+        ret = super(UnityResourceList, self)._promote(record)
+        ret.set_loaded_fields(self._get_loaded_fields())
+        return ret._merge_identity()
+
+    def _prefetch_related(self, items):
+        """ retrieve the related resources of the items in bulk.
+
+        For each level of each relation, the referenced resources not
+        retrieved yet are grouped by the resource class and retrieved with
+        `get_many`.  The results are set back to the referenced objects.
+        """
+        if not self._prefetch:
+            return
+        # the metadata of the related types is saved once
+        with self._cli.metadata_batch():
+            for keys in self._prefetch:
+                resources = items
+                for key in keys:
+                    related = []
+                    for rsc in resources:
+                        value = getattr(rsc, key)
+                        if isinstance(value, (list, tuple, ResourceList)):
+                            related.extend(value)
+                        elif value is not None:
+                            related.append(value)
+                    self._load_related(related)
+                    resources = related
+
+    def _load_related(self, resources):
+        to_load = OrderedDict()
+        for rsc in resources:
+            if isinstance(rsc, UnityAttributeResource) or rsc._is_updated():
+                # attributes are retrieved along with the owner resource
+                continue
+            by_id = to_load.setdefault(type(rsc), OrderedDict())
+            by_id.setdefault(rsc.get_id(), []).append(rsc)
+
+        for clz, by_id in to_load.items():
+            list_clz = parser.get_unity_list_clz(clz)
+            if list_clz is None:
+                # retrieved one by one on the first access
+                continue
+            found, _ = list_clz.get_many(self._cli, ids=list(by_id.keys()))
+            for _id, rsc in found.items():
+                for referenced in by_id[_id]:
+                    referenced._load_from(rsc)
+
+    def _get_loaded_fields(self):
+        if self._fields is None:
+            ret = None
+        else:
+            ret = frozenset(self._fields.keys())
         return ret
 
+    def _get_query_fields(self):
+        """ get the base fields and the nested properties to query. """
+        if self._fields is None:
+            base_fields = None
+            nested_obj = \
+                self.get_resource_class().build_nested_properties_obj()
+        else:
+            # only the specified fields, without the nested ones
+            base_fields = tuple(self._fields.values())
+            nested_obj = None
+        return base_fields, nested_obj
+
     def _get_raw_resource(self):
+        the_filter = self._get_rest_filter()
+        base_fields, nested_obj = self._get_query_fields()
+        nested_fields = nested_obj.query_fields if nested_obj else None
+        res = self._cli.get_all(
+            self.resource_class, base_fields=base_fields,
+            the_filter=the_filter, nested_fields=nested_fields)
+        self.set_preloaded_properties(nested_obj)
+        return res
+
+    def iter(self, per_page=None):
+        """ iterate the resources page by page.
+
+        Resources of a page are parsed and yielded as soon as the page is
+        retrieved.  Nothing is kept in this list, so the memory usage
+        depends on the page size instead of the size of the collection.
+        Related resources specified by `prefetch` are retrieved for each
+        page.
+
+        :param per_page: entry count of each page.
+        :return: generator of the resources.
+        """
+        for page in self._iter_page_contents(per_page):
+            items = [item._merge_identity() for _, item in page]
+            del page
+            self._prefetch_related(items)
+            for item in items:
+                yield item
+
+    def _iter_raw_pages(self, base_fields, nested_obj, per_page=None):
+        """ retrieve the raw contents page by page. """
+        nested_fields = nested_obj.query_fields if nested_obj else None
+        pages = self._cli.iter_all(
+            self.resource_class, base_fields=base_fields,
+            the_filter=self._get_rest_filter(),
+            nested_fields=nested_fields, per_page=per_page)
+        for page in pages:
+            contents = self._parse_raw(page)
+            # release the raw response before yielding the contents
+            del page
+            yield contents
+
+    def _build_item(self, content, nested_obj, loaded_fields):
+        item = self._get_resource_instance()
+        item.set_preloaded_properties(nested_obj)
+        item.update(content)
+        item.set_loaded_fields(loaded_fields)
+        return item
+
+    def _has_filter(self):
+        # the client side filter works on the resources
+        return type(self)._filter != UnityResourceList._filter
+
+    def _iter_page_contents(self, per_page=None):
+        """ retrieve the resources page by page.
+
+        :return: generator of the raw contents and the resources of each
+            page.
+        """
+        base_fields, nested_obj = self._get_query_fields()
+        loaded_fields = self._get_loaded_fields()
+        for contents in self._iter_raw_pages(base_fields, nested_obj,
+                                             per_page):
+            ret = []
+            for content in contents:
+                item = self._build_item(content, nested_obj, loaded_fields)
+                if self._filter(item):
+                    ret.append((content, item))
+            del contents
+            yield ret
+
+    def _get_watch_items(self):
+        """ get the raw contents of the resources to find the changes.
+
+        Only the `fields` of this list are retrieved if specified.  The raw
+        contents are compared so that the properties are not converted, and
+        no resource is built unless the list has a client side filter.
+        """
+        keys = {p.label: p.key for p in self._get_parser().properties}
+        has_filter = self._has_filter()
+        base_fields, nested_obj = self._get_query_fields()
+        loaded_fields = self._get_loaded_fields()
+        for contents in self._iter_raw_pages(base_fields, nested_obj):
+            for content in contents:
+                if has_filter and not self._filter(self._build_item(
+                        content, nested_obj, loaded_fields)):
+                    continue
+                fields = {keys.get(label, label): value
+                          for label, value in content.items()}
+                yield content.get('id'), fields, content
+
+    def _get_watch_resource(self, raw):
+        item = self._build_item(raw, self._get_query_fields()[1],
+                                self._get_loaded_fields())
+        return item._merge_identity()
+
+    def _get_rest_filter(self):
         the_filter = {}
         _parser = self._get_parser()
         for k, v in self._rsc_filter.items():
+            # if k is like size_total__gt for "sizeTotal gt XXX" rest filter
+            prop, sep, op = k.rpartition('__')
+            if not sep:
+                prop = k
             # if k is like host.id for "host.id eq XXX" rest filter
-            keys = k.split('.')
+            keys = prop.split('.')
             # ingore the left string after '.' since both are ok
             # 'host=<host_id> or {'host.id': <host_id>}'
             label = _parser.get_property_label(keys[0])
@@ -309,15 +649,24 @@ class UnityResourceList(UnityResource, ResourceList):
                         k, self.get_resource_class().__name__))
             # support {'host.id': <host_id>}
             if len(keys) == 2:
-                label = k
+                label = prop
+            if sep:
+                label = '{}__{}'.format(label, op)
             the_filter[label] = v
-        nested_obj = self.get_resource_class().build_nested_properties_obj()
-        nested_fields = nested_obj.query_fields if nested_obj else None
-        res = self._cli.get_all(
-            self.resource_class, the_filter=the_filter,
-            nested_fields=nested_fields)
-        self.set_preloaded_properties(nested_obj)
-        return res
+        the_filter.update(self._get_server_filter())
+        return the_filter
+
+    def _get_server_filter(self):
+        """ rest filter of the predicates checked in `_filter`.
+
+        Override it along with `_filter` so that the array filters the
+        resources instead of returning the whole collection.  `_filter`
+        still applies to the resources not retrieved with the rest filter.
+
+        :return: dictionary of the rest labels, with optional operator
+            suffix, to the values.
+        """
+        return {}
 
     def set_cli(self, cli):
         super(UnityResourceList, self).set_cli(cli)
@@ -333,6 +682,92 @@ class UnityResourceList(UnityResource, ResourceList):
             ret = cls.get_resource_class().get(cli=cli, _id=_id)
         return ret
 
+    # maximum length of the url-encoded filter of one request
+    MAX_FILTER_LENGTH = 2000
+
+    @classmethod
+    def get_many(cls, cli, ids=None, workers=1, max_filter_length=None,
+                 **keys):
+        """ get the resources of many ids or property values.
+
+        The keys are split into chunks.  Each chunk is retrieved with one
+        `or` filter like `id eq "a" or id eq "b"` instead of one request for
+        each key.
+
+        :param cli: the unity client.
+        :param ids: ids of the resources.
+        :param workers: number of threads used to retrieve the chunks.
+        :param max_filter_length: maximum length of the url-encoded filter
+            of each chunk.
+        :param keys: one property and its values if `ids` is not specified.
+            For example, `name=['a', 'b']`.
+        :return: tuple of an ordered dictionary mapping each key to its
+            resource and a list of the keys not found.
+        """
+        if ids is not None:
+            keys['id'] = ids
+        if len(keys) != 1:
+            raise ValueError('specify the ids or one property to get '
+                             '{}.'.format(cls.__name__))
+        prop, values = next(iter(keys.items()))
+        if not isinstance(values, (list, tuple, set)):
+            values = [values]
+        values = list(OrderedDict.fromkeys(values))
+        if max_filter_length is None:
+            max_filter_length = cls.MAX_FILTER_LENGTH
+
+        chunks = cls._split_keys(cli, prop, values, max_filter_length)
+
+        def get_chunk(chunk):
+            rsc_list = cls(cli=cli, **{prop: chunk})
+            rsc_list.update()
+            return list(rsc_list)
+
+        if workers > 1 and len(chunks) > 1:
+            pool = ThreadPool(min(workers, len(chunks)))
+            try:
+                results = pool.map(get_chunk, chunks)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = [get_chunk(chunk) for chunk in chunks]
+
+        by_key = {}
+        for rsc in (r for result in results for r in result):
+            key = rsc.get_id() if prop == 'id' else getattr(rsc, prop)
+            by_key.setdefault(key, rsc)
+        found = OrderedDict((v, by_key[v]) for v in values if v in by_key)
+        missing = [v for v in values if v not in by_key]
+        return found, missing
+
+    @classmethod
+    def _split_keys(cls, cli, prop, values, max_filter_length):
+        label = cls._get_parser().get_property_label(prop)
+        if not label:
+            raise ValueError('"{}" is not a valid property of {}.'.format(
+                prop, cls.get_resource_class().__name__))
+        # length of ' or ' after url-encoded
+        separator_length = len(quote(' or '))
+        chunks = []
+        chunk = []
+        length = 0
+        for value in values:
+            term_length = len(quote(
+                cli.dict_to_filter_string({label: value})))
+            if chunk and (length + separator_length + term_length >
+                          max_filter_length):
+                chunks.append(chunk)
+                chunk = []
+                length = 0
+            if chunk:
+                length += separator_length
+            chunk.append(value)
+            length += term_length
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
     @classmethod
     def get_list(cls, cli, value):
         if value is None:
@@ -48,6 +48,14 @@ class UnityDiskList(UnityResourceList):
             ret = item.inserted == self._inserted
         return ret
 
+    def _get_server_filter(self):
+        ret = {}
+        if self._inserted is True:
+            ret['rawSize__gt'] = 0
+        elif self._inserted is False:
+            ret['rawSize__le'] = 0
+        return ret
+
     @classmethod
     def get_resource_class(cls):
         return UnityDisk
@@ -471,6 +471,10 @@ class UnityHostInitiatorPathList(UnityResourceList):
                     and initiator_path.is_logged_in == self._is_logged_in)
         return ret
 
+    def _get_server_filter(self):
+        # the initiator type is still checked by `_filter`
+        return {'isLoggedIn': self._is_logged_in}
+
     @classmethod
     def get_resource_class(cls):
         return UnityHostInitiatorPath
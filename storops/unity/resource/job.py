@@ -15,6 +15,10 @@
 #    under the License.
 from __future__ import unicode_literals
 
+import logging
+import time
+from collections import OrderedDict
+
 import retryz
 from storops import exception as ex
 from storops.exception import get_rest_exception
@@ -28,6 +32,8 @@ from storops.unity import enums
 
 __author__ = 'Cedric Zhuang'
 
+log = logging.getLogger(__name__)
+
 
 class UnityJob(UnityResource):
     @classmethod
@@ -144,6 +150,80 @@ class UnityJobList(UnityResourceList):
     def get_resource_class(cls):
         return UnityJob
 
+    @classmethod
+    def wait_all(cls, cli, job_ids, timeout=3600, interval=1, max_interval=5,
+                 callback=None, clock=None, sleep=None):
+        """ wait for the completion of many jobs.
+
+        The pending jobs are polled together with `id` filters in each
+        round instead of one request for each job.  The interval starts
+        from `interval` and doubles while no job finishes, up to
+        `max_interval`.  It returns once all the jobs finish.
+
+        :param cli: the unity client.
+        :param job_ids: ids of the jobs or the jobs.
+        :param timeout: seconds to wait for all the jobs.
+        :param interval: minimum seconds between the polls.
+        :param max_interval: maximum seconds between the polls.
+        :param callback: function called with the job and the error once
+            the job finishes.  The error is `None` if the job completes,
+            or `JobStateError` if it fails.
+        :return: ordered dictionary mapping each id to its finished job,
+            or `None` if the job is not found.  Use `check_errors` of the
+            job to check if it fails.
+        """
+        clock = time.time if clock is None else clock
+        sleep = time.sleep if sleep is None else sleep
+        ids = [job.get_id() if isinstance(job, UnityJob) else job
+               for job in job_ids]
+        ret = OrderedDict((_id, None) for _id in ids)
+        pending = list(ret.keys())
+        deadline = clock() + timeout
+        wait = interval
+        while pending:
+            jobs, not_found = cls.get_many(cli, ids=pending)
+            finished = []
+            for _id, job in jobs.items():
+                try:
+                    done = job.check_errors()
+                    error = None
+                except ex.JobStateError as e:
+                    done = True
+                    error = e
+                if done:
+                    finished.append(_id)
+                    ret[_id] = job
+                    cls._notify(callback, job, error)
+            for _id in not_found:
+                # the job is removed before it is checked
+                finished.append(_id)
+                cls._notify(callback, UnityJob(_id=_id, cli=cli),
+                            ex.UnityResourceNotFoundError(
+                                'job {} not found.'.format(_id)))
+            if finished:
+                pending = [_id for _id in pending if _id not in finished]
+                wait = interval
+            if not pending:
+                break
+            remaining = deadline - clock()
+            if remaining <= 0:
+                raise ex.JobTimeoutException()
+            log.debug('{} of {} jobs pending, wait {} seconds.'.format(
+                len(pending), len(ret), wait))
+            sleep(min(wait, remaining))
+            if not finished:
+                wait = min(max_interval, wait * 2)
+        return ret
+
+    @staticmethod
+    def _notify(callback, job, error):
+        if callback is None:
+            return
+        try:
+            callback(job, error)
+        except Exception:
+            log.exception('callback of job {} failed.'.format(job.get_id()))
+
 
 class UnityJobTask(UnityAttributeResource):
     pass
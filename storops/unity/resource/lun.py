@@ -16,16 +16,20 @@
 from __future__ import unicode_literals
 
 import logging
+from collections import namedtuple, OrderedDict
+from multiprocessing.pool import ThreadPool
 
 import storops.unity.resource.pool
 from storops.exception import UnityBaseHasThinCloneError, \
-    UnityResourceNotFoundError
+    UnityResourceNotFoundError, UnityHostNotFoundException, \
+    JobTimeoutException
 from storops.lib.thinclone_helper import TCHelper
 from storops.lib.version import version
 from storops.unity.enums import TieringPolicyEnum, NodeEnum, \
     HostLUNAccessEnum, ThinCloneActionEnum
 from storops.unity.resource import UnityResource, UnityResourceList
-from storops.unity.resource.host import UnityHostList
+from storops.unity.resource.host import UnityHost, UnityHostList
+from storops.unity.resource.job import UnityJobList
 from storops.unity.resource.snap import UnitySnap, UnitySnapList
 from storops.unity.resource.sp import UnityStorageProcessor
 from storops.unity.resource.storage_resource import UnityStorageResource
@@ -35,6 +39,10 @@ __author__ = 'Jay Xu'
 
 log = logging.getLogger(__name__)
 
+LunCreateResult = namedtuple('LunCreateResult', ['spec', 'lun', 'error'])
+HostAccessResult = namedtuple('HostAccessResult',
+                              ['lun', 'modified', 'error'])
+
 
 class UnityLun(UnityResource):
     @classmethod
@@ -254,8 +262,11 @@ class UnityLun(UnityResource):
                      'skip modification.')
             return None
 
-        new_hosts = [UnityHostList.get(cli=self._cli, name=host_name)[0]
-                     for host_name in host_names]
+        hosts, missing = UnityHostList.get_many(self._cli, name=host_names)
+        if missing:
+            raise UnityHostNotFoundException(
+                'hosts not found: {}.'.format(missing))
+        new_hosts = list(hosts.values())
         new_access = [{'host': item,
                        'accessMask': HostLUNAccessEnum.PRODUCTION}
                       for item in new_hosts]
@@ -293,3 +304,182 @@ class UnityLunList(UnityResourceList):
     @classmethod
     def get_resource_class(cls):
         return UnityLun
+
+    @classmethod
+    def create_many(cls, cli, specs, concurrency=8, timeout=3600):
+        """ create many luns with asynchronous requests.
+
+        The `createLun` actions are submitted without waiting for the jobs,
+        `concurrency` requests at a time.  The jobs are then waited
+        together, and the created luns are retrieved by name with a few
+        filtered requests.  Failure of one lun does not stop the others.
+
+        :param cli: the unity client.
+        :param specs: parameters of `UnityLun.create` of each lun, like
+            `[{'name': 'lun1', 'pool': 'pool_1', 'size': 1024 ** 3}]`.
+        :param concurrency: number of the requests submitted at a time.
+        :param timeout: seconds to wait for all the jobs.
+        :return: list of `LunCreateResult` with the spec, the created lun
+            and the error of each spec, in the order of the specs.
+        """
+        specs = list(specs)
+        pool_clz = storops.unity.resource.pool.UnityPool
+        sr_type = UnityStorageResource().resource_class
+
+        def submit(spec):
+            try:
+                params = dict(spec)
+                params['pool'] = pool_clz.get(cli, params.get('pool'))
+                req_body = UnityLun._compose_lun_parameter(cli, **params)
+                resp = cli.type_action(sr_type, 'createLun', async=True,
+                                       **req_body)
+                resp.raise_if_err()
+                ret = resp.job.get_id(), None
+            except Exception as e:
+                log.error('failed to submit creation of lun {}: '
+                          '{}'.format(spec.get('name'), e))
+                ret = None, e
+            return ret
+
+        if not specs:
+            return []
+        pool = ThreadPool(max(1, min(concurrency, len(specs))))
+        try:
+            submitted = pool.map(submit, specs)
+        finally:
+            pool.close()
+            pool.join()
+
+        errors = {}
+
+        def on_finished(job, error):
+            errors[job.get_id()] = error
+
+        job_ids = [job_id for job_id, _ in submitted if job_id is not None]
+        try:
+            UnityJobList.wait_all(cli, job_ids, timeout=timeout,
+                                  callback=on_finished)
+        except JobTimeoutException as e:
+            for job_id in job_ids:
+                errors.setdefault(job_id, e)
+
+        names = [spec['name'] for spec, (job_id, _) in zip(specs, submitted)
+                 if job_id is not None and errors.get(job_id) is None]
+        luns = cls.get_many(cli, name=names)[0] if names else {}
+
+        ret = []
+        for spec, (job_id, error) in zip(specs, submitted):
+            lun = None
+            if error is None:
+                error = errors.get(job_id)
+            if error is None:
+                lun = luns.get(spec['name'])
+                if lun is None:
+                    error = UnityResourceNotFoundError(
+                        'lun {} not found after creation.'.format(
+                            spec['name']))
+            ret.append(LunCreateResult(spec, lun, error))
+        return ret
+
+    @classmethod
+    def set_host_access(cls, cli, mapping,
+                        access_mask=HostLUNAccessEnum.PRODUCTION,
+                        workers=8, retries=2):
+        """ set the hosts of many luns with the minimal modifications.
+
+        The host access of all the luns is retrieved with a few filtered
+        requests.  Only the luns whose host access differs from the mapping
+        are modified, `workers` luns at a time.  The luns failed to modify
+        are retrieved again and modified with their latest host access,
+        for example, when another client modified them in the meantime.
+
+        :param cli: the unity client.
+        :param mapping: dictionary of the lun or its id to the hosts which
+            should access the lun.  The hosts are a list of the hosts or
+            their ids, or a dictionary of the host to its access mask.  An
+            empty list detaches the lun from all the hosts.
+        :param access_mask: access mask of the hosts in a list.
+        :param workers: number of the luns modified at a time.
+        :param retries: times to retry the luns failed to modify.
+        :return: ordered dictionary of the lun id to `HostAccessResult`
+            with the lun, whether it is modified and the error.
+        """
+        desired = OrderedDict()
+        for lun, hosts in mapping.items():
+            if not isinstance(hosts, dict):
+                hosts = OrderedDict((host, access_mask) for host in hosts)
+            desired[cls._get_key(lun)] = OrderedDict(
+                (cls._get_key(host), mask) for host, mask in hosts.items())
+
+        ret = OrderedDict((lun_id, HostAccessResult(None, False, None))
+                          for lun_id in desired)
+        pending = list(desired.keys())
+        for attempt in range(retries + 1):
+            luns, not_found = cls.get_many(cli, ids=pending)
+            for lun_id in not_found:
+                ret[lun_id] = HostAccessResult(
+                    None, False, UnityResourceNotFoundError(
+                        'lun {} not found.'.format(lun_id)))
+            to_modify = []
+            for lun_id, lun in luns.items():
+                if cls._get_host_masks(lun) == desired[lun_id]:
+                    ret[lun_id] = HostAccessResult(
+                        lun, ret[lun_id].modified, None)
+                else:
+                    to_modify.append(lun)
+            if not to_modify:
+                break
+
+            def modify(lun):
+                hosts = desired[lun.get_id()]
+                added = set(hosts) - set(cls._get_host_masks(lun))
+                try:
+                    lun.modify(host_access=[
+                        {'host': UnityHost.get(cli, host_id),
+                         'accessMask': mask}
+                        for host_id, mask in hosts.items()])
+                    if added:
+                        TCHelper.notify(lun, ThinCloneActionEnum.LUN_ATTACH)
+                    error = None
+                except Exception as e:
+                    log.warning('failed to modify host access of lun {}: '
+                                '{}'.format(lun.get_id(), e))
+                    error = e
+                return lun, error
+
+            pool = ThreadPool(max(1, min(workers, len(to_modify))))
+            try:
+                results = pool.map(modify, to_modify)
+            finally:
+                pool.close()
+                pool.join()
+
+            pending = []
+            for lun, error in results:
+                ret[lun.get_id()] = HostAccessResult(
+                    lun, error is None, error)
+                if error is not None:
+                    pending.append(lun.get_id())
+            if not pending:
+                break
+            if attempt < retries:
+                log.info('retry to modify host access of luns: '
+                         '{}.'.format(pending))
+        return ret
+
+    @staticmethod
+    def _get_key(rsc):
+        if isinstance(rsc, UnityResource):
+            ret = rsc.get_id()
+        else:
+            ret = rsc
+        return ret
+
+    @staticmethod
+    def _get_host_masks(lun):
+        if lun.host_access:
+            ret = {access.host.get_id(): access.access_mask
+                   for access in lun.host_access}
+        else:
+            ret = {}
+        return ret
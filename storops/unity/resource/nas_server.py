@@ -161,6 +161,10 @@ class UnityNasServerList(UnityResourceList):
             ret &= nas_server.current_sp.get_id() == self._current_sp_id
         return ret
 
+    def _get_server_filter(self):
+        return {'homeSP.id': self._home_sp_id,
+                'currentSP.id': self._current_sp_id}
+
     @classmethod
     def get_resource_class(cls):
         return UnityNasServer
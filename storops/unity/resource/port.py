@@ -31,6 +31,15 @@ __author__ = 'Jay Xu'
 LOG = logging.getLogger(__name__)
 
 
+def _get_port_ids_filter(label, port_ids):
+    if port_ids:
+        ret = {'{}__in'.format(label): port_ids}
+    else:
+        # nothing to push down for the empty list, `_filter` handles it
+        ret = {}
+    return ret
+
+
 class UnityIpPort(UnityResource):
     def set_mtu(self, mtu):
         port = self.get_physical_port()
@@ -88,6 +97,9 @@ class UnityFcPortList(UnityResourceList):
             ret &= fc_port.get_id() in self._port_ids
         return ret
 
+    def _get_server_filter(self):
+        return _get_port_ids_filter('id', self._port_ids)
+
     @classmethod
     def get_resource_class(cls):
         return UnityFcPort
@@ -242,6 +254,9 @@ class UnityIscsiPortalList(UnityResourceList):
             ret &= iscsi_portal.ethernet_port.get_id() in self._port_ids
         return ret
 
+    def _get_server_filter(self):
+        return _get_port_ids_filter('ethernetPort.id', self._port_ids)
+
     @classmethod
     def get_resource_class(cls):
         return UnityIscsiPortal
@@ -308,6 +323,9 @@ class UnityEthernetPortList(UnityResourceList):
             ret &= ethernet_port.get_id() in self._port_ids
         return ret
 
+    def _get_server_filter(self):
+        return _get_port_ids_filter('id', self._port_ids)
+
     @classmethod
     def get_resource_class(cls):
         return UnityEthernetPort
@@ -157,13 +157,12 @@ class UnityConsistencyGroup(UnityResource):
 class UnityConsistencyGroupList(UnityResourceList):
     type_cg = enums.StorageResourceTypeEnum.CONSISTENCY_GROUP
 
-    def __init__(self, **the_filter):
-        the_filter['type'] = self.type_cg
-        super(UnityConsistencyGroupList, self).__init__(**the_filter)
-
     @classmethod
     def get_resource_class(cls):
         return UnityConsistencyGroup
 
     def _filter(self, item):
         return item.type == self.type_cg
+
+    def _get_server_filter(self):
+        return {'type': self.type_cg}
@@ -60,12 +60,24 @@ LOG = logging.getLogger(__name__)
 class UnitySystem(UnitySingletonResource):
     def __init__(self, host=None, username=None, password=None,
                  port=443, cli=None, verify=False, retries=None,
-                 cache_interval=0):
+                 cache_interval=0, session_cache=False, limiter=None,
+                 metadata_cache=False, identity_map=False,
+                 single_flight=False, circuit_breaker=None, lazy_parse=False,
+                 per_page=None, page_workers=1):
         super(UnitySystem, self).__init__(cli=cli)
         if cli is None:
             self._cli = UnityClient(host, username, password, port,
                                     verify=verify, retries=retries,
-                                    cache_interval=cache_interval)
+                                    cache_interval=cache_interval,
+                                    session_cache=session_cache,
+                                    limiter=limiter,
+                                    metadata_cache=metadata_cache,
+                                    identity_map=identity_map,
+                                    single_flight=single_flight,
+                                    circuit_breaker=circuit_breaker,
+                                    lazy_parse=lazy_parse,
+                                    per_page=per_page,
+                                    page_workers=page_workers)
         else:
             self._cli = cli
 
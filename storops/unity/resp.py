@@ -15,6 +15,8 @@
 #    under the License.
 from __future__ import unicode_literals
 
+import re
+
 from storops.exception import get_rest_exception
 from storops.unity.resource import health
 from storops.unity.resource import job
@@ -56,6 +58,10 @@ class RestResponse(object):
     def entries(self):
         return self.body.get('entries', [])
 
+    @property
+    def entry_count(self):
+        return self.body.get('entryCount')
+
     @property
     def first_content(self):
         contents = self.contents
@@ -101,9 +107,10 @@ class RestResponse(object):
             if page_link:
                 href = page_link[0].get('href')
                 if href:
-                    items = href.split('=')
-                    if len(items) > 1:
-                        ret = int(items[1])
+                    # href is like "&page=2" or "&per_page=100&page=2"
+                    matched = re.search(r'(?:^|[?&])page=(\d+)', href)
+                    if matched:
+                        ret = int(matched.group(1))
         return ret
 
     @property
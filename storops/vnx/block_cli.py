@@ -17,6 +17,7 @@ from __future__ import unicode_literals
 
 import functools
 import logging
+import threading
 from multiprocessing.pool import ThreadPool
 
 import six
@@ -25,9 +26,12 @@ from retryz import retry
 import storops.vnx.resource.system
 from storops import exception as ex
 from storops.exception import OptionMissingError
+from storops.lib.circuit_breaker import CircuitBreaker, full_jitter
+from storops.lib.limiter import get_array_limiter
 from storops.lib.common import check_int, text_var, int_var, enum_var, \
     yes_no_var, list_var
 from storops.lib.metric import PerfManager
+from storops.lib.resource import IdentityMap
 from storops.vnx.enums import VNXSPEnum, VNXTieringEnum, VNXProvisionEnum, \
     VNXMigrationRate, VNXCompressionRate, \
     VNXMirrorViewRecoveryPolicy, VNXMirrorViewSyncRate, VNXLunType, \
@@ -90,10 +94,27 @@ def duel_command(f):
     return func_wrapper
 
 
+# number of tries of the command running in the current thread
+_tries = threading.local()
+
+
+def _is_sp_down_error(e):
+    return isinstance(e, ex.VNXSPDownError)
+
+
+def _is_sp_overloaded(_, error):
+    return isinstance(error, (ex.VNXSPDownError, ex.VNXDropConnectionError))
+
+
+def _sp_down_wait(tried):
+    return full_jitter(tried, base=0.5, cap=8)
+
+
 class CliClient(PerfManager):
     def __init__(self, ip=None, username=None, password=None, scope=None,
                  sec_file=None, timeout=None, heartbeat_interval=None,
-                 naviseccli=None):
+                 naviseccli=None, limiter=None, identity_map=False,
+                 single_flight=False, circuit_breaker=False):
         super(CliClient, self).__init__()
         if heartbeat_interval is None:
             heartbeat_interval = 60
@@ -106,9 +127,20 @@ class CliClient(PerfManager):
             sec_file=sec_file,
             interval=heartbeat_interval,
             timeout=timeout,
-            naviseccli=naviseccli)
+            naviseccli=naviseccli,
+            single_flight=single_flight)
         self._heart_beat.add(VNXSPEnum.SP_A, ip)
         self._system_version = None
+        # True to fail fast on an sp which keeps failing.  It raises
+        # `CircuitBreakerOpenError` instead of `VNXSPDownError`.
+        self._circuit_breaker = circuit_breaker
+        self._breakers = {}
+        self._breakers_lock = threading.Lock()
+        # True to share the limiter of each sp with the other clients
+        self._limiter = limiter
+        # True to keep only one instance of each resource retrieved by this
+        # client.
+        self.identity_map = IdentityMap() if identity_map else None
 
     def persist_rsc_list_metrics(self):
         persist_rsc_list = self.get_persist_rsc_list()
@@ -1031,21 +1063,62 @@ class CliClient(PerfManager):
     def ip(self):
         return self._heart_beat.get_alive_sp_ip()
 
-    @retry(on_error=ex.VNXSPDownError)
+    def get_circuit_breaker(self, ip):
+        if not self._circuit_breaker:
+            return None
+        with self._breakers_lock:
+            ret = self._breakers.get(ip)
+            if ret is None:
+                ret = CircuitBreaker(
+                    ip, error_filter=_is_sp_down_error)
+                self._breakers[ip] = ret
+        return ret
+
     def execute(self, params, ip=None):
+        _tries.count = 0
+        try:
+            return self._execute_with_retries(params, ip)
+        finally:
+            if _tries.count > 1:
+                self._heart_beat.telemetry.record_retry(
+                    self._heart_beat.get_verb(params), _tries.count - 1)
+
+    @retry(on_error=ex.VNXSPDownError, wait=_sp_down_wait)
+    def _execute_with_retries(self, params, ip=None):
         if params is not None and len(params) > 0:
             if ip is None:
                 ip = self.ip
-            output = self.do(ip, params)
+            breaker = self.get_circuit_breaker(ip)
+            if breaker is None:
+                output = self.do(ip, params)
+            else:
+                # stop retrying an sp which keeps failing
+                output = breaker.call(self.do, ip, params)
         else:
             log.info('no command to execute.  return empty.')
             output = ''
         return output
 
+    def get_limiter(self, ip):
+        if self._limiter is True:
+            ret = get_array_limiter(ip)
+        elif self._limiter is False:
+            ret = None
+        else:
+            ret = self._limiter
+        return ret
+
     @retry(on_error=ex.VNXDropConnectionError)
     def do(self, ip, params):
+        _tries.count = getattr(_tries, 'count', 0) + 1
         cmd = self._heart_beat.get_cmd_prefix(ip) + params
-        return self._heart_beat.execute_cmd(ip, cmd)
+        limiter = self.get_limiter(ip)
+        if limiter is None:
+            ret = self._heart_beat.execute_cmd(ip, cmd)
+        else:
+            ret = limiter.call(_is_sp_overloaded,
+                               self._heart_beat.execute_cmd, ip, cmd)
+        return ret
 
     def execute_dual(self, params):
         ip_list = self._heart_beat.get_all_alive_sps_ip()
@@ -1060,6 +1133,17 @@ class CliClient(PerfManager):
             output = pool.map(lambda ip: self.do(ip, params), ip_list)
         return tuple(output)
 
+    def get_stats(self):
+        """ get the statistics of the naviseccli commands.
+
+        :return: dictionary of latency, size, retry and error statistics
+            keyed by the verb of the command like `lun -list`.
+        """
+        return self._heart_beat.telemetry.get_stats()
+
+    def reset_stats(self):
+        self._heart_beat.telemetry.reset()
+
     def set_system_version(self, version):
         self._system_version = version
 
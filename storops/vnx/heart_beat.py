@@ -135,11 +135,13 @@ class NodeInfoMap(object):
 
 class NodeHeartBeat(NaviCommand):
     def __init__(self, username=None, password=None, scope=0,
-                 sec_file=None, interval=60, timeout=30, naviseccli=None):
+                 sec_file=None, interval=60, timeout=30, naviseccli=None,
+                 single_flight=False):
         super(NodeHeartBeat, self).__init__(username, password, scope,
                                             sec_file=sec_file,
                                             timeout=timeout,
-                                            naviseccli=naviseccli)
+                                            naviseccli=naviseccli,
+                                            single_flight=single_flight)
         self._node_map = NodeInfoMap()
         self._interval = interval
         self._heartbeat_thread = None
@@ -222,7 +224,13 @@ class NodeHeartBeat(NaviCommand):
         if not self.is_credential_valid:
             raise ex.VNXCredentialError(
                 'cannot authenticate with user {}.'.format(self._username))
-        out = self.execute_naviseccli(cmd)
+        verb = self.get_verb(cmd[1:])
+        try:
+            out = self.execute_naviseccli(cmd)
+        except ex.NaviseccliNotAvailableError as e:
+            self.telemetry.record(verb, time() - start, error=e)
+            raise
+        size = len(out) if out is not None else 0
         try:
             ex.check_error(out,
                            ex.VNXSpNotAvailableError,
@@ -230,13 +238,19 @@ class NodeHeartBeat(NaviCommand):
                            ex.VNXDropConnectionError)
             available = True
             latency = time() - start
-        except ex.VNXSpNotAvailableError:
+            self.telemetry.record(verb, latency, size)
+        except ex.VNXSpNotAvailableError as e:
             log.exception('{} is not available.  detail: {}'.format(ip, out))
+            self.telemetry.record(verb, time() - start, size, error=e)
             available = False
             latency = None
-        except ex.VNXCredentialError:
+        except ex.VNXCredentialError as e:
+            self.telemetry.record(verb, time() - start, size, error=e)
             self._is_credential_valid = False
             raise
+        except ex.VNXDropConnectionError as e:
+            self.telemetry.record(verb, time() - start, size, error=e)
+            raise
 
         self.update_by_ip(ip, available, False, latency)
         self.command_count += 1
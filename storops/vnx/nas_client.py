@@ -18,6 +18,7 @@ from __future__ import unicode_literals
 import functools
 import logging
 import re
+from collections import OrderedDict
 
 import six
 from retryz import retry
@@ -107,6 +108,41 @@ class VNXNasConnections(object):
 
         return response
 
+    @retry(on_error=VNXLockRequiredException)
+    def request_batch(self, reqs):
+        """ send several queries in one request packet.
+
+        :param reqs: request packets of the queries.
+        :return: list of `NasXmlResponse`, one for each query in order.
+        """
+        req_xml = self._get_req_xml(NasXmlBuilder.batch_query_package(reqs))
+        log.debug('batch request: \n{}'.format(req_xml))
+
+        rsp_xml = self.xml_connector.post(req_xml)
+
+        if isinstance(rsp_xml, tuple):
+            rsp_xml = rsp_xml[1]
+        log.debug('batch response: \n{}'.format(rsp_xml))
+
+        NasXmlResponse._check_credential_error(rsp_xml)
+        results = self.xml_parser.parse_all(rsp_xml)
+        if len(results) == 1 and len(reqs) > 1:
+            # the whole packet failed, like a fault
+            results = results * len(reqs)
+        elif len(results) != len(reqs):
+            raise VNXException(
+                'expect {} responses for the batched queries, got {}.'.format(
+                    len(reqs), len(results)))
+
+        ret = [NasXmlResponse(result) for result in results]
+        for response in ret:
+            if response.is_error():
+                messages = response.problem_messages
+                for to_match, to_raise in self.retry_patterns:
+                    if re.search(to_match, messages):
+                        raise to_raise
+        return ret
+
     def request(self, req, check_object=False, check_invalid_data_mover=False,
                 error_desc=None, retry_patterns=None):
         response = self._request(req, retry_patterns)
@@ -191,6 +227,24 @@ class VNXNasClient(VNXNasConnections):
     def get_mover(self, mover_id=None, full=True):
         return NasXmlBuilder.get_mover(mover_id, full)
 
+    def get_nas_inventory(self):
+        """ get the nas objects with one request.
+
+        :return: dictionary of `NasXmlResponse`, keyed by the name of the
+            getter, `mover` (with the interfaces), `vdm`, `filesystem`,
+            `fs_snap`, `fs_mp`, `mover_host` and `nas_pool`.
+        """
+        queries = OrderedDict((
+            ('mover', NasXmlBuilder.get_mover()),
+            ('vdm', NasXmlBuilder.get_vdm()),
+            ('filesystem', NasXmlBuilder.get_filesystem()),
+            ('fs_snap', NasXmlBuilder.get_fs_snap()),
+            ('fs_mp', NasXmlBuilder.get_fs_mp()),
+            ('mover_host', NasXmlBuilder.get_mover_host()),
+            ('nas_pool', NasXmlBuilder.get_nas_pool())))
+        responses = self.request_batch(list(queries.values()))
+        return OrderedDict(zip(queries.keys(), responses))
+
     @xml_set_request
     def create_dns_domain(self, mover_id, domain_name, servers,
                           protocol='udp'):
@@ -24,7 +24,9 @@ from subprocess import Popen, PIPE
 import time
 
 import storops.exception as ex
-from storops.lib.common import int_var, text_var, synchronized, cache, daemon
+from storops.lib.common import int_var, text_var, synchronized, cache, \
+    daemon, SingleFlight
+from storops.lib.telemetry import Telemetry
 
 __author__ = 'Cedric Zhuang'
 
@@ -33,7 +35,8 @@ log = logging.getLogger(__name__)
 
 class NaviCommand(object):
     def __init__(self, username=None, password=None, scope=0,
-                 sec_file=None, timeout=None, naviseccli=None):
+                 sec_file=None, timeout=None, naviseccli=None,
+                 single_flight=False):
         self._username = username
         self._password = password
         self._scope = scope
@@ -41,6 +44,13 @@ class NaviCommand(object):
         self._timeout = timeout
         self._customized_cli = naviseccli
         self._is_credential_valid = True
+        self.telemetry = Telemetry()
+        # identical read-only commands running at the same time share the
+        # output of one naviseccli process.
+        self._single_flight = SingleFlight() if single_flight else None
+        # number of the finished modify commands.  a read-only command does
+        # not join the one started before the last modification.
+        self._write_count = 0
 
     MAX_TIMEOUT = 1800
     MIN_TIMEOUT = 3
@@ -122,11 +132,83 @@ class NaviCommand(object):
         binary = self._binary()
         return [binary, '-h', ip] + self.get_credentials()
 
+    _read_only_options = ('-list', '-info', '-get', '-status', '-query')
+
+    _modify_options = ('-create', '-destroy', '-delete', '-modify', '-set',
+                       '-add', '-remove', '-expand', '-attach', '-detach',
+                       '-start', '-stop', '-cancel', '-bind', '-unbind',
+                       '-connecthost', '-disconnecthost', '-addhlu',
+                       '-removehlu', '-promote', '-fracture', '-sync',
+                       '-restore', '-rollback', '-copy')
+
+    _value_options = ('-h', '-user', '-password', '-scope', '-secfilepath',
+                      '-t')
+
+    @classmethod
+    def _get_args(cls, params):
+        args = []
+        skip_next = False
+        for arg in params:
+            arg = six.text_type(arg).lower()
+            if skip_next:
+                skip_next = False
+            elif arg in cls._value_options:
+                # skip the ip and the credentials
+                skip_next = True
+            else:
+                args.append(arg)
+        return args
+
     @classmethod
-    def execute_naviseccli(cls, cmd):
+    def get_verb(cls, params):
+        """ get the verb of the command like `lun -list`.
+
+        :param params: the command without the binary.
+        :return: the object and the first option of the command.
+        """
+        args = cls._get_args(params)
+        for i, arg in enumerate(args):
+            if not arg.startswith('-'):
+                ret = arg
+                if i + 1 < len(args) and args[i + 1].startswith('-'):
+                    ret = '{} {}'.format(arg, args[i + 1])
+                break
+        else:
+            ret = ' '.join(args)
+        return ret
+
+    @classmethod
+    def is_read_only(cls, cmd):
+        """ check whether the naviseccli command only retrieves data.
+
+        :param cmd: the full command including the binary and credentials.
+        :return: True if the command does not modify the array.
+        """
+        args = cls._get_args(cmd[1:])
+
+        if any(arg in cls._modify_options or arg.startswith('-set')
+               for arg in args):
+            ret = False
+        else:
+            ret = any(arg in cls._read_only_options or
+                      arg.startswith('get') or
+                      arg.startswith('-get')
+                      for arg in args)
+        return ret
+
+    def execute_naviseccli(self, cmd):
         cmd = list(map(six.text_type, cmd))
         try:
-            ret = cls.execute(cmd)
+            if not self.is_read_only(cmd):
+                try:
+                    ret = self.execute(cmd)
+                finally:
+                    self._write_count += 1
+            elif self._single_flight is not None:
+                key = (tuple(cmd), self._write_count)
+                ret = self._single_flight.do(key, self.execute, cmd)
+            else:
+                ret = self.execute(cmd)
         except OSError:
             raise ex.NaviseccliNotAvailableError()
         return ret
@@ -89,31 +89,45 @@ class VNXCliParser(OutputParser):
             instances = [output]
         return instances
 
+    def _compile_plan(self, properties=None):
+        """ compile the steps to parse the properties.
+
+        :return: list of the key, the compiled pattern, the convert function
+            and the index flag of each property.
+        """
+        if properties is None:
+            properties = self.properties
+        return [(p.key, p.pattern, p.get_convert_func(), p.is_index)
+                for p in properties]
+
     def parse_single(self, output, properties=None):
         if isinstance(output, six.string_types):
             output = output.strip()
             ret = Dict()
 
             if properties is None:
-                properties = self.properties
+                plan = self.plan
+            else:
+                plan = self._compile_plan(properties)
 
-            for p in properties:
-                matched = re.search(p.pattern, output)
+            for key, pattern, func, is_index in plan:
+                matched = pattern.search(output)
 
                 matched_value = None
                 if matched is not None:
-                    if len(matched.groups()) == 1:
-                        value = matched.group(1)
-                        value = value.strip()
+                    groups = matched.groups()
+                    if len(groups) == 1:
+                        value = groups[0].strip()
                     else:
-                        value = matched.groups()
-                    value = p.convert(value)
+                        value = groups
+                    if func is not None:
+                        value = func(value)
                     matched_value = value
-                elif p.is_index:
+                elif is_index:
                     # index must have a match, skip this invalid input
                     ret = Dict()
                     break
-                ret[p.key] = matched_value
+                ret[key] = matched_value
         else:
             ret = output
         return ret
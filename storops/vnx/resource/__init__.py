@@ -22,7 +22,8 @@ from storops.exception import VNXPerMonNotEnabledError
 from storops.lib.common import instance_cache, clear_instance_cache, \
     get_local_folder
 from storops.lib.metric import MetricsDumper
-from storops.lib.resource import Resource, ResourceList
+from storops.lib.resource import Resource, ResourceList, IdentityMap, \
+    ResourceRecord
 from storops.vnx.calculator import calculators
 from storops.vnx.parsers import get_vnx_parser
 
@@ -94,7 +95,32 @@ class VNXCliResource(VNXResource):
     @instance_cache
     def _get_resource_property(self, value):
         value.set_cli(self._cli)
-        return value
+        return value._merge_identity(fresh=False)
+
+    def _merge_identity(self, fresh=True):
+        """ merge this instance into the identity map of the client.
+
+        :param fresh: False if the properties are not retrieved along with
+            this instance, like the properties of a related resource.
+        :return: the instance kept in the identity map, or this instance if
+            the identity map is not enabled.
+        """
+        identity_map = getattr(self._cli, 'identity_map', None)
+        if not isinstance(identity_map, IdentityMap):
+            return self
+        parser = self._get_parser()
+        index = None if parser is None else parser.index_property
+        if index is None or self._parsed_resource is None:
+            return self
+        key = self._parsed_resource.get(index.key)
+        if key is None:
+            return self
+        return identity_map.merge(self, key, fresh)
+
+    @clear_instance_cache
+    def _load_from(self, other):
+        super(VNXCliResource, self)._load_from(other)
+        self.timestamp = other.timestamp
 
     def set_cli(self, cli):
         if cli is not None:
@@ -195,7 +221,8 @@ class VNXCliResourceList(VNXCliResource, ResourceList):
         self._poll = value
         if self._is_updated():
             for item in self:
-                item.poll = self._poll
+                if not isinstance(item, ResourceRecord):
+                    item.poll = self._poll
 
     def _get_resource_instance(self):
         clz = self.get_resource_class()
@@ -209,11 +236,35 @@ class VNXCliResourceList(VNXCliResource, ResourceList):
     @clear_instance_cache
     def update(self, data=None):
         ret = super(VNXCliResourceList, self).update(data)
+        self._list = [item._merge_identity() if isinstance(
+            item, VNXCliResource) else item for item in self._list]
         for item in self._list:
-            item._cli = self._cli
-            item.poll = self.poll
+            if isinstance(item, ResourceRecord):
+                self._set_record_cli(item)
+            else:
+                item._cli = self._cli
+                item.poll = self.poll
         return ret
 
+    def _set_record_cli(self, record):
+        for value in record._to_dict().values():
+            if isinstance(value, VNXCliResource):
+                value.set_cli(self._cli)
+
+    def _promote(self, record):
+        ret = super(VNXCliResourceList, self)._promote(record)
+        ret.timestamp = self.timestamp
+        return ret
+
+    def _get_watch_items(self):
+        """ get the parsed properties of the resources to find the changes.
+
+        The resources are keyed by the index property.
+        """
+        self.update()
+        for item in self._list:
+            yield item.get_index(), item.parsed_resource, item
+
     def set_cli(self, cli):
         super(VNXCliResourceList, self).set_cli(cli)
         for item in self:
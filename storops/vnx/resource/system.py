@@ -77,7 +77,9 @@ class VNXSystem(VNXCliResource):
                  timeout=None,
                  heartbeat_interval=None,
                  naviseccli=None,
-                 file_username=None, file_password=None, node_name=None):
+                 file_username=None, file_password=None, node_name=None,
+                 limiter=None, identity_map=False, single_flight=False,
+                 circuit_breaker=False):
         """ initialize a `VNXSystem` instance
 
         The `VNXSystem` instance act as a entry point for all
@@ -98,6 +100,15 @@ class VNXSystem(VNXCliResource):
         password
         :param node_name: name of the domain node from where address of control
         station should be taken, if omitted, serial will be used instead
+        :param limiter: `ArrayLimiter` used to limit the naviseccli commands.
+        True to use the limiter shared by the clients of each sp.
+        :param identity_map: True to keep only one instance of each resource
+        retrieved, so that the properties retrieved by one reference are
+        shared by the others.
+        :param single_flight: True to share the output of the identical
+        read-only commands running at the same time.
+        :param circuit_breaker: True to fail fast with
+        `CircuitBreakerOpenError` on an sp which keeps failing.
         :return: vnx system instance
         """
         super(VNXSystem, self).__init__()
@@ -113,6 +124,10 @@ class VNXSystem(VNXCliResource):
         self._file_username = file_username
         self._file_password = file_password
         self._node_name = node_name
+        self._limiter = limiter
+        self._identity_map = identity_map
+        self._single_flight = single_flight
+        self._circuit_breaker = circuit_breaker
 
         self._cli = self._init_block_cli()
 
@@ -124,7 +139,10 @@ class VNXSystem(VNXCliResource):
             self._ip,
             self._username, self._password, self._scope, self._sec_file,
             self._timeout, heartbeat_interval=self._hb_interval,
-            naviseccli=self._naviseccli)
+            naviseccli=self._naviseccli, limiter=self._limiter,
+            identity_map=self._identity_map,
+            single_flight=self._single_flight,
+            circuit_breaker=self._circuit_breaker)
 
     def _init_file_cli(self):
         return VNXNasClient(self.control_station_ip,
@@ -134,7 +152,10 @@ class VNXSystem(VNXCliResource):
     def __getstate__(self):
         d = {'ip': self._ip, 'username': self._username,
              'password': self._password, 'scope': self._scope,
-             'sec_file': self._sec_file, 'naviseccli': self._naviseccli}
+             'sec_file': self._sec_file, 'naviseccli': self._naviseccli,
+             'limiter': self._limiter, 'identity_map': self._identity_map,
+             'single_flight': self._single_flight,
+             'circuit_breaker': self._circuit_breaker}
         return d
 
     def __setstate__(self, state):
@@ -63,6 +63,24 @@ class NasXmlBuilder(object):
         return _xb.RequestPacket(_xb.Request(_xb.Query(body)),
                                  xmlns=XML_NS)
 
+    @staticmethod
+    def batch_query_package(packages):
+        """ merge the queries of several request packets into one.
+
+        The responses of the queries are returned in the same order in
+        separated `Response` nodes.
+
+        :param packages: request packets returned by the query builders.
+        :return: one request packet containing all the queries.
+        """
+        requests = []
+        for package in packages:
+            for request in package:
+                if request.find('Query') is None:
+                    raise ValueError('only queries could be batched.')
+                requests.append(request)
+        return _xb.RequestPacket(*requests, xmlns=XML_NS)
+
     @staticmethod
     def task_package(body):
         return _xb.RequestPacket(
@@ -48,8 +48,9 @@ class XMLAPIParser(object):
             tag = tag[i + 1:]
         return tag
 
-    def parse(self, xml):
-        result = {
+    @staticmethod
+    def _new_result():
+        return {
             'type': None,
             'taskId': None,
             'maxSeverity': None,
@@ -57,24 +58,49 @@ class XMLAPIParser(object):
             'problems': [],
         }
 
+    def _iter_events(self, xml):
         events = ("start", "end")
 
         context = etree.ElementTree.iterparse(six.BytesIO(xml.encode('utf-8')),
                                               events=events)
         for action, elem in context:
             self.tag = self._delete_ns(elem.tag)
-
-            func = self._get_func(action, self.tag)
             self.track_stack(action, elem)
+            yield action, elem
 
-            if func in vars(XMLAPIParser):
-                if action == 'start':
-                    eval('self.' + func)(elem, result)
-                elif action == 'end':
-                    eval('self.' + func)(elem, result)
+    def _handle(self, action, elem, result):
+        func = self._get_func(action, self.tag)
+        if func in vars(XMLAPIParser):
+            if action == 'start':
+                eval('self.' + func)(elem, result)
+            elif action == 'end':
+                eval('self.' + func)(elem, result)
 
+    def parse(self, xml):
+        result = self._new_result()
+        for action, elem in self._iter_events(xml):
+            self._handle(action, elem, result)
         return result
 
+    def parse_all(self, xml):
+        """ parse the response of a batched request.
+
+        :param xml: response packet containing several `Response` nodes.
+        :return: list of results, one for each `Response` node in order.
+            The whole packet is parsed as one result if there is no
+            `Response` node, for example, a `Fault`.
+        """
+        results = []
+        result = self._new_result()
+        for action, elem in self._iter_events(xml):
+            if action == 'start' and self.tag == 'Response':
+                result = self._new_result()
+                results.append(result)
+            self._handle(action, elem, result)
+        if not results:
+            results.append(result)
+        return results
+
     def track_stack(self, action, elem):
         if action == 'start':
             self.stack.append(elem)
@@ -0,0 +1,179 @@
+# coding=utf-8
+# Copyright (c) 2015 EMC Corporation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+from __future__ import unicode_literals
+
+import functools
+
+from mock import patch
+
+__author__ = 'Cedric Zhuang'
+
+
+class SSHException(Exception):
+    pass
+
+
+class StubChannel(object):
+    """ channel with a limited window like the paramiko one.
+
+    The remote command exits only after its output fits in the window.
+    Waiting for the exit status before reading the output deadlocks.
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.window = transport.paramiko.window
+        self.cmd = None
+        self.stdout = b''
+        self.stderr = b''
+        self.exit_code = 0
+        self.closed = False
+        self.timeout = None
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def exec_command(self, cmd):
+        self.cmd = cmd
+        self.stdout, self.stderr, self.exit_code = \
+            self.transport.paramiko.get_output(cmd)
+
+    def recv_ready(self):
+        return len(self.stdout) > 0
+
+    def recv_stderr_ready(self):
+        return len(self.stderr) > 0
+
+    def recv(self, size):
+        ret, self.stdout = self.stdout[:size], self.stdout[size:]
+        return ret
+
+    def recv_stderr(self, size):
+        ret, self.stderr = self.stderr[:size], self.stderr[size:]
+        return ret
+
+    def exit_status_ready(self):
+        return (len(self.stdout) <= self.window and
+                len(self.stderr) <= self.window)
+
+    def recv_exit_status(self):
+        if not self.exit_status_ready():
+            raise AssertionError('deadlock: output of {} is larger than '
+                                 'the channel window.'.format(self.cmd))
+        return self.exit_code
+
+    def close(self):
+        self.closed = True
+
+
+class StubSFTPClient(object):
+    def __init__(self, transport):
+        self.transport = transport
+        self.closed = False
+
+    def put(self, local_path, remote_path):
+        if not self.transport.is_active():
+            raise EOFError()
+        self.transport.paramiko.files[remote_path] = local_path
+
+    def get(self, remote_path, local_path):
+        if not self.transport.is_active():
+            raise EOFError()
+        if remote_path not in self.transport.paramiko.files:
+            raise IOError('{} not found.'.format(remote_path))
+
+    def close(self):
+        self.closed = True
+
+
+class StubTransport(object):
+    def __init__(self, paramiko, address):
+        self.paramiko = paramiko
+        self.address = address
+        self.active = True
+        self.keepalive = 0
+        self.username = None
+        self.session_count = 0
+        self.sftp_count = 0
+
+    def connect(self, username=None, password=None):
+        self.username = username
+
+    def set_keepalive(self, interval):
+        self.keepalive = interval
+
+    def is_active(self):
+        return self.active
+
+    def open_session(self):
+        if not self.active:
+            raise SSHException('SSH session not active')
+        self.session_count += 1
+        return StubChannel(self)
+
+    def open_sftp_client(self):
+        if not self.active:
+            raise SSHException('SSH session not active')
+        self.sftp_count += 1
+        return StubSFTPClient(self)
+
+    def close(self):
+        self.active = False
+
+
+class StubParamiko(object):
+    """ paramiko compatible stub used to test the ssh connector.
+
+    :param outputs: dictionary from the command to its stdout, or to the
+        tuple of stdout, stderr and the exit code.
+    :param window: bytes of the channel window.
+    """
+
+    def __init__(self, outputs=None, window=2 * 1024 ** 2):
+        self.outputs = outputs or {}
+        self.window = window
+        self.transports = []
+        self.files = {}
+        self.ssh_exception = self
+
+    @property
+    def SSHException(self):
+        return SSHException
+
+    def Transport(self, address):
+        ret = StubTransport(self, address)
+        self.transports.append(ret)
+        return ret
+
+    def get_output(self, cmd):
+        ret = self.outputs.get(cmd, b'')
+        if not isinstance(ret, tuple):
+            ret = (ret, b'', 0)
+        return ret
+
+
+def patch_paramiko(outputs=None, window=2 * 1024 ** 2):
+    stub = StubParamiko(outputs, window)
+
+    def decorator(func):
+        @functools.wraps(func)
+        @patch(target='storops.connection.connector.paramiko', new=stub)
+        def func_wrapper(*args, **kwargs):
+            return func(*(args + (stub,)), **kwargs)
+
+        return func_wrapper
+
+    return decorator
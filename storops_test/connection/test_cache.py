@@ -0,0 +1,150 @@
+# coding=utf-8
+# Copyright (c) 2015 EMC Corporation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+from __future__ import unicode_literals
+
+import pickle
+import unittest
+from multiprocessing.pool import ThreadPool
+
+import mock
+from hamcrest import assert_that, equal_to, none, less_than_or_equal_to, \
+    only_contains, is_not
+
+from storops.connection.cache import ResponseCache, get_response_size
+from storops_test.connection.test_client import MockResponse
+from storops_test.utils import FakeClock
+
+
+def _result(text, status_code=200):
+    return MockResponse(text, status_code), text
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def test_get_response_size(self):
+        assert_that(get_response_size(_result('abc')), equal_to(3))
+
+    def test_get_miss(self):
+        cache = ResponseCache()
+        assert_that(cache.get('a'), none())
+        assert_that(cache.get_stats()['misses'], equal_to(1))
+
+    def test_put_get(self):
+        cache = ResponseCache()
+        cache.put('a', _result('abc'))
+        assert_that(cache.get('a')[1], equal_to('abc'))
+        stats = cache.get_stats()
+        assert_that(stats['hits'], equal_to(1))
+        assert_that(stats['bytes'], equal_to(3))
+
+    def test_ttl_expired(self):
+        clock = FakeClock()
+        with mock.patch.object(ResponseCache, '_now', clock):
+            cache = ResponseCache(ttl=10)
+            cache.put('a', _result('abc'))
+            clock.now += 9
+            assert_that('a' in cache, equal_to(True))
+            clock.now += 1
+            assert_that(cache.get('a'), none())
+            assert_that(len(cache), equal_to(0))
+            assert_that(cache.size_in_bytes, equal_to(0))
+
+    def test_lru_eviction_by_count(self):
+        cache = ResponseCache(max_entries=2)
+        cache.put('a', _result('a'))
+        cache.put('b', _result('b'))
+        cache.get('a')
+        cache.put('c', _result('c'))
+        assert_that('a' in cache, equal_to(True))
+        assert_that('b' in cache, equal_to(False))
+        assert_that('c' in cache, equal_to(True))
+        assert_that(cache.get_stats()['evictions'], equal_to(1))
+
+    def test_lru_eviction_by_bytes(self):
+        cache = ResponseCache(max_bytes=10)
+        cache.put('a', _result('12345'))
+        cache.put('b', _result('12345'))
+        cache.put('c', _result('123'))
+        assert_that('a' in cache, equal_to(False))
+        assert_that(cache.size_in_bytes, equal_to(8))
+
+    def test_too_large_not_cached(self):
+        cache = ResponseCache(max_bytes=2)
+        assert_that(cache.put('a', _result('123')), equal_to(False))
+        assert_that(len(cache), equal_to(0))
+
+    def test_negative_cache_disabled(self):
+        cache = ResponseCache()
+        cache.put_response('a', _result('not found', 404))
+        assert_that('a' in cache, equal_to(False))
+
+    def test_negative_cache(self):
+        cache = ResponseCache(negative_ttl=5)
+        cache.put_response('a', _result('not found', 404))
+        assert_that(cache.get('a')[0].status_code, equal_to(404))
+
+    def test_error_not_cached(self):
+        cache = ResponseCache(negative_ttl=5)
+        cache.put_response('a', _result('error', 503))
+        assert_that('a' in cache, equal_to(False))
+
+    def test_invalidate_and_clear(self):
+        cache = ResponseCache()
+        cache.put('a', _result('a'))
+        cache.put('b', _result('b'))
+        cache.invalidate('a')
+        assert_that('a' in cache, equal_to(False))
+        cache.clear()
+        assert_that(len(cache), equal_to(0))
+        assert_that(cache.size_in_bytes, equal_to(0))
+
+    def test_reset_stats(self):
+        cache = ResponseCache()
+        cache.get('a')
+        cache.reset_stats()
+        assert_that(cache.get_stats()['misses'], equal_to(0))
+
+    def test_concurrent_access_bounded(self):
+        cache = ResponseCache(max_entries=50, max_bytes=2000)
+
+        def hammer(i):
+            key = 'url_{}'.format(i % 200)
+            if cache.get(key) is None:
+                cache.put(key, _result('x' * (i % 50)))
+            return len(cache)
+
+        pool = ThreadPool(16)
+        try:
+            sizes = pool.map(hammer, range(5000))
+        finally:
+            pool.close()
+            pool.join()
+        assert_that(sizes, only_contains(less_than_or_equal_to(50)))
+        stats = cache.get_stats()
+        assert_that(stats['hits'] + stats['misses'], equal_to(5000))
+        assert_that(stats['bytes'], less_than_or_equal_to(2000))
+        assert_that(stats['evictions'], is_not(equal_to(0)))
+        total = sum(get_response_size(cache.get(k))
+                    for k in list(cache._entries.keys()))
+        assert_that(total, equal_to(cache.size_in_bytes))
+
+    def test_pickle(self):
+        cache = ResponseCache(ttl=5)
+        cache.put('a', ('a', 'a'))
+        copied = pickle.loads(pickle.dumps(cache))
+        assert_that(len(copied), equal_to(0))
+        assert_that(copied.ttl, equal_to(5))
+        copied.put('b', ('b', 'b'))
+        assert_that('b' in copied, equal_to(True))
@@ -15,15 +15,23 @@
 #    under the License.
 from __future__ import unicode_literals
 
+import threading
+import time
 import unittest
+from multiprocessing.pool import ThreadPool
 
-from hamcrest import assert_that, calling, equal_to, raises
+from hamcrest import assert_that, calling, equal_to, raises, none, \
+    less_than_or_equal_to, greater_than, only_contains, contains_string
 import mock
 from requests import exceptions
 import tempfile
 
 from storops.connection import client
+from storops.connection.cache import ResponseCache, get_response_size
 from storops.connection import exceptions as storops_ex
+from storops.exception import CircuitBreakerOpenError
+from storops.lib.circuit_breaker import CircuitBreaker
+from storops.lib.limiter import ArrayLimiter
 
 
 class FakeOpener(dict):
@@ -39,6 +47,21 @@ class MockResponse(object):
         self.status_code = status_code
 
 
+class MockBytesResponse(object):
+    def __init__(self, content, status_code=200):
+        self._content = content
+        self.status_code = status_code
+        self.headers = {'Content-Length': str(len(content))}
+
+    @property
+    def content(self):
+        return self._content
+
+    @property
+    def text(self):
+        raise AssertionError('text should not be decoded.')
+
+
 def _request_side_effect(method, url, **kwargs):
     response_map = {'right_url': MockResponse('OK', 200),
                     'right_url_json': MockResponse('{"id": "id_123"}', 200),
@@ -59,6 +82,11 @@ class ClientModuleTest(unittest.TestCase):
     def test_wait_callback(self):
         assert_that(8, equal_to(client._wait_callback(4)))
 
+    def test_jitter_wait_callback(self):
+        waits = [client._jitter_wait_callback(4) for _ in range(20)]
+        assert_that(max(waits), less_than_or_equal_to(8))
+        assert_that(len(set(waits)), greater_than(1))
+
 
 class HTTPClientTest(unittest.TestCase):
 
@@ -146,6 +174,46 @@ class HTTPClientTest(unittest.TestCase):
         assert_that(resp.status_code, equal_to(404))
         assert_that(body, equal_to('Failed'))
 
+    def test_request_decode_from_bytes(self):
+        self.client.session.request = mock.MagicMock(
+            return_value=MockBytesResponse(b'{"id": "id_123"}'))
+        self.client.headers['Content-Type'] = 'application/json'
+        resp, body = self.client.request('right_url_json', 'GET')
+        assert_that(body, equal_to({'id': 'id_123'}))
+        assert_that(resp.content, equal_to(b'{"id": "id_123"}'))
+
+    def test_request_decode_from_bytes_debug_log(self):
+        self.client.session.request = mock.MagicMock(
+            return_value=MockBytesResponse(b'{"id": "id_123"}'))
+        self.client.headers['Content-Type'] = 'application/json'
+        with mock.patch.object(client.log, 'isEnabledFor',
+                               return_value=True), \
+                mock.patch.object(client.log, 'debug') as debug:
+            _, body = self.client.request('right_url_json', 'GET')
+        assert_that(body, equal_to({'id': 'id_123'}))
+        assert_that(str(debug.call_args_list[-1]), contains_string('id_123'))
+
+    def test_request_release_content(self):
+        c = client.HTTPClient('https://10.10.10.10',
+                              {'Content-Type': 'application/json'},
+                              release_content=True)
+        c.session.request = mock.MagicMock(
+            return_value=MockBytesResponse(b'{"id": "id_123"}'))
+        resp, body = c.request('right_url_json', 'GET')
+        assert_that(body, equal_to({'id': 'id_123'}))
+        assert_that(resp.content, none())
+        assert_that(get_response_size((resp, body)), equal_to(16))
+
+    def test_request_not_modify_headers(self):
+        self.client.session.request = mock.MagicMock(
+            side_effect=_request_side_effect)
+        self.client.headers['Content-Type'] = 'application/json'
+        self.client.request('right_url_json', 'GET', headers={'a': 'b'})
+        assert_that(self.client.headers,
+                    equal_to({'Content-Type': 'application/json'}))
+        assert_that(self.client.request_options,
+                    equal_to({'verify': True, 'auth': None}))
+
     @mock.patch('storops.connection.exceptions.from_response')
     def test_request_content_raise(self, mocked_from_response):
         self.client.session.request = mock.MagicMock(
@@ -211,3 +279,233 @@ class HTTPClientTest(unittest.TestCase):
         mocked_cs_request.assert_called_with(
             '/api/types/instance',
             'DELETE')
+
+    @mock.patch(
+        'storops.connection.client.HTTPClient._cs_request')
+    def test_get_with_cache_interval(self, mocked_cs_request):
+        mocked_cs_request.return_value = (MockResponse('OK', 200), 'OK')
+        c = client.HTTPClient('https://10.10.10.10', {}, cache_interval=10)
+        c.get('/api/types/instance')
+        c.get('/api/types/instance')
+
+        assert_that(mocked_cs_request.call_count, equal_to(1))
+        assert_that(c.get_cache_stats()['hits'], equal_to(1))
+
+    @mock.patch(
+        'storops.connection.client.HTTPClient._cs_request')
+    def test_get_with_cache_not_found(self, mocked_cs_request):
+        mocked_cs_request.return_value = (MockResponse('Failed', 404), None)
+        c = client.HTTPClient('https://10.10.10.10', {},
+                              cache=ResponseCache(negative_ttl=10))
+        c.get('/api/types/instance')
+        resp, _ = c.get('/api/types/instance')
+
+        assert_that(resp.status_code, equal_to(404))
+        assert_that(mocked_cs_request.call_count, equal_to(1))
+
+    def test_get_cache_stats_no_cache(self):
+        assert_that(self.client.get_cache_stats(), equal_to({}))
+
+    def test_concurrent_get_single_request(self):
+        calls = []
+        start = threading.Event()
+        c = client.HTTPClient('https://10.10.10.10', {}, single_flight=True)
+
+        def slow_request(method, url, **kwargs):
+            calls.append(url)
+            time.sleep(0.5)
+            return MockResponse('OK', 200)
+
+        c.session.request = mock.MagicMock(side_effect=slow_request)
+
+        def run(_):
+            start.wait()
+            return c.get('/api/types/lun/instances?b=1&a=2')[1]
+
+        pool = ThreadPool(50)
+        try:
+            result = pool.map_async(run, range(50))
+            start.set()
+            bodies = result.get(10)
+        finally:
+            pool.close()
+            pool.join()
+        assert_that(len(calls), equal_to(1))
+        assert_that(bodies, equal_to(['OK'] * 50))
+
+    def test_concurrent_post_not_shared(self):
+        self.client.session.request = mock.MagicMock(
+            side_effect=lambda *args, **kwargs: MockResponse('OK', 200))
+        pool = ThreadPool(5)
+        try:
+            pool.map(lambda _: self.client.post('/api/types/lun/instances'),
+                     range(5))
+        finally:
+            pool.close()
+            pool.join()
+        assert_that(self.client.session.request.call_count, equal_to(5))
+
+    def test_get_single_flight_disabled_by_default(self):
+        assert_that(self.client.single_flight, none())
+
+    def test_concurrent_get_body_copied(self):
+        c = client.HTTPClient('https://10.10.10.10',
+                              {'Content-Type': 'application/json'},
+                              single_flight=True)
+        start = threading.Event()
+
+        def slow_request(method, url, **kwargs):
+            time.sleep(0.3)
+            return MockResponse('{"content": {"id": "sv_1"}}', 200)
+
+        c.session.request = mock.MagicMock(side_effect=slow_request)
+
+        def run(_):
+            start.wait()
+            return c.get('/api/instances/lun/sv_1')[1]
+
+        pool = ThreadPool(5)
+        try:
+            result = pool.map_async(run, range(5))
+            start.set()
+            bodies = result.get(10)
+        finally:
+            pool.close()
+            pool.join()
+        assert_that(c.session.request.call_count, equal_to(1))
+        assert_that(bodies, only_contains({'content': {'id': 'sv_1'}}))
+        assert_that(len(set(id(body) for body in bodies)), equal_to(5))
+
+    def test_get_not_joined_after_write(self):
+        c = client.HTTPClient('https://10.10.10.10', {}, single_flight=True)
+        get_started = threading.Event()
+        release = threading.Event()
+
+        def request(method, url, **kwargs):
+            if method == 'GET' and not get_started.is_set():
+                get_started.set()
+                release.wait(5)
+                return MockResponse('before', 200)
+            return MockResponse('after' if method == 'GET' else 'OK', 200)
+
+        c.session.request = mock.MagicMock(side_effect=request)
+        early = ThreadPool(1)
+        try:
+            result = early.apply_async(c.get, ('/api/instances/lun/sv_1',))
+            get_started.wait(5)
+            c.post('/api/instances/lun/sv_1/action/modify')
+            bodies = []
+            late = threading.Thread(
+                target=lambda: bodies.append(
+                    c.get('/api/instances/lun/sv_1')[1]))
+            late.start()
+            late.join(5)
+            release.set()
+            assert_that(result.get(5)[1], equal_to('before'))
+        finally:
+            early.close()
+            early.join()
+        assert_that(bodies, equal_to(['after']))
+
+    def test_normalize_url(self):
+        assert_that(client.HTTPClient.normalize_url('/a?c=1&b=2&a=3'),
+                    equal_to('/a?a=3&b=2&c=1'))
+        assert_that(client.HTTPClient.normalize_url('/a'), equal_to('/a'))
+
+    def test_circuit_breaker_open(self):
+        c = client.HTTPClient('https://10.10.10.10', {}, retries=0,
+                              circuit_breaker=True)
+        c.circuit_breaker.failure_threshold = 2
+        c.session.request = mock.MagicMock(
+            side_effect=exceptions.ConnectionError('refused'))
+        for _ in range(2):
+            assert_that(calling(c.get).with_args('/api/types/lun'),
+                        raises(exceptions.ConnectionError))
+        assert_that(calling(c.get).with_args('/api/types/lun'),
+                    raises(CircuitBreakerOpenError))
+        assert_that(c.session.request.call_count, equal_to(2))
+
+    def test_circuit_breaker_http_error_not_failure(self):
+        c = client.HTTPClient('https://10.10.10.10', {}, retries=0,
+                              circuit_breaker=True)
+        c.circuit_breaker.failure_threshold = 1
+        c.session.request = mock.MagicMock(
+            side_effect=lambda *args, **kwargs: MockResponse('Failed', 503))
+        for _ in range(2):
+            c.get('/api/types/lun')
+        assert_that(c.circuit_breaker.state, equal_to(CircuitBreaker.CLOSED))
+
+    def test_circuit_breaker_disabled(self):
+        c = client.HTTPClient('https://10.10.10.10', {},
+                              circuit_breaker=False)
+        assert_that(c.circuit_breaker, none())
+
+    def test_circuit_breaker_disabled_by_default(self):
+        c = client.HTTPClient('https://10.10.10.10', {}, retries=0)
+        c.session.request = mock.MagicMock(
+            side_effect=exceptions.ConnectionError('refused'))
+        for _ in range(6):
+            assert_that(calling(c.get).with_args('/api/types/lun'),
+                        raises(exceptions.ConnectionError))
+        assert_that(c.circuit_breaker, none())
+
+    def test_get_stats(self):
+        c = client.HTTPClient('https://10.10.10.10', {})
+        c.session.request = mock.MagicMock(
+            side_effect=lambda *args, **kwargs: MockResponse('OK', 200))
+        c.get('/api/instances/lun/sv_1?fields=id')
+        c.get('/api/instances/lun/sv_2?fields=id')
+        stats = c.get_stats()['GET /api/instances/lun/{id}']
+        assert_that(stats['count'], equal_to(2))
+        assert_that(stats['size']['total'], equal_to(4))
+        assert_that(stats['retries'], equal_to(0))
+
+    def test_get_stats_error_and_retry(self):
+        c = client.HTTPClient('https://10.10.10.10', {}, retries=3,
+                              circuit_breaker=False)
+        responses = [exceptions.ConnectionError('refused'),
+                     MockResponse('Failed', 503)]
+        c.session.request = mock.MagicMock(side_effect=responses)
+        with mock.patch('storops.connection.client.full_jitter',
+                        return_value=0):
+            c.post('/api/types/lun/instances')
+        stats = c.get_stats()['POST /api/types/lun/instances']
+        assert_that(stats['count'], equal_to(2))
+        assert_that(stats['retries'], equal_to(1))
+        assert_that(stats['errors'],
+                    equal_to({'ConnectionError': 1, 'HttpServerError': 1}))
+
+    def test_reset_stats(self):
+        c = client.HTTPClient('https://10.10.10.10', {})
+        c.session.request = mock.MagicMock(
+            side_effect=lambda *args, **kwargs: MockResponse('OK', 200))
+        c.get('/api/types/lun/instances')
+        c.reset_stats()
+        assert_that(c.get_stats(), equal_to({}))
+
+    def test_limiter_shrink_on_503(self):
+        limiter = ArrayLimiter('10.10.10.10', initial_window=8)
+        c = client.HTTPClient('https://10.10.10.10', {}, limiter=limiter)
+        c.session.request = mock.MagicMock(
+            side_effect=lambda *args, **kwargs: MockResponse('Busy', 503))
+        c.get('/api/types/lun/instances')
+        assert_that(limiter.window.limit, equal_to(4))
+        assert_that(limiter.window.in_flight, equal_to(0))
+
+    def test_limiter_shrink_on_timeout(self):
+        limiter = ArrayLimiter('10.10.10.10', initial_window=8)
+        c = client.HTTPClient('https://10.10.10.10', {}, retries=0,
+                              limiter=limiter)
+        c.session.request = mock.MagicMock(
+            side_effect=exceptions.ReadTimeout('timeout'))
+        assert_that(calling(c.post).with_args('/api/types/lun/instances'),
+                    raises(exceptions.ReadTimeout))
+        assert_that(limiter.window.limit, equal_to(4))
+
+    def test_limiter_grow_on_success(self):
+        limiter = ArrayLimiter('10.10.10.10', initial_window=4)
+        c = client.HTTPClient('https://10.10.10.10', {}, limiter=limiter)
+        c.session.request = mock.MagicMock(
+            side_effect=lambda *args, **kwargs: MockResponse('OK', 200))
+        c.post('/api/types/lun/instances')
+        assert_that(limiter.window.limit, equal_to(4.25))
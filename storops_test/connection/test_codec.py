@@ -0,0 +1,83 @@
+# coding=utf-8
+# Copyright (c) 2015 EMC Corporation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+from __future__ import unicode_literals
+
+import glob
+import json
+import os
+import unittest
+
+from hamcrest import assert_that, equal_to, instance_of, calling, raises, \
+    is_not, empty
+
+from storops.connection import codec
+from storops.connection.codec import get_json_codec, JsonCodec
+
+
+def _rest_data_files():
+    folder = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                          'unity', 'rest_data')
+    return glob.glob(os.path.join(folder, '*', '*.json'))
+
+
+class JsonCodecTest(unittest.TestCase):
+    def test_default_codec(self):
+        assert_that(get_json_codec(), instance_of(JsonCodec))
+
+    def test_codec_instance(self):
+        c = JsonCodec()
+        assert_that(get_json_codec(c), equal_to(c))
+
+    def test_custom_codec(self):
+        class CustomCodec(object):
+            loads = staticmethod(json.loads)
+            dumps = staticmethod(json.dumps)
+
+        c = CustomCodec()
+        assert_that(get_json_codec(c), equal_to(c))
+
+    def test_auto_codec(self):
+        assert_that(get_json_codec('auto').is_available(), equal_to(True))
+
+    def test_not_supported(self):
+        assert_that(calling(get_json_codec).with_args('abc'),
+                    raises(ValueError, 'not supported'))
+
+    @unittest.skipIf(codec.orjson is not None, 'orjson installed.')
+    def test_not_installed(self):
+        assert_that(calling(get_json_codec).with_args('orjson'),
+                    raises(ValueError, 'not installed'))
+
+    def test_loads_bytes(self):
+        ret = JsonCodec().loads('{"a": "中"}'.encode('utf-8'))
+        assert_that(ret, equal_to({'a': '中'}))
+
+    def test_all_codecs_same_as_json(self):
+        files = _rest_data_files()
+        assert_that(files, is_not(empty()))
+        for clz in codec._codecs:
+            if not clz.is_available():
+                continue
+            c = clz()
+            for name in files:
+                with open(name, 'rb') as f:
+                    raw = f.read()
+                if not raw.strip():
+                    continue
+                expected = json.loads(raw.decode('utf-8'))
+                assert_that(c.loads(raw), equal_to(expected))
+                assert_that(json.loads(c.dumps(expected)),
+                            equal_to(expected))
@@ -16,11 +16,20 @@
 
 from __future__ import unicode_literals
 
+import os
+import shutil
+import stat
+import tempfile
 import unittest
 
 import mock
+from hamcrest import assert_that, equal_to, none, contains_string, is_not, \
+    calling, raises
 
 from storops.connection import connector
+from storops.connection.exceptions import HTTPClientError, \
+    SSHExecutionError, SFtpExecutionError
+from storops_test.connection.ssh_stub import patch_paramiko
 
 
 class UnityRESTConnectorTest(unittest.TestCase):
@@ -38,7 +47,9 @@ class UnityRESTConnectorTest(unittest.TestCase):
             insecure=True,
             retries=None,
             ca_cert_path=None,
-            cache_interval=0)
+            cache_interval=0,
+            limiter=None,
+            single_flight=False, circuit_breaker=None)
 
     @mock.patch('storops.connection.client.HTTPClient')
     def test_new_connector_verify_true(self, mocked_httpclient):
@@ -53,7 +64,9 @@ class UnityRESTConnectorTest(unittest.TestCase):
             insecure=False,
             retries=None,
             ca_cert_path=None,
-            cache_interval=0)
+            cache_interval=0,
+            limiter=None,
+            single_flight=False, circuit_breaker=None)
 
     @mock.patch('storops.connection.client.HTTPClient')
     def test_new_connector_verify_path(self, mocked_httpclient):
@@ -68,4 +81,226 @@ class UnityRESTConnectorTest(unittest.TestCase):
             insecure=False,
             retries=None,
             ca_cert_path='/tmp/ca_cert.crt',
-            cache_interval=0)
+            cache_interval=0,
+            limiter=None,
+            single_flight=False, circuit_breaker=None)
+
+    def test_limiter_shared_by_host(self):
+        c1 = connector.UnityRESTConnector('10.10.9.1', limiter=True)
+        c2 = connector.UnityRESTConnector('10.10.9.1', limiter=True)
+        c3 = connector.UnityRESTConnector('10.10.9.2', limiter=True)
+        assert_that(c1.http_client.limiter,
+                    equal_to(c2.http_client.limiter))
+        assert_that(c1.http_client.limiter,
+                    is_not(equal_to(c3.http_client.limiter)))
+
+    def test_limiter_disabled_by_default(self):
+        c = connector.UnityRESTConnector('10.10.9.1')
+        assert_that(c.http_client.limiter, none())
+
+
+class MockCsrfResponse(object):
+    def __init__(self, token=None, status_code=200):
+        self.status_code = status_code
+        self.headers = {}
+        if token is not None:
+            self.headers['emc-csrf-token'] = token
+
+
+class UnityRESTConnectorCsrfTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = connector.UnityRESTConnector('10.10.10.10')
+        self.http = self.conn.http_client
+
+    def test_headers_not_shared(self):
+        self.conn.http_client.update_headers({'emc-csrf-token': 'a'})
+        assert_that('emc-csrf-token' in connector.UnityRESTConnector.HEADERS,
+                    equal_to(False))
+
+    def test_token_from_get(self):
+        self.http.get = mock.MagicMock(
+            return_value=(MockCsrfResponse('token_1'), {}))
+        self.http.post = mock.MagicMock(return_value=(None, {}))
+        self.conn.get('/api/types/lun/instances')
+        self.conn.post('/api/types/lun/instances')
+        assert_that(self.http.headers['emc-csrf-token'], equal_to('token_1'))
+        assert_that(self.http.post.call_count, equal_to(1))
+
+    def test_token_before_first_post(self):
+        self.http._cs_request = mock.MagicMock(
+            return_value=(MockCsrfResponse('token_2'), {}))
+        self.http.post = mock.MagicMock(return_value=(None, {}))
+        self.conn.post('/api/types/lun/instances')
+
+        self.http._cs_request.assert_called_once_with(
+            '/api/types/user/instances?compact=True&fields=id&per_page=1',
+            'GET')
+        assert_that(self.http.headers['emc-csrf-token'], equal_to('token_2'))
+        assert_that(self.http.post.call_count, equal_to(1))
+
+    def test_token_refreshed_on_401(self):
+        tokens = iter(['token_1', 'token_2'])
+        self.http._cs_request = mock.MagicMock(
+            side_effect=lambda *args: (MockCsrfResponse(next(tokens)), {}))
+        self.http.post = mock.MagicMock(
+            side_effect=[HTTPClientError(http_status=401), (None, {})])
+        self.conn.post('/api/types/lun/instances')
+
+        assert_that(self.http.headers['emc-csrf-token'], equal_to('token_2'))
+        assert_that(self.http.post.call_count, equal_to(2))
+
+
+class UnitySessionCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cache = connector.UnitySessionCache(
+            '10.10.10.10', 443, 'admin', folder=self.folder)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_filename(self):
+        assert_that(self.cache.filename,
+                    contains_string('unity_10.10.10.10_443_admin.json'))
+
+    def test_load_not_existed(self):
+        assert_that(self.cache.load(), none())
+
+    def test_save_and_load(self):
+        self.cache.save({'mod_sec_emc': 'abc'}, 'token_1')
+        data = self.cache.load()
+        assert_that(data['csrf_token'], equal_to('token_1'))
+        assert_that(data['cookies'], equal_to({'mod_sec_emc': 'abc'}))
+
+    @unittest.skipIf(os.name == 'nt', 'posix permission only.')
+    def test_save_permission(self):
+        self.cache.save({}, 'token_1')
+        mode = stat.S_IMODE(os.stat(self.cache.filename).st_mode)
+        assert_that(mode, equal_to(0o600))
+
+    def test_expired(self):
+        self.cache.ttl = -1
+        self.cache.save({}, 'token_1')
+        assert_that(self.cache.load(), none())
+
+    def test_clear(self):
+        self.cache.save({}, 'token_1')
+        self.cache.clear()
+        assert_that(self.cache.load(), none())
+
+    def test_connector_reuse_session(self):
+        conn = connector.UnityRESTConnector('10.10.10.10',
+                                            session_cache=self.cache)
+        conn.http_client.session.cookies.set('mod_sec_emc', 'abc')
+        conn.http_client._cs_request = mock.MagicMock(
+            return_value=(MockCsrfResponse('token_3'), {}))
+        conn.login()
+
+        another = connector.UnityRESTConnector('10.10.10.10',
+                                               session_cache=self.cache)
+        http = another.http_client
+        assert_that(http.headers['emc-csrf-token'], equal_to('token_3'))
+        assert_that(http.session.cookies.get('mod_sec_emc'), equal_to('abc'))
+        http.post = mock.MagicMock(return_value=(None, {}))
+        http._cs_request = mock.MagicMock()
+        another.post('/api/types/lun/instances')
+        assert_that(http._cs_request.call_count, equal_to(0))
+
+
+class SSHConnectorTest(unittest.TestCase):
+    big_output = {'nas_fs -list -all': b'x' * (8 * 1024 ** 2)}
+
+    @staticmethod
+    def get_ssh(**kwargs):
+        return connector.SSHConnector('10.0.0.1', 'nasadmin', 'nasadmin',
+                                      **kwargs)
+
+    @patch_paramiko(big_output)
+    def test_execute_large_output(self, paramiko):
+        out, err = self.get_ssh().execute(['nas_fs', '-list', '-all'])
+        assert_that(len(out), equal_to(8 * 1024 ** 2))
+        assert_that(err, equal_to(b''))
+
+    @patch_paramiko(big_output)
+    def test_execute_output_capped(self, paramiko):
+        ssh = self.get_ssh(max_output=1024 ** 2)
+        out, _ = ssh.execute(['nas_fs', '-list', '-all'])
+        assert_that(len(out), equal_to(1024 ** 2))
+
+    @patch_paramiko({'nas_fs -info fs1': (b'', b'error: fs1 not found', 2)})
+    def test_execute_exit_code(self, paramiko):
+        assert_that(calling(self.get_ssh().execute).with_args(
+            ['nas_fs', '-info', 'fs1']),
+            raises(SSHExecutionError, 'fs1 not found'))
+
+    @patch_paramiko({'nas_fs -info fs1': (b'', b'error', 2)})
+    def test_execute_not_check_exit_code(self, paramiko):
+        out, err = self.get_ssh().execute(['nas_fs', '-info', 'fs1'],
+                                          check_exit_code=False)
+        assert_that(err, equal_to(b'error'))
+
+    @patch_paramiko()
+    def test_keepalive(self, paramiko):
+        self.get_ssh(keepalive=10)
+        assert_that(paramiko.transports[0].keepalive, equal_to(10))
+
+    @patch_paramiko({'date': b'now'})
+    def test_reuse_transport(self, paramiko):
+        ssh = self.get_ssh()
+        for _ in range(3):
+            ssh.execute(['date'])
+        assert_that(len(paramiko.transports), equal_to(1))
+        assert_that(paramiko.transports[0].session_count, equal_to(3))
+
+    @patch_paramiko({'date': b'now'})
+    def test_reconnect(self, paramiko):
+        ssh = self.get_ssh()
+        paramiko.transports[0].close()
+        out, _ = ssh.execute(['date'])
+        assert_that(out, equal_to(b'now'))
+        assert_that(len(paramiko.transports), equal_to(2))
+
+    @patch_paramiko({'date': b'now'})
+    def test_reconnect_on_open_failure(self, paramiko):
+        ssh = self.get_ssh()
+        transport = paramiko.transports[0]
+        transport.open_session = mock.Mock(side_effect=EOFError())
+        out, _ = ssh.execute(['date'])
+        assert_that(out, equal_to(b'now'))
+        assert_that(len(paramiko.transports), equal_to(2))
+        assert_that(transport.is_active(), equal_to(False))
+
+    @patch_paramiko()
+    def test_sftp_pooled(self, paramiko):
+        ssh = self.get_ssh()
+        for i in range(3):
+            ssh.copy_file_to_remote('/tmp/a', '/home/a{}'.format(i))
+        ssh.get_remote_file('/home/a1', '/tmp/b')
+        assert_that(paramiko.transports[0].sftp_count, equal_to(1))
+        assert_that(len(paramiko.files), equal_to(3))
+
+    @patch_paramiko()
+    def test_sftp_error_not_pooled(self, paramiko):
+        ssh = self.get_ssh()
+        assert_that(calling(ssh.get_remote_file).with_args(
+            '/home/not_found', '/tmp/b'), raises(SFtpExecutionError))
+        ssh.copy_file_to_remote('/tmp/a', '/home/a')
+        assert_that(paramiko.transports[0].sftp_count, equal_to(2))
+
+    @patch_paramiko()
+    def test_sftp_reconnect(self, paramiko):
+        ssh = self.get_ssh()
+        ssh.copy_file_to_remote('/tmp/a', '/home/a')
+        paramiko.transports[0].close()
+        ssh.copy_file_to_remote('/tmp/a', '/home/b')
+        assert_that(len(paramiko.transports), equal_to(2))
+        assert_that(paramiko.transports[1].sftp_count, equal_to(1))
+
+    @patch_paramiko()
+    def test_close(self, paramiko):
+        ssh = self.get_ssh()
+        ssh.copy_file_to_remote('/tmp/a', '/home/a')
+        sftp_client = ssh._sftp_pool[0]
+        ssh.close()
+        assert_that(sftp_client.closed, equal_to(True))
+        assert_that(paramiko.transports[0].is_active(), equal_to(False))
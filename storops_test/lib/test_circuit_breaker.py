@@ -0,0 +1,162 @@
+# coding=utf-8
+# Copyright (c) 2015 EMC Corporation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+from __future__ import unicode_literals
+
+import pickle
+import unittest
+
+from hamcrest import assert_that, equal_to, raises, calling, \
+    less_than_or_equal_to, greater_than_or_equal_to
+
+from storops.exception import CircuitBreakerOpenError
+from storops.lib.circuit_breaker import CircuitBreaker, full_jitter
+from storops_test.utils import FakeClock
+
+__author__ = 'Cedric Zhuang'
+
+
+class ScheduledConnector(object):
+    """ fail or succeed according to the schedule. """
+
+    def __init__(self, schedule):
+        self.schedule = list(schedule)
+        self.call_count = 0
+
+    def __call__(self):
+        self.call_count += 1
+        if self.schedule.pop(0):
+            return 'OK'
+        raise IOError('connection refused.')
+
+
+class FullJitterTest(unittest.TestCase):
+    def test_in_range(self):
+        for tried in range(1, 8):
+            wait = full_jitter(tried)
+            assert_that(wait, greater_than_or_equal_to(0))
+            assert_that(wait, less_than_or_equal_to(2 ** (tried - 1)))
+
+    def test_cap(self):
+        assert_that(full_jitter(20, cap=3), less_than_or_equal_to(3))
+
+    def test_not_lock_step(self):
+        assert_that(len(set(full_jitter(5) for _ in range(20))),
+                    greater_than_or_equal_to(2))
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker('spa', failure_threshold=3,
+                                      recovery_timeout=10, clock=self.clock)
+
+    def call(self, connector):
+        try:
+            return self.breaker.call(connector)
+        except (IOError, CircuitBreakerOpenError) as e:
+            return e
+
+    def test_closed_by_default(self):
+        assert_that(self.breaker.state, equal_to(CircuitBreaker.CLOSED))
+
+    def test_open_after_threshold(self):
+        connector = ScheduledConnector([False] * 3)
+        for _ in range(3):
+            self.call(connector)
+        assert_that(self.breaker.state, equal_to(CircuitBreaker.OPEN))
+        assert_that(calling(self.breaker.call).with_args(connector),
+                    raises(CircuitBreakerOpenError, 'spa is open'))
+        assert_that(connector.call_count, equal_to(3))
+
+    def test_success_resets_failure_count(self):
+        connector = ScheduledConnector([False, False, True, False, False])
+        for _ in range(5):
+            self.call(connector)
+        assert_that(self.breaker.state, equal_to(CircuitBreaker.CLOSED))
+        assert_that(self.breaker.failure_count, equal_to(2))
+
+    def test_half_open_single_trial(self):
+        connector = ScheduledConnector([False] * 3 + [True])
+        for _ in range(3):
+            self.call(connector)
+        self.clock.now += 9
+        assert_that(calling(self.breaker.call).with_args(connector),
+                    raises(CircuitBreakerOpenError))
+        self.clock.now += 1
+
+        # a concurrent call is rejected while the trial is running
+        self.breaker.before_call()
+        assert_that(self.breaker.state, equal_to(CircuitBreaker.HALF_OPEN))
+        assert_that(calling(self.breaker.before_call),
+                    raises(CircuitBreakerOpenError))
+        self.breaker.on_success()
+        assert_that(self.breaker.state, equal_to(CircuitBreaker.CLOSED))
+
+    def test_half_open_trial_success(self):
+        connector = ScheduledConnector([False] * 3 + [True])
+        for _ in range(3):
+            self.call(connector)
+        self.clock.now += 10
+        assert_that(self.call(connector), equal_to('OK'))
+        assert_that(self.breaker.state, equal_to(CircuitBreaker.CLOSED))
+
+    def test_half_open_trial_failure(self):
+        connector = ScheduledConnector([False] * 4)
+        for _ in range(3):
+            self.call(connector)
+        self.clock.now += 10
+        self.call(connector)
+        assert_that(self.breaker.state, equal_to(CircuitBreaker.OPEN))
+        self.clock.now += 9
+        self.call(connector)
+        assert_that(connector.call_count, equal_to(4))
+
+    def test_half_open_trial_interrupted(self):
+        connector = ScheduledConnector([False] * 3)
+        for _ in range(3):
+            self.call(connector)
+        self.clock.now += 10
+
+        def interrupted():
+            raise KeyboardInterrupt()
+
+        assert_that(calling(self.breaker.call).with_args(interrupted),
+                    raises(KeyboardInterrupt))
+        assert_that(self.breaker.state, equal_to(CircuitBreaker.HALF_OPEN))
+        # another trial is allowed
+        assert_that(self.breaker.call(lambda: 'OK'), equal_to('OK'))
+        assert_that(self.breaker.state, equal_to(CircuitBreaker.CLOSED))
+
+    def test_error_filter(self):
+        breaker = CircuitBreaker('spa', failure_threshold=1,
+                                 error_filter=lambda e: False)
+
+        def f():
+            raise ValueError()
+
+        assert_that(calling(breaker.call).with_args(f), raises(ValueError))
+        assert_that(breaker.state, equal_to(CircuitBreaker.CLOSED))
+
+    def test_reset(self):
+        connector = ScheduledConnector([False] * 3)
+        for _ in range(3):
+            self.call(connector)
+        self.breaker.reset()
+        assert_that(self.breaker.state, equal_to(CircuitBreaker.CLOSED))
+
+    def test_pickle(self):
+        breaker = pickle.loads(pickle.dumps(CircuitBreaker('spa')))
+        assert_that(breaker.call(lambda: 'OK'), equal_to('OK'))
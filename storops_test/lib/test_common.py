@@ -17,6 +17,8 @@ from __future__ import unicode_literals
 
 import bitmath
 import logging
+import pickle
+import threading
 from multiprocessing.pool import ThreadPool
 from time import sleep
 from unittest import TestCase
@@ -29,7 +31,7 @@ from storops.lib import common
 from storops.lib.common import Dict, Enum, WeightedAverage, synchronized, \
     text_var, int_var, enum_var, yes_no_var, list_var, JsonPrinter, \
     get_lock_file, EnumList, round_3, RepeatedTimer, supplement_filesystem, \
-    try_import
+    try_import, SingleFlight
 from storops.vnx.enums import VNXRaidType
 
 log = logging.getLogger(__name__)
@@ -249,6 +251,93 @@ class SynchronizedTest(TestCase):
         assert_that(demo.call_count, equal_to(3))
 
 
+class SingleFlightTest(TestCase):
+    @staticmethod
+    def _run_together(func, count):
+        start = threading.Event()
+
+        def run(i):
+            start.wait()
+            return func(i)
+
+        pool = ThreadPool(count)
+        try:
+            result = pool.map_async(run, range(count))
+            start.set()
+            return result.get(10)
+        finally:
+            pool.close()
+            pool.join()
+
+    def test_concurrent_calls_share_result(self):
+        flight = SingleFlight()
+        calls = []
+
+        def slow(value):
+            calls.append(value)
+            sleep(0.3)
+            return value
+
+        ret = self._run_together(lambda i: flight.do('k', slow, 'v'), 20)
+        assert_that(ret, only_contains('v'))
+        assert_that(len(calls), equal_to(1))
+        assert_that(flight.call_count, equal_to(1))
+        assert_that(flight.shared_count, equal_to(19))
+        assert_that(flight.in_flight(), equal_to(0))
+
+    def test_different_keys_not_shared(self):
+        flight = SingleFlight()
+
+        def slow(value):
+            sleep(0.1)
+            return value
+
+        ret = self._run_together(lambda i: flight.do(i, slow, i), 5)
+        assert_that(ret, equal_to(list(range(5))))
+        assert_that(flight.call_count, equal_to(5))
+
+    def test_exception_shared(self):
+        flight = SingleFlight()
+
+        def failed():
+            sleep(0.3)
+            raise ValueError('failed')
+
+        def run(_):
+            try:
+                flight.do('k', failed)
+            except ValueError as e:
+                return str(e)
+
+        ret = self._run_together(run, 10)
+        assert_that(ret, only_contains('failed'))
+        assert_that(flight.call_count, equal_to(1))
+
+    def test_pickle(self):
+        flight = SingleFlight()
+        flight.do('k', lambda: 1)
+        copied = pickle.loads(pickle.dumps(flight))
+        assert_that(copied.call_count, equal_to(1))
+        assert_that(copied.do('k', lambda: 2), equal_to(2))
+
+    def test_copy_result(self):
+        flight = SingleFlight(copy_result=list)
+
+        def slow():
+            sleep(0.3)
+            return [1]
+
+        ret = self._run_together(lambda i: flight.do('k', slow), 5)
+        assert_that(ret, only_contains([1]))
+        assert_that(len(set(id(r) for r in ret)), equal_to(5))
+
+    def test_sequential_calls_not_shared(self):
+        flight = SingleFlight()
+        flight.do('k', lambda: 1)
+        flight.do('k', lambda: 1)
+        assert_that(flight.call_count, equal_to(2))
+
+
 class VarTest(TestCase):
     def test_text_var(self):
         assert_that(text_var('-a', 'a'), only_contains('-a', 'a'))
@@ -0,0 +1,211 @@
+# coding=utf-8
+# Copyright (c) 2015 EMC Corporation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+from __future__ import unicode_literals
+
+import pickle
+import threading
+import time
+import unittest
+from multiprocessing.pool import ThreadPool
+
+from hamcrest import assert_that, equal_to, greater_than_or_equal_to, \
+    less_than, close_to, raises, calling
+
+from storops.lib.limiter import TokenBucket, AimdWindow, ArrayLimiter, \
+    get_array_limiter
+from storops_test.utils import FakeClock
+
+__author__ = 'Cedric Zhuang'
+
+
+class SimulatedArray(object):
+    """ array whose latency grows with the load.
+
+    Requests beyond the capacity are rejected with 503 immediately.
+    """
+
+    def __init__(self, capacity=8, base_latency=0.002):
+        self.capacity = capacity
+        self.base_latency = base_latency
+        self.in_flight = 0
+        self.busy_count = 0
+        self.request_count = 0
+        self._lock = threading.Lock()
+
+    def request(self):
+        with self._lock:
+            self.in_flight += 1
+            self.request_count += 1
+            load = self.in_flight
+            busy = load > self.capacity
+            if busy:
+                self.busy_count += 1
+        try:
+            if busy:
+                ret = 503
+            else:
+                ratio = load / float(self.capacity)
+                time.sleep(self.base_latency * (1 + ratio ** 2))
+                ret = 200
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        return ret
+
+    @property
+    def busy_ratio(self):
+        return self.busy_count / float(self.request_count)
+
+
+def _is_busy(result, error):
+    return error is not None or result == 503
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_burst(self):
+        clock = FakeClock()
+        bucket = TokenBucket(10, burst=3, clock=clock, sleep=clock.sleep)
+        for _ in range(3):
+            assert_that(bucket.try_acquire(), equal_to(0))
+        assert_that(bucket.try_acquire(), close_to(0.1, 0.0001))
+
+    def test_refill(self):
+        clock = FakeClock()
+        bucket = TokenBucket(10, burst=2, clock=clock, sleep=clock.sleep)
+        bucket.try_acquire()
+        bucket.try_acquire()
+        clock.now += 0.15
+        assert_that(bucket.tokens, close_to(1.5, 0.0001))
+        clock.now += 10
+        assert_that(bucket.tokens, equal_to(2))
+
+    def test_acquire_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(5, burst=1, clock=clock, sleep=clock.sleep)
+        start = clock.now
+        for _ in range(11):
+            bucket.acquire()
+        assert_that(clock.now - start, close_to(2, 0.0001))
+
+
+class AimdWindowTest(unittest.TestCase):
+    def test_additive_increase(self):
+        window = AimdWindow(initial=4, max_limit=8)
+        for _ in range(4):
+            window.release(window.acquire())
+        assert_that(window.limit, close_to(5, 0.2))
+
+    def test_max_limit(self):
+        window = AimdWindow(initial=4, max_limit=5)
+        for _ in range(100):
+            window.release(window.acquire())
+        assert_that(window.limit, equal_to(5))
+
+    def test_multiplicative_decrease_once_per_event(self):
+        window = AimdWindow(initial=8)
+        tickets = [window.acquire() for _ in range(8)]
+        for ticket in tickets:
+            window.release(ticket, overloaded=True)
+        assert_that(window.limit, equal_to(4))
+        window.release(window.acquire(), overloaded=True)
+        assert_that(window.limit, equal_to(2))
+
+    def test_min_limit(self):
+        window = AimdWindow(initial=1, min_limit=1)
+        window.release(window.acquire(), overloaded=True)
+        assert_that(window.limit, equal_to(1))
+
+    def test_block_when_full(self):
+        window = AimdWindow(initial=1)
+        ticket = window.acquire()
+        acquired = threading.Event()
+
+        def f():
+            window.release(window.acquire())
+            acquired.set()
+
+        thread = threading.Thread(target=f)
+        thread.start()
+        assert_that(acquired.wait(0.1), equal_to(False))
+        window.release(ticket)
+        assert_that(acquired.wait(1), equal_to(True))
+        thread.join()
+
+
+class ArrayLimiterTest(unittest.TestCase):
+    def test_call(self):
+        limiter = ArrayLimiter('a', initial_window=2)
+        assert_that(limiter.call(_is_busy, lambda: 200), equal_to(200))
+        stats = limiter.get_stats()
+        assert_that(stats['requests'], equal_to(1))
+        assert_that(stats['in_flight'], equal_to(0))
+
+    def test_call_error(self):
+        limiter = ArrayLimiter('a', initial_window=2)
+
+        def f():
+            raise ValueError()
+
+        assert_that(calling(limiter.call).with_args(_is_busy, f),
+                    raises(ValueError))
+        stats = limiter.get_stats()
+        assert_that(stats['overloaded'], equal_to(1))
+        assert_that(stats['window'], equal_to(1))
+        assert_that(stats['in_flight'], equal_to(0))
+
+    def test_rate(self):
+        clock = FakeClock()
+        limiter = ArrayLimiter('a', rate=10, burst=1, clock=clock,
+                               sleep=clock.sleep)
+        for _ in range(11):
+            limiter.call(_is_busy, lambda: 200)
+        assert_that(limiter.get_stats()['wait_time'], close_to(1, 0.0001))
+
+    def test_get_array_limiter_shared(self):
+        assert_that(get_array_limiter('10.0.9.1'),
+                    equal_to(get_array_limiter('10.0.9.1')))
+
+    def test_pickle_shared(self):
+        limiter = get_array_limiter('10.0.9.2')
+        assert_that(pickle.loads(pickle.dumps(limiter)), equal_to(limiter))
+
+    def test_converge_on_simulated_array(self):
+        array = SimulatedArray(capacity=8)
+        limiter = ArrayLimiter('sim', initial_window=32, max_window=64)
+
+        def run(_):
+            return limiter.call(_is_busy, array.request)
+
+        pool = ThreadPool(32)
+        try:
+            pool.map(run, range(800))
+        finally:
+            pool.close()
+            pool.join()
+        # the window oscillates just around the capacity of the array
+        assert_that(limiter.window.limit, less_than(array.capacity * 1.5))
+        assert_that(limiter.window.limit, greater_than_or_equal_to(1))
+        assert_that(array.busy_ratio, less_than(0.1))
+
+    def test_overloaded_without_limiter(self):
+        array = SimulatedArray(capacity=8)
+        pool = ThreadPool(32)
+        try:
+            pool.map(lambda _: array.request(), range(800))
+        finally:
+            pool.close()
+            pool.join()
+        assert_that(array.busy_ratio, greater_than_or_equal_to(0.1))
@@ -18,9 +18,12 @@ from __future__ import unicode_literals
 from unittest import TestCase
 
 import six
-from hamcrest import assert_that, equal_to, none, only_contains
+from hamcrest import assert_that, equal_to, none, only_contains, \
+    same_instance, is_not, instance_of
 
 from storops.lib.parser import PropMapper, PropDescriptor, OutputParser
+from storops.unity.enums import RaidTypeEnum
+from storops.unity.resource.pool import UnityPool
 
 __author__ = 'Cedric Zhuang'
 
@@ -105,3 +108,46 @@ class OutputParserTest(TestCase):
         parser = DemoParser()
         assert_that(parser.property_names,
                     only_contains('id', 'prop_a', 'prop_b', 'prop_c'))
+
+    def test_plan(self):
+        parser = DemoParser()
+        assert_that(parser.plan, same_instance(parser.plan))
+        assert_that([step[:2] for step in parser.plan],
+                    only_contains(('prop_a', 'Prop A (name):'),
+                                  ('prop_b', 'Prop B:'),
+                                  ('prop_c', 'Prop C:'),
+                                  ('id', 'ID:')))
+
+    def test_plan_reset(self):
+        parser = DemoParser()
+        plan = parser.plan
+        parser.add_property(PropDescriptor('-d', 'Prop D:'))
+        assert_that(parser.plan, is_not(same_instance(plan)))
+        assert_that(len(parser.plan), equal_to(5))
+
+
+class PropDescriptorConvertTest(TestCase):
+    def test_no_converter(self):
+        prop = PropDescriptor(None, 'a')
+        assert_that(prop.get_convert_func(), none())
+        assert_that(prop.convert('1'), equal_to('1'))
+
+    def test_callable(self):
+        prop = PropDescriptor(None, 'a', converter=int)
+        assert_that(prop.get_convert_func(), same_instance(int))
+        assert_that(prop.convert('1'), equal_to(1))
+
+    def test_enum(self):
+        prop = PropDescriptor(None, 'a', converter=RaidTypeEnum)
+        assert_that(prop.convert(1), equal_to(RaidTypeEnum.RAID5))
+
+    def test_resource(self):
+        prop = PropDescriptor(None, 'a', converter=UnityPool)
+        pool = prop.convert({'id': 'pool_1'})
+        assert_that(pool, instance_of(UnityPool))
+        assert_that(pool.get_id(), equal_to('pool_1'))
+
+    def test_converter_changed(self):
+        prop = PropDescriptor(None, 'a', converter=int)
+        prop.converter = float
+        assert_that(prop.convert('1.5'), equal_to(1.5))
@@ -15,13 +15,17 @@
 #    under the License.
 from __future__ import unicode_literals
 
+import gc
+import pickle
 import unittest
 
 from hamcrest import assert_that, instance_of, has_items, equal_to, raises, \
-    is_not
+    is_not, same_instance, none
 
 from storops.lib.common import instance_cache
-from storops.lib.resource import ResourceListCollection
+from storops.lib.resource import ResourceListCollection, IdentityMap, \
+    ResourceWatcher, get_digest, get_record_clz, ResourceRecord
+from storops.unity.enums import RaidTypeEnum
 from storops.unity.resource.lun import UnityLun
 from storops.unity.resource.sp import UnityStorageProcessor, \
     UnityStorageProcessorList
@@ -76,3 +80,163 @@ class ResourceListTest(unittest.TestCase):
         def do():
             return t_unity().get_ethernet_port() + None
         assert_that(do, raises(TypeError))
+
+
+class IdentityMapTest(unittest.TestCase):
+    def test_merge_new(self):
+        identity_map = IdentityMap()
+        lun = UnityLun(_id='sv_1')
+        assert_that(identity_map.merge(lun, 'sv_1'), same_instance(lun))
+        assert_that(identity_map.get(UnityLun, 'sv_1'), same_instance(lun))
+
+    def test_merge_fresh(self):
+        identity_map = IdentityMap()
+        lun = UnityLun(_id='sv_1')
+        identity_map.merge(lun, 'sv_1')
+        other = UnityLun(_id='sv_1').update({'id': 'sv_1', 'name': 'a'})
+        assert_that(identity_map.merge(other, 'sv_1'), same_instance(lun))
+        assert_that(lun.name, equal_to('a'))
+
+    def test_merge_not_fresh(self):
+        identity_map = IdentityMap()
+        lun = UnityLun(_id='sv_1').update({'id': 'sv_1', 'name': 'a'})
+        identity_map.merge(lun, 'sv_1')
+        other = UnityLun(_id='sv_1').update({'id': 'sv_1', 'name': 'b'})
+        identity_map.merge(other, 'sv_1', fresh=False)
+        assert_that(lun.name, equal_to('a'))
+
+    def test_weak_reference(self):
+        identity_map = IdentityMap()
+        lun = UnityLun(_id='sv_1')
+        identity_map.merge(lun, 'sv_1')
+        assert_that(len(identity_map), equal_to(1))
+        del lun
+        gc.collect()
+        assert_that(len(identity_map), equal_to(0))
+        assert_that(identity_map.get(UnityLun, 'sv_1'), none())
+
+    def test_pickle(self):
+        identity_map = IdentityMap()
+        lun = UnityLun(_id='sv_1')
+        identity_map.merge(lun, 'sv_1')
+        copied = pickle.loads(pickle.dumps(identity_map))
+        assert_that(len(copied), equal_to(0))
+
+
+class ResourceWatcherTest(unittest.TestCase):
+    def test_diff(self):
+        watcher = ResourceWatcher()
+        changes = watcher.diff([('a', {'name': 'a', 'size': 1}, None),
+                                ('b', {'name': 'b', 'size': 2}, None)])
+        assert_that([(c.event, c.key) for c in changes],
+                    equal_to([('added', 'a'), ('added', 'b')]))
+        assert_that(changes[0].changed, equal_to(('name', 'size')))
+
+        changes = watcher.diff([('b', {'name': 'b', 'size': 3}, None),
+                                ('c', {'name': 'c', 'size': 1}, None)])
+        assert_that([(c.event, c.key, c.changed) for c in changes],
+                    equal_to([('modified', 'b', ('size',)),
+                              ('added', 'c', ('name', 'size')),
+                              ('removed', 'a', ())]))
+
+    def test_diff_not_changed(self):
+        watcher = ResourceWatcher()
+        watcher.diff([('a', {'name': 'a'}, None)])
+        assert_that(watcher.diff([('a', {'name': 'a'}, None)]),
+                    equal_to([]))
+
+    def test_diff_get_resource_of_changes(self):
+        watcher = ResourceWatcher()
+        built = []
+
+        def get_resource(raw):
+            built.append(raw)
+            return raw.upper()
+
+        watcher.diff([('a', {'size': 1}, 'a'), ('b', {'size': 2}, 'b')],
+                     get_resource=get_resource)
+        changes = watcher.diff([('a', {'size': 1}, 'a'),
+                                ('b', {'size': 3}, 'b')],
+                               get_resource=get_resource)
+        assert_that(changes[0].resource, equal_to('B'))
+        assert_that(built, equal_to(['a', 'b', 'b']))
+
+    def test_diff_field_removed(self):
+        watcher = ResourceWatcher()
+        watcher.diff([('a', {'name': 'a', 'size': 1}, None)])
+        changes = watcher.diff([('a', {'name': 'a'}, None)])
+        assert_that(changes[0].changed, equal_to(('size',)))
+
+    def test_digest(self):
+        assert_that(len(get_digest({'a': 1})), equal_to(8))
+        assert_that(get_digest({'a': 1, 'b': 2}),
+                    equal_to(get_digest({'b': 2, 'a': 1})))
+        assert_that(get_digest(RaidTypeEnum.RAID5),
+                    equal_to(get_digest(RaidTypeEnum.RAID5)))
+        assert_that(get_digest(RaidTypeEnum.RAID5),
+                    is_not(equal_to(get_digest(RaidTypeEnum.RAID10))))
+
+    def test_digest_resource(self):
+        lun1 = UnityLun(_id='sv_1').update({'id': 'sv_1'})
+        lun2 = UnityLun(_id='sv_2').update({'id': 'sv_2'})
+        assert_that(get_digest(lun1), is_not(equal_to(get_digest(lun2))))
+
+
+class _RecordOwner(object):
+    def __init__(self, fields=None):
+        self.promoted = 0
+        self.fields = fields
+
+    def _is_loaded_field(self, key):
+        return self.fields is None or key in self.fields
+
+    def _promote(self, record):
+        self.promoted += 1
+        return UnityLun(_id=record.id).update(record._to_dict())
+
+
+class ResourceRecordTest(unittest.TestCase):
+    def test_record_clz(self):
+        clz = get_record_clz(UnityLun)
+        assert_that(clz.__name__, equal_to('UnityLunRecord'))
+        assert_that(issubclass(clz, ResourceRecord), equal_to(True))
+        assert_that(get_record_clz(UnityLun), same_instance(clz))
+        assert_that('size_total' in clz.__slots__, equal_to(True))
+
+    def test_properties(self):
+        record = get_record_clz(UnityLun)(_RecordOwner(),
+                                          {'id': 'sv_1', 'name': 'a'})
+        assert_that(record.name, equal_to('a'))
+        assert_that(record.size_total, none())
+        assert_that(hasattr(record, '__dict__'), equal_to(False))
+        assert_that(record._to_dict(), equal_to({'id': 'sv_1', 'name': 'a'}))
+
+    def test_promote(self):
+        owner = _RecordOwner()
+        record = get_record_clz(UnityLun)(owner, {'id': 'sv_1'})
+        assert_that(owner.promoted, equal_to(0))
+        assert_that(record.get_id(), equal_to('sv_1'))
+        assert_that(record.resource_class, equal_to('lun'))
+        assert_that(owner.promoted, equal_to(1))
+        assert_that(record._promote(), instance_of(UnityLun))
+
+    def test_not_loaded_field(self):
+        owner = _RecordOwner(fields=('id', 'name'))
+        record = get_record_clz(UnityLun)(owner, {'id': 'sv_1', 'name': 'a'})
+        assert_that(record.name, equal_to('a'))
+        assert_that(owner.promoted, equal_to(0))
+        record.size_total
+        assert_that(owner.promoted, equal_to(1))
+
+    def test_set_attribute(self):
+        owner = _RecordOwner()
+        record = get_record_clz(UnityLun)(owner, {'id': 'sv_1'})
+        record.name = 'b'
+        assert_that(owner.promoted, equal_to(0))
+        record.abc = 1
+        assert_that(record._promote().abc, equal_to(1))
+
+    def test_extra_property(self):
+        record = get_record_clz(UnityLun)(_RecordOwner(),
+                                          {'id': 'sv_1', 'not a key': 1})
+        assert_that(record._to_dict()['not a key'], equal_to(1))
@@ -0,0 +1,157 @@
+# coding=utf-8
+# Copyright (c) 2015 EMC Corporation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+from __future__ import unicode_literals
+
+import pickle
+import unittest
+from multiprocessing.pool import ThreadPool
+
+from hamcrest import assert_that, equal_to, none, has_key, is_not
+
+from storops.lib.telemetry import Histogram, Telemetry, get_url_template
+
+__author__ = 'Cedric Zhuang'
+
+
+class HistogramTest(unittest.TestCase):
+    def test_empty(self):
+        h = Histogram((1, 2, 3))
+        assert_that(h.mean, none())
+        assert_that(h.percentile(50), none())
+
+    def test_record(self):
+        h = Histogram((1, 2, 3))
+        for v in (0.5, 1.5, 1.5, 2.5, 10):
+            h.record(v)
+        assert_that(h.count, equal_to(5))
+        assert_that(h.min, equal_to(0.5))
+        assert_that(h.max, equal_to(10))
+        assert_that(h.counts, equal_to([1, 2, 1, 1]))
+        assert_that(h.mean, equal_to(3.2))
+
+    def test_percentile(self):
+        h = Histogram((1, 2, 3))
+        for v in (0.5, 1.5, 1.5, 2.5, 10):
+            h.record(v)
+        assert_that(h.percentile(50), equal_to(2))
+        assert_that(h.percentile(60), equal_to(2))
+        assert_that(h.percentile(80), equal_to(3))
+        assert_that(h.percentile(99), equal_to(10))
+
+    def test_percentile_not_larger_than_max(self):
+        h = Histogram((1, 2, 3))
+        h.record(1.2)
+        assert_that(h.percentile(50), equal_to(1.2))
+
+    def test_to_dict(self):
+        h = Histogram((1, 2, 3))
+        h.record(1)
+        h.record(5)
+        d = h.to_dict()
+        assert_that(d['count'], equal_to(2))
+        assert_that(d['buckets'], equal_to([(1, 1), ('+inf', 1)]))
+
+
+class TelemetryTest(unittest.TestCase):
+    def test_record(self):
+        t = Telemetry()
+        t.record('GET /api/types/lun/instances', 0.2, 1000)
+        t.record('GET /api/types/lun/instances', 0.4, 3000, KeyError())
+        stats = t.get_stats('GET /api/types/lun/instances')
+        assert_that(stats['count'], equal_to(2))
+        assert_that(stats['errors'], equal_to({'KeyError': 1}))
+        assert_that(stats['latency']['max'], equal_to(0.4))
+        assert_that(stats['size']['total'], equal_to(4000))
+
+    def test_record_error_class(self):
+        t = Telemetry()
+        t.record('lun -list', 1, error=ValueError)
+        assert_that(t.get_stats('lun -list')['errors'],
+                    equal_to({'ValueError': 1}))
+
+    def test_record_retry(self):
+        t = Telemetry()
+        t.record_retry('lun -list', 2)
+        t.record_retry('lun -list', 0)
+        assert_that(t.get_stats('lun -list')['retries'], equal_to(2))
+
+    def test_get_stats_not_found(self):
+        assert_that(Telemetry().get_stats('abc')['count'], equal_to(0))
+
+    def test_get_stats_snapshot(self):
+        t = Telemetry()
+        t.record('a', 1)
+        stats = t.get_stats()
+        t.record('b', 1)
+        assert_that(stats, has_key('a'))
+        assert_that(stats, is_not(has_key('b')))
+
+    def test_reset(self):
+        t = Telemetry()
+        t.record('a', 1)
+        t.reset()
+        assert_that(t.get_stats(), equal_to({}))
+
+    def test_disabled(self):
+        t = Telemetry(enabled=False)
+        t.record('a', 1)
+        t.record_retry('a')
+        assert_that(t.get_stats(), equal_to({}))
+
+    def test_concurrent_record(self):
+        t = Telemetry()
+        pool = ThreadPool(8)
+        try:
+            pool.map(lambda i: t.record('k{}'.format(i % 4), i / 1000.0),
+                     range(4000))
+        finally:
+            pool.close()
+            pool.join()
+        assert_that(sum(s['count'] for s in t.get_stats().values()),
+                    equal_to(4000))
+
+    def test_pickle(self):
+        t = Telemetry()
+        t.record('a', 1)
+        copied = pickle.loads(pickle.dumps(t))
+        copied.record('b', 1)
+        assert_that(list(copied.get_stats().keys()), equal_to(['b']))
+
+
+class UrlTemplateTest(unittest.TestCase):
+    def test_collection(self):
+        assert_that(get_url_template(
+            '/api/types/lun/instances?compact=True&fields=id'),
+            equal_to('/api/types/lun/instances'))
+
+    def test_instance(self):
+        assert_that(get_url_template('/api/instances/lun/sv_2?fields=id'),
+                    equal_to('/api/instances/lun/{id}'))
+
+    def test_instance_action(self):
+        assert_that(
+            get_url_template('/api/instances/lun/sv_2/action/modify'),
+            equal_to('/api/instances/lun/{id}/action/modify'))
+
+    def test_full_url(self):
+        assert_that(
+            get_url_template('https://10.0.0.1:443/api/instances/pool/'
+                             'pool_1'),
+            equal_to('/api/instances/pool/{id}'))
+
+    def test_number(self):
+        assert_that(get_url_template('/servlets/CelerraManagementServices/12'),
+                    equal_to('/servlets/CelerraManagementServices/{id}'))
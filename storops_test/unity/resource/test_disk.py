@@ -115,6 +115,12 @@ class UnityDiskTest(TestCase):
         assert_that(ret, equal_to({True}))
         assert_that(len(disks), equal_to(26))
 
+    def test_inserted_rest_filter(self):
+        disks = UnityDiskList(cli=t_rest(), inserted=True)
+        assert_that(disks._get_rest_filter(), equal_to({'rawSize__gt': 0}))
+        disks = UnityDiskList(cli=t_rest(), inserted=False)
+        assert_that(disks._get_rest_filter(), equal_to({'rawSize__le': 0}))
+
 
 class DiskGroupTest(TestCase):
 
@@ -18,7 +18,7 @@ from __future__ import unicode_literals
 from unittest import TestCase
 
 from hamcrest import assert_that, equal_to, instance_of, contains_string, \
-    has_item
+    has_item, calling, raises, none, is_not
 
 from storops.exception import UnityFileSystemSizeTooSmallError
 from storops.unity.enums import JobStateEnum, JobTaskStateEnum
@@ -28,8 +28,11 @@ from storops.unity.resource.job import UnityJob, UnityJobList, \
 from storops.unity.resource.pool import UnityPool
 from storops.unity.resource.nas_server import UnityNasServer
 from storops import exception as ex
+from storops.unity.client import UnityClient
 
-from storops_test.unity.rest_mock import t_rest, patch_rest
+from storops_test.unity.rest_mock import t_rest, patch_rest, \
+    CollectionRestMock
+from storops_test.utils import FakeClock
 
 __author__ = 'Cedric Zhuang'
 
@@ -148,3 +151,95 @@ class UnityJobTest(TestCase):
         job = UnityJob(_id='N-345', cli=t_rest())
         assert_that(job.messages, has_item('Success'))
         assert_that(len(job.exceptions), equal_to(0))
+
+
+class JobRestMock(CollectionRestMock):
+    """ jobs moving to the next state on each query. """
+
+    def __init__(self, states):
+        super(JobRestMock, self).__init__()
+        self.states = states
+
+    def get_job(self, _id):
+        states = self.states[_id]
+        return {'id': _id, 'state': states[0].index, 'tasks': []}
+
+    @property
+    def collections(self):
+        return {'job': [self.get_job(_id) for _id in self.states]}
+
+    def _get_page(self, type_name, params):
+        ret = super(JobRestMock, self)._get_page(type_name, params)
+        for states in self.states.values():
+            if len(states) > 1:
+                states.pop(0)
+        return ret
+
+
+def get_job_client(states):
+    mock_rest = JobRestMock(states)
+    cli = UnityClient('10.244.223.61', 'admin', 'Password123!')
+    cli._rest = mock_rest
+    return cli, mock_rest
+
+
+class UnityJobListWaitAllTest(TestCase):
+    R = JobStateEnum.RUNNING
+    C = JobStateEnum.COMPLETED
+    F = JobStateEnum.FAILED
+
+    def test_wait_all(self):
+        cli, mock_rest = get_job_client({
+            'N-1': [self.R, self.C],
+            'N-2': [self.R, self.R, self.R, self.C],
+            'N-3': [self.C]})
+        clock = FakeClock()
+        jobs = UnityJobList.wait_all(cli, ['N-1', 'N-2', 'N-3'],
+                                     clock=clock, sleep=clock.sleep)
+        assert_that(list(jobs.keys()), equal_to(['N-1', 'N-2', 'N-3']))
+        assert_that(jobs['N-2'].state, equal_to(JobStateEnum.COMPLETED))
+        job_queries = [url for url in mock_rest.urls if 'filter' in url]
+        assert_that(len(job_queries), equal_to(4))
+        assert_that(job_queries[-1], is_not(contains_string('N-1')))
+        assert_that(clock.waits, equal_to([1, 1, 1]))
+
+    def test_wait_all_callback(self):
+        cli, _ = get_job_client({
+            'N-1': [self.R, self.F],
+            'N-2': [self.C]})
+        clock = FakeClock()
+        finished = []
+        UnityJobList.wait_all(
+            cli, [UnityJob(_id='N-1', cli=cli), 'N-2'],
+            callback=lambda job, e: finished.append((job.get_id(), e)),
+            clock=clock, sleep=clock.sleep)
+        assert_that(finished[0], equal_to(('N-2', None)))
+        assert_that(finished[1][0], equal_to('N-1'))
+        assert_that(finished[1][1], instance_of(ex.JobStateError))
+
+    def test_wait_all_not_found(self):
+        cli, _ = get_job_client({'N-1': [self.C]})
+        clock = FakeClock()
+        finished = []
+        jobs = UnityJobList.wait_all(
+            cli, ['N-1', 'N-9'],
+            callback=lambda job, e: finished.append((job.get_id(), e)),
+            clock=clock, sleep=clock.sleep)
+        assert_that(jobs['N-9'], none())
+        assert_that(finished[1][1],
+                    instance_of(ex.UnityResourceNotFoundError))
+
+    def test_wait_all_max_interval(self):
+        cli, _ = get_job_client({'N-1': [self.R] * 6 + [self.C]})
+        clock = FakeClock()
+        UnityJobList.wait_all(cli, ['N-1'], max_interval=5,
+                              clock=clock, sleep=clock.sleep)
+        assert_that(clock.waits, equal_to([1, 2, 4, 5, 5, 5]))
+
+    def test_wait_all_timeout(self):
+        cli, _ = get_job_client({'N-1': [self.R]})
+        clock = FakeClock(now=0)
+        assert_that(calling(UnityJobList.wait_all).with_args(
+            cli, ['N-1'], timeout=10, clock=clock, sleep=clock.sleep),
+            raises(ex.JobTimeoutException))
+        assert_that(clock.now, equal_to(10))
@@ -25,11 +25,14 @@ from storops import UnitySystem
 from storops.exception import UnitySnapNameInUseError, \
     UnityLunNameInUseError, UnityLunShrinkNotSupportedError, \
     UnityNothingToModifyError, UnityPerfMonNotEnabledError, \
-    UnityThinCloneLimitExceededError
+    UnityThinCloneLimitExceededError, JobStateError, \
+    UnityResourceNotFoundError
+from storops.unity.client import UnityClient
 from storops.unity.enums import HostLUNAccessEnum, NodeEnum, RaidTypeEnum
 from storops.unity.resource.disk import UnityDisk
 from storops.unity.resource.host import UnityBlockHostAccessList, UnityHost
-from storops.unity.resource.lun import UnityLun, UnityLunList
+from storops.unity.resource.lun import UnityLun, UnityLunList, \
+    LunCreateResult, HostAccessResult
 from storops.unity.resource.pool import UnityPool
 from storops.unity.resource.port import UnityIoLimitPolicy, \
     UnityIoLimitRuleSetting
@@ -37,7 +40,8 @@ from storops.unity.resource.snap import UnitySnap
 from storops.unity.resource.sp import UnityStorageProcessor
 from storops.unity.resource.storage_resource import UnityStorageResource
 from storops.unity.resp import RestResponse
-from storops_test.unity.rest_mock import t_rest, patch_rest, t_unity
+from storops_test.unity.rest_mock import t_rest, patch_rest, t_unity, \
+    CollectionRestMock
 from storops_test.utils import is_nan
 
 __author__ = 'Cedric Zhuang'
@@ -373,3 +377,190 @@ class UnityLunEnablePerfStatsTest(TestCase):
         assert_that(lun.pool.is_fast_cache_enabled, equal_to(False))
         assert_that(lun.host_access[0].host.name,
                     equal_to('Virtual_Machine_12'))
+
+
+class LunCreateRestMock(CollectionRestMock):
+    """ create the luns asynchronously.
+
+    The job of a lun named with `fail` fails.  The request of a lun named
+    with `used` is rejected.
+    """
+
+    attributes = {'lun': ('id', 'name')}
+
+    def __init__(self):
+        super(LunCreateRestMock, self).__init__()
+        self.jobs = {}
+        self.luns = []
+
+    def post(self, url, files=None, body=None):
+        self.urls.append(url)
+        name = body['name']
+        if 'used' in name:
+            return {'error': {'errorCode': 108007744,
+                              'messages': [{'en-US': 'name in use.'}]}}
+        job_id = 'N-{}'.format(len(self.jobs) + 1)
+        if 'fail' in name:
+            self.jobs[job_id] = 5
+        else:
+            self.jobs[job_id] = 4
+            self.luns.append({'id': 'sv_{}'.format(len(self.luns) + 1),
+                              'name': name})
+        return {'id': job_id, 'state': 2}
+
+    @property
+    def collections(self):
+        return {'job': [{'id': _id, 'state': state, 'tasks': []}
+                        for _id, state in sorted(self.jobs.items())],
+                'lun': self.luns}
+
+
+class UnityLunListCreateManyTest(TestCase):
+    @staticmethod
+    def get_client():
+        mock_rest = LunCreateRestMock()
+        cli = UnityClient('10.244.223.61', 'admin', 'Password123!')
+        cli._rest = mock_rest
+        return cli, mock_rest
+
+    @staticmethod
+    def get_spec(name):
+        return {'name': name, 'pool': 'pool_1', 'size': 1024 ** 3}
+
+    def test_create_many(self):
+        cli, mock_rest = self.get_client()
+        specs = [self.get_spec('lun_{}'.format(i)) for i in range(20)]
+        results = UnityLunList.create_many(cli, specs, concurrency=4)
+        assert_that(len(results), equal_to(20))
+        assert_that(results[0], instance_of(LunCreateResult))
+        assert_that([r.error for r in results], only_contains(none()))
+        assert_that([r.lun.name for r in results],
+                    equal_to([s['name'] for s in specs]))
+        assert_that(mock_rest.urls[0], contains_string('timeout=0'))
+        assert_that(len(mock_rest.get_list_urls('lun')), equal_to(1))
+
+    def test_create_many_partial_failure(self):
+        cli, _ = self.get_client()
+        specs = [self.get_spec('lun_1'), self.get_spec('lun_fail'),
+                 self.get_spec('lun_used'), self.get_spec('lun_2')]
+        results = UnityLunList.create_many(cli, specs)
+        assert_that(results[0].lun.get_id(), equal_to('sv_1'))
+        assert_that(results[1].lun, none())
+        assert_that(results[1].error, instance_of(JobStateError))
+        assert_that(results[2].error, instance_of(UnityLunNameInUseError))
+        assert_that(results[3].lun.get_id(), equal_to('sv_2'))
+
+    def test_create_many_invalid_spec(self):
+        cli, _ = self.get_client()
+        results = UnityLunList.create_many(cli, [{'pool': 'pool_1'}])
+        assert_that(results[0].error, instance_of(Exception))
+
+    def test_create_many_empty(self):
+        cli, _ = self.get_client()
+        assert_that(UnityLunList.create_many(cli, []), equal_to([]))
+
+
+class HostAccessRestMock(CollectionRestMock):
+    """ luns with the host access modified by `modifyLun`.
+
+    The first modification of the luns in `conflicts` fails, and another
+    client attaches `Host_9` to them in the meantime.
+    """
+
+    def __init__(self, host_access, conflicts=()):
+        super(HostAccessRestMock, self).__init__()
+        self.host_access = host_access
+        self.conflicts = set(conflicts)
+        self.modified = []
+
+    def post(self, url, files=None, body=None):
+        self.urls.append(url)
+        lun_id = url.split('/')[4]
+        if lun_id in self.conflicts:
+            self.conflicts.remove(lun_id)
+            self.host_access[lun_id]['Host_9'] = 1
+            return {'error': {'errorCode': 100666111,
+                              'messages': [{'en-US': 'busy.'}]}}
+        self.modified.append(lun_id)
+        self.host_access[lun_id] = {
+            access['host']['id']: access['accessMask']
+            for access in body['lunParameters']['hostAccess']}
+        return {}
+
+    def get_lun(self, lun_id):
+        return {'id': lun_id, 'name': lun_id,
+                'hostAccess': [{'host': {'id': host_id}, 'accessMask': mask}
+                               for host_id, mask in
+                               sorted(self.host_access[lun_id].items())]}
+
+    @property
+    def collections(self):
+        return {'lun': [self.get_lun(lun_id)
+                        for lun_id in sorted(self.host_access)]}
+
+    @property
+    def list_urls(self):
+        return self.get_list_urls('lun')
+
+
+class UnityLunListSetHostAccessTest(TestCase):
+    @staticmethod
+    def get_client(conflicts=()):
+        mock_rest = HostAccessRestMock({
+            'sv_1': {'Host_1': 1, 'Host_2': 1},
+            'sv_2': {'Host_1': 1},
+            'sv_3': {},
+            'sv_4': {'Host_3': 1}}, conflicts)
+        cli = UnityClient('10.244.223.61', 'admin', 'Password123!')
+        cli._rest = mock_rest
+        return cli, mock_rest
+
+    def test_set_host_access(self):
+        cli, mock_rest = self.get_client()
+        hosts = ['Host_1', 'Host_2']
+        ret = UnityLunList.set_host_access(
+            cli, {'sv_1': hosts, UnityLun(_id='sv_2', cli=cli): hosts,
+                  'sv_3': [UnityHost(_id='Host_2', cli=cli)], 'sv_4': []})
+        assert_that(list(ret.keys()),
+                    equal_to(['sv_1', 'sv_2', 'sv_3', 'sv_4']))
+        assert_that(ret['sv_1'], instance_of(HostAccessResult))
+        assert_that(ret['sv_1'].modified, equal_to(False))
+        assert_that(ret['sv_2'].modified, equal_to(True))
+        assert_that(sorted(mock_rest.modified),
+                    equal_to(['sv_2', 'sv_3', 'sv_4']))
+        assert_that(mock_rest.host_access['sv_2'],
+                    equal_to({'Host_1': 1, 'Host_2': 1}))
+        assert_that(mock_rest.host_access['sv_4'], equal_to({}))
+        assert_that(len(mock_rest.list_urls), equal_to(1))
+
+    def test_set_host_access_mask(self):
+        cli, mock_rest = self.get_client()
+        ret = UnityLunList.set_host_access(
+            cli, {'sv_2': {'Host_1': HostLUNAccessEnum.SNAPSHOT}})
+        assert_that(ret['sv_2'].modified, equal_to(True))
+        assert_that(mock_rest.host_access['sv_2'], equal_to({'Host_1': 2}))
+
+    def test_set_host_access_retry(self):
+        cli, mock_rest = self.get_client(conflicts=['sv_3'])
+        ret = UnityLunList.set_host_access(
+            cli, {'sv_2': ['Host_2'], 'sv_3': ['Host_2']})
+        assert_that(ret['sv_3'].modified, equal_to(True))
+        assert_that(ret['sv_3'].error, none())
+        assert_that(mock_rest.host_access['sv_3'], equal_to({'Host_2': 1}))
+        assert_that(mock_rest.modified, equal_to(['sv_2', 'sv_3']))
+        # only the failed lun is retrieved again
+        assert_that(len(mock_rest.list_urls), equal_to(2))
+        assert_that(mock_rest.list_urls[1], is_not(contains_string('sv_2')))
+
+    def test_set_host_access_retry_exceeded(self):
+        cli, mock_rest = self.get_client(conflicts=['sv_3'])
+        ret = UnityLunList.set_host_access(cli, {'sv_3': ['Host_2']},
+                                           retries=0)
+        assert_that(ret['sv_3'].modified, equal_to(False))
+        assert_that(ret['sv_3'].error, instance_of(Exception))
+
+    def test_set_host_access_not_found(self):
+        cli, _ = self.get_client()
+        ret = UnityLunList.set_host_access(cli, {'sv_9': ['Host_1']})
+        assert_that(ret['sv_9'].error,
+                    instance_of(UnityResourceNotFoundError))
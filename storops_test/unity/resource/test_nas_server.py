@@ -217,6 +217,18 @@ class UnityNasServerListTest(TestCase):
         nas_servers = UnityNasServerList(cli=t_rest(), home_sp='spb')
         assert_that(len(nas_servers), equal_to(1))
 
+    def test_home_sp_rest_filter(self):
+        nas_servers = UnityNasServerList(
+            cli=t_rest(), home_sp=UnityStorageProcessor(_id='spa'))
+        assert_that(t_rest().dict_to_filter_string(
+            nas_servers._get_rest_filter()),
+            equal_to('homeSP.id eq "spa"'))
+
+    def test_no_sp_rest_filter(self):
+        nas_servers = UnityNasServerList(cli=t_rest())
+        assert_that(t_rest().dict_to_filter_string(
+            nas_servers._get_rest_filter()), none())
+
     @patch_rest
     def test_shadow_copy_current_sp(self):
         nas_servers = UnityNasServerList(cli=t_rest(), current_sp='spa')
@@ -200,6 +200,16 @@ class UnityEthernetPortListTest(TestCase):
         assert_that(len(ports), equal_to(1))
         assert_that(ports[0].get_id(), equal_to(port_id))
 
+    def test_port_ids_rest_filter(self):
+        ports = UnityEthernetPortList(cli=t_rest(),
+                                      port_ids=['spa_eth2', 'spb_eth2'])
+        assert_that(t_rest().dict_to_filter_string(ports._get_rest_filter()),
+                    equal_to('id eq "spa_eth2" or id eq "spb_eth2"'))
+
+    def test_empty_port_ids_not_pushed_down(self):
+        ports = UnityEthernetPortList(cli=t_rest(), port_ids=[])
+        assert_that(ports._get_rest_filter(), equal_to({}))
+
 
 class UnityIscsiPortalTest(TestCase):
     @patch_rest
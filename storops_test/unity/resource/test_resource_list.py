@@ -0,0 +1,529 @@
+# coding=utf-8
+# Copyright (c) 2015 EMC Corporation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+from __future__ import unicode_literals
+
+import unittest
+from unittest import TestCase
+
+import mock
+from hamcrest import assert_that, equal_to, less_than, instance_of, \
+    contains_string, greater_than, less_than_or_equal_to, calling, raises, \
+    same_instance, is_not, only_contains, none, has_key
+from six.moves.urllib.parse import quote
+
+from storops.lib.common import try_import
+from storops.lib.resource import ResourceRecord
+from storops.unity.client import UnityClient
+from storops.unity.parser import LazyParsedRecord
+from storops.unity.resource.lun import UnityLun, UnityLunList
+from storops.unity.resource.system import UnitySystem
+from storops_test.unity.rest_mock import t_paged_rest, patch_rest, t_rest, \
+    CollectionRestMock
+from storops_test.utils import FakeClock
+
+tracemalloc = try_import('tracemalloc')
+
+__author__ = 'Cedric Zhuang'
+
+
+class UnityResourceListIterTest(TestCase):
+    def test_iter_yields_resources(self):
+        cli, mock_rest = t_paged_rest(25, default_per_page=10)
+        luns = list(UnityLunList(cli=cli).iter())
+        assert_that(len(luns), equal_to(25))
+        assert_that(luns[0], instance_of(UnityLun))
+        assert_that(luns[24].name, equal_to('lun_24'))
+        assert_that(len(mock_rest.page_urls), equal_to(3))
+
+    def test_iter_lazy_pages(self):
+        cli, mock_rest = t_paged_rest(25, default_per_page=10)
+        it = UnityLunList(cli=cli).iter()
+        next(it)
+        assert_that(len(mock_rest.page_urls), equal_to(1))
+
+    def test_iter_per_page(self):
+        cli, mock_rest = t_paged_rest(25)
+        assert_that(len(list(UnityLunList(cli=cli).iter(per_page=5))),
+                    equal_to(25))
+        assert_that(len(mock_rest.page_urls), equal_to(5))
+
+    def test_iter_not_kept_in_list(self):
+        cli, _ = t_paged_rest(5)
+        lun_list = UnityLunList(cli=cli)
+        list(lun_list.iter())
+        assert_that(lun_list._list, equal_to(None))
+
+    @patch_rest
+    def test_iter_same_as_list(self):
+        lun_list = UnityLunList(cli=t_rest())
+        assert_that([lun.get_id() for lun in lun_list.iter()],
+                    equal_to([lun.get_id() for lun in lun_list]))
+
+    @unittest.skipIf(tracemalloc is None, 'tracemalloc not available.')
+    def test_iter_memory_bounded_by_page_size(self):
+        def get_peak(entry_count):
+            cli, _ = t_paged_rest(entry_count, default_per_page=1000)
+            tracemalloc.start()
+            try:
+                count = 0
+                for _ in UnityLunList(cli=cli).iter():
+                    count += 1
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            assert_that(count, equal_to(entry_count))
+            return peak
+
+        small = get_peak(5000)
+        large = get_peak(100000)
+        # 20 times more entries, peak memory stays in the same magnitude
+        assert_that(large, less_than(small * 2))
+
+
+class UnityResourceListGetManyTest(TestCase):
+    def test_get_many_by_ids(self):
+        cli, mock_rest = t_paged_rest(100)
+        found, missing = UnityLunList.get_many(
+            cli, ids=['sv_3', 'sv_1', 'sv_500'])
+        assert_that(list(found.keys()), equal_to(['sv_3', 'sv_1']))
+        assert_that(found['sv_1'].name, equal_to('lun_1'))
+        assert_that(missing, equal_to(['sv_500']))
+        assert_that(len(mock_rest.page_urls), equal_to(1))
+
+    def test_get_many_by_name(self):
+        cli, _ = t_paged_rest(100)
+        found, missing = UnityLunList.get_many(cli, name=['lun_5', 'lun_x'])
+        assert_that(found['lun_5'].get_id(), equal_to('sv_5'))
+        assert_that(missing, equal_to(['lun_x']))
+
+    def test_get_many_or_filter(self):
+        cli, mock_rest = t_paged_rest(100)
+        UnityLunList.get_many(cli, ids=['sv_1', 'sv_2'])
+        assert_that(mock_rest.page_urls[0],
+                    contains_string('filter=id eq "sv_1" or id eq "sv_2"'))
+
+    def test_get_many_chunks(self):
+        cli, mock_rest = t_paged_rest(1000)
+        ids = ['sv_{}'.format(i) for i in range(500)]
+        found, missing = UnityLunList.get_many(cli, ids=ids,
+                                               max_filter_length=500)
+        assert_that(len(found), equal_to(500))
+        assert_that(missing, equal_to([]))
+        assert_that(list(found.keys()), equal_to(ids))
+        assert_that(len(mock_rest.page_urls), greater_than(1))
+        for url in mock_rest.page_urls:
+            the_filter = url.split('filter=')[1].split('&')[0]
+            assert_that(len(quote(the_filter)), less_than_or_equal_to(500))
+
+    def test_get_many_concurrently(self):
+        cli, mock_rest = t_paged_rest(1000, latency=0.05)
+        ids = ['sv_{}'.format(i) for i in range(200)]
+        found, _ = UnityLunList.get_many(cli, ids=ids, workers=4,
+                                         max_filter_length=500)
+        assert_that(len(found), equal_to(200))
+        assert_that(mock_rest.max_in_flight, greater_than(1))
+
+    def test_get_many_duplicated_keys(self):
+        cli, mock_rest = t_paged_rest(10)
+        found, _ = UnityLunList.get_many(cli, ids=['sv_1', 'sv_1'])
+        assert_that(list(found.keys()), equal_to(['sv_1']))
+        assert_that(mock_rest.page_urls[0].count('sv_1'), equal_to(1))
+
+    def test_get_many_no_key(self):
+        cli, _ = t_paged_rest(10)
+        assert_that(calling(UnityLunList.get_many).with_args(cli),
+                    raises(ValueError))
+
+    def test_get_many_invalid_property(self):
+        cli, _ = t_paged_rest(10)
+        assert_that(calling(UnityLunList.get_many).with_args(
+            cli, abc=['a']), raises(ValueError, 'not a valid property'))
+
+
+class UnityResourceListFieldsTest(TestCase):
+    def test_fields_in_query(self):
+        cli, mock_rest = t_paged_rest(10)
+        luns = UnityLunList(cli=cli, fields=['name', 'size_total'])
+        assert_that(len(luns), equal_to(10))
+        assert_that(mock_rest.page_urls[0],
+                    contains_string('fields=id,name,sizeTotal'))
+        # type metadata is not required
+        assert_that(len(mock_rest.urls), equal_to(1))
+
+    def test_fields_string_of_labels(self):
+        cli, mock_rest = t_paged_rest(10)
+        luns = UnityLunList(cli=cli, fields='name,sizeTotal')
+        assert_that(luns[3].size_total, equal_to(4 * 1024 ** 3))
+        assert_that(mock_rest.page_urls[0],
+                    contains_string('fields=id,name,sizeTotal'))
+
+    def test_fields_no_fetch_for_loaded(self):
+        cli, mock_rest = t_paged_rest(10)
+        luns = UnityLunList(cli=cli, fields=['name'])
+        assert_that(luns.name[2], equal_to('lun_2'))
+        assert_that(luns[2].get_id(), equal_to('sv_2'))
+        assert_that(len(mock_rest.urls), equal_to(1))
+
+    def test_fields_lazy_fetch(self):
+        cli, mock_rest = t_paged_rest(10)
+        lun = UnityLunList(cli=cli, fields=['name'])[2]
+        assert_that(lun.description, equal_to('description of lun_2'))
+        assert_that(mock_rest.urls[-1],
+                    contains_string('/api/instances/lun/sv_2?'))
+        count = len(mock_rest.urls)
+        assert_that(lun.size_total, equal_to(3 * 1024 ** 3))
+        assert_that(len(mock_rest.urls), equal_to(count))
+
+    def test_fields_iter(self):
+        cli, mock_rest = t_paged_rest(25, default_per_page=10)
+        luns = list(UnityLunList(cli=cli, fields=['name']).iter())
+        assert_that(luns[24].name, equal_to('lun_24'))
+        assert_that(len(mock_rest.urls), equal_to(3))
+        assert_that(luns[24].size_total, equal_to(25 * 1024 ** 3))
+        assert_that(len(mock_rest.urls), equal_to(5))
+
+    def test_fields_with_filter(self):
+        cli, mock_rest = t_paged_rest(10)
+        luns = UnityLunList(cli=cli, fields=['name'], name='lun_3')
+        assert_that(len(luns), equal_to(1))
+        assert_that(mock_rest.page_urls[0],
+                    contains_string('filter=name eq "lun_3"'))
+
+    def test_fields_invalid(self):
+        cli, _ = t_paged_rest(10)
+        assert_that(calling(UnityLunList).with_args(cli=cli, fields=['abc']),
+                    raises(ValueError, 'not a valid property'))
+
+    def test_all_fields_by_default(self):
+        cli, mock_rest = t_paged_rest(10)
+        lun = UnityLunList(cli=cli)[2]
+        assert_that(lun.description, equal_to('description of lun_2'))
+        assert_that(mock_rest.urls[-1], contains_string('/types/lun/'))
+
+    def test_system_get_fields(self):
+        cli, mock_rest = t_paged_rest(10)
+        system = UnitySystem(cli=cli)
+        lun = system.get_lun(name='lun_4', fields=['name'])
+        assert_that(lun.get_id(), equal_to('sv_4'))
+        assert_that(mock_rest.page_urls[0], contains_string('fields=id,name&'))
+
+
+class UnityResourceListFilterTest(TestCase):
+    def test_operator(self):
+        cli, mock_rest = t_paged_rest(10)
+        len(UnityLunList(cli=cli, size_total__gt=1024, name__lk='lun%'))
+        assert_that(mock_rest.page_urls[0], contains_string(
+            'filter=name lk "lun%" and sizeTotal gt 1024'))
+
+    def test_operator_in(self):
+        cli, mock_rest = t_paged_rest(10)
+        luns = UnityLunList(cli=cli, id__in=['sv_1', 'sv_3'])
+        assert_that(luns.name, equal_to(['lun_1', 'lun_3']))
+        assert_that(mock_rest.page_urls[0], contains_string(
+            'filter=id eq "sv_1" or id eq "sv_3"'))
+
+    def test_operator_invalid_property(self):
+        cli, _ = t_paged_rest(10)
+        assert_that(calling(len).with_args(
+            UnityLunList(cli=cli, abc__gt=1)),
+            raises(ValueError, 'not a valid property'))
+
+    def test_operator_invalid(self):
+        cli, _ = t_paged_rest(10)
+        assert_that(calling(len).with_args(
+            UnityLunList(cli=cli, name__abc=1)),
+            raises(ValueError, 'not a valid filter operator'))
+
+
+class RelationRestMock(CollectionRestMock):
+    """ luns referencing the pools and the hosts.
+
+    Only the ids of the referenced resources are returned with the luns.
+    """
+
+    def __init__(self, lun_count=6):
+        super(RelationRestMock, self).__init__()
+        self.lun_count = lun_count
+        self.names = {}
+
+    def get_lun(self, i):
+        _id = 'sv_{}'.format(i)
+        return {'id': _id, 'name': self.names.get(_id, 'lun_{}'.format(i)),
+                'pool': {'id': 'pool_{}'.format(i % 2 + 1)},
+                'hostAccess': [{'host': {'id': 'Host_{}'.format(i % 3 + 1)},
+                                'accessMask': 1}]}
+
+    @property
+    def collections(self):
+        return {
+            'lun': [self.get_lun(i) for i in range(self.lun_count)],
+            'pool': [{'id': 'pool_{}'.format(i), 'name': 'p{}'.format(i)}
+                     for i in (1, 2)],
+            'host': [{'id': 'Host_{}'.format(i), 'name': 'h{}'.format(i)}
+                     for i in (1, 2, 3)]}
+
+
+def get_relation_client(**kwargs):
+    mock_rest = RelationRestMock()
+    client = UnityClient('10.244.223.61', 'admin', 'Password123!', **kwargs)
+    client._rest = mock_rest
+    return client, mock_rest
+
+
+class UnityResourceListPrefetchTest(TestCase):
+    @staticmethod
+    def get_client():
+        return get_relation_client()
+
+    def test_without_prefetch(self):
+        cli, mock_rest = self.get_client()
+        luns = UnityLunList(cli=cli)
+        assert_that([lun.pool.name for lun in luns],
+                    equal_to(['p1', 'p2', 'p1', 'p2', 'p1', 'p2']))
+        assert_that(len(mock_rest.instance_urls), equal_to(7))
+
+    def test_prefetch(self):
+        cli, mock_rest = self.get_client()
+        luns = UnityLunList(cli=cli, prefetch=('pool', 'host_access.host'))
+        assert_that([lun.pool.name for lun in luns],
+                    equal_to(['p1', 'p2', 'p1', 'p2', 'p1', 'p2']))
+        assert_that([lun.host_access[0].host.name for lun in luns],
+                    equal_to(['h1', 'h2', 'h3', 'h1', 'h2', 'h3']))
+        urls = mock_rest.instance_urls
+        assert_that(len(urls), equal_to(3))
+        assert_that(urls[1], contains_string(
+            'filter=id eq "pool_1" or id eq "pool_2"'))
+
+    def test_prefetch_string(self):
+        cli, mock_rest = self.get_client()
+        luns = UnityLunList(cli=cli, prefetch='pool, host_access.host')
+        assert_that(luns[0].host_access[0].host.name, equal_to('h1'))
+        assert_that(len(mock_rest.instance_urls), equal_to(3))
+
+    def test_prefetch_iter(self):
+        cli, mock_rest = self.get_client()
+        luns = UnityLunList(cli=cli, prefetch='pool')
+        names = [lun.pool.name for lun in luns.iter(per_page=4)]
+        assert_that(names, equal_to(['p1', 'p2', 'p1', 'p2', 'p1', 'p2']))
+        # one request of the pools for each page
+        assert_that(len(mock_rest.instance_urls), equal_to(4))
+
+    def test_prefetch_with_fields(self):
+        cli, mock_rest = self.get_client()
+        luns = UnityLunList(cli=cli, fields=['name'], prefetch='pool')
+        assert_that(luns[5].pool.name, equal_to('p2'))
+        urls = mock_rest.instance_urls
+        assert_that(urls[0], contains_string('fields=id,name,pool'))
+        assert_that(len(urls), equal_to(2))
+
+    def test_prefetch_from_system(self):
+        cli, mock_rest = self.get_client()
+        luns = UnitySystem(cli=cli).get_lun(prefetch=['pool'])
+        assert_that(luns[1].pool.name, equal_to('p2'))
+        assert_that(len(mock_rest.instance_urls), equal_to(2))
+
+    def test_prefetch_not_relation(self):
+        assert_that(calling(UnityLunList).with_args(prefetch='name'),
+                    raises(ValueError, 'not a related resource'))
+
+    def test_prefetch_invalid_nested(self):
+        assert_that(calling(UnityLunList).with_args(prefetch='pool.abc'),
+                    raises(ValueError, 'not a related resource'))
+
+
+class UnityResourceListIdentityMapTest(TestCase):
+    def test_related_resource(self):
+        cli, mock_rest = get_relation_client(identity_map=True)
+        luns = UnityLunList(cli=cli)
+        assert_that(luns[0].pool, same_instance(luns[2].pool))
+        assert_that([lun.pool.name for lun in luns],
+                    equal_to(['p1', 'p2', 'p1', 'p2', 'p1', 'p2']))
+        # one request for the luns and one for each pool
+        assert_that(len(mock_rest.instance_urls), equal_to(3))
+
+    def test_without_identity_map(self):
+        cli, _ = get_relation_client()
+        luns = UnityLunList(cli=cli)
+        assert_that(luns[0].pool, is_not(same_instance(luns[2].pool)))
+        assert_that(UnityLunList(cli=cli)[0],
+                    is_not(same_instance(luns[0])))
+
+    def test_lists(self):
+        cli, _ = get_relation_client(identity_map=True)
+        luns = UnityLunList(cli=cli)
+        assert_that(UnityLunList(cli=cli)[1], same_instance(luns[1]))
+        assert_that(UnityLun.get(cli, 'sv_1'), same_instance(luns[1]))
+
+    def test_update_merged(self):
+        cli, mock_rest = get_relation_client(identity_map=True)
+        lun = UnityLun.get(cli, 'sv_3')
+        luns = UnityLunList(cli=cli, fields='name')
+        assert_that(luns[3], same_instance(lun))
+        assert_that(lun.name, equal_to('lun_3'))
+
+    def test_prefetch(self):
+        cli, mock_rest = get_relation_client(identity_map=True)
+        luns = UnityLunList(cli=cli, prefetch='pool')
+        assert_that(luns[0].pool, same_instance(luns[4].pool))
+        assert_that(luns[4].pool.name, equal_to('p1'))
+        assert_that(len(mock_rest.instance_urls), equal_to(2))
+
+
+class UnityResourceListWatchTest(TestCase):
+    def test_watch(self):
+        cli, mock_rest = get_relation_client()
+        clock = FakeClock()
+        watch = UnityLunList(cli=cli).watch(interval=60, polls=2,
+                                            clock=clock, sleep=clock.sleep)
+        added = [next(watch) for _ in range(6)]
+        assert_that([c.event for c in added], only_contains('added'))
+        assert_that(added[1].resource.name, equal_to('lun_1'))
+        assert_that(added[1].changed,
+                    equal_to(('host_access', 'id', 'name', 'pool')))
+
+        mock_rest.lun_count = 5
+        mock_rest.names['sv_1'] = 'renamed'
+        changes = list(watch)
+        assert_that([(c.event, c.key, c.changed) for c in changes],
+                    equal_to([('modified', 'sv_1', ('name',)),
+                              ('removed', 'sv_5', ())]))
+        assert_that(changes[0].resource.name, equal_to('renamed'))
+        assert_that(clock.waits, equal_to([60]))
+
+    def test_watch_interval_from_poll_start(self):
+        cli, _ = get_relation_client()
+        clock = FakeClock()
+        luns = UnityLunList(cli=cli, fields='name')
+        origin = luns._get_watch_items
+
+        def slow_poll():
+            clock.now += 15
+            return origin()
+
+        luns._get_watch_items = slow_poll
+        list(luns.watch(interval=60, polls=3, clock=clock,
+                        sleep=clock.sleep))
+        assert_that(clock.waits, equal_to([45, 45]))
+
+    def test_watch_build_changed_only(self):
+        cli, mock_rest = get_relation_client()
+        clock = FakeClock()
+        with mock.patch.object(UnityLunList, '_build_item', autospec=True,
+                               side_effect=UnityLunList._build_item) as build:
+            watch = UnityLunList(cli=cli).watch(polls=2, clock=clock,
+                                                sleep=clock.sleep)
+            added = [next(watch) for _ in range(6)]
+            assert_that(build.call_count, equal_to(6))
+            assert_that(added[1].resource, instance_of(UnityLun))
+            mock_rest.names['sv_1'] = 'renamed'
+            changes = list(watch)
+        assert_that(build.call_count, equal_to(7))
+        assert_that(changes[0].resource.name, equal_to('renamed'))
+
+    def test_watch_not_changed(self):
+        cli, mock_rest = get_relation_client()
+        luns = UnityLunList(cli=cli, fields='name')
+        clock = FakeClock()
+        changes = list(luns.watch(polls=3, include_existing=False,
+                                  clock=clock, sleep=clock.sleep))
+        assert_that(changes, equal_to([]))
+        assert_that(len(mock_rest.instance_urls), equal_to(3))
+        assert_that(mock_rest.instance_urls[0],
+                    contains_string('fields=id,name'))
+
+
+class UnityResourceListLazyTest(TestCase):
+    def test_lazy_parse(self):
+        cli, mock_rest = t_paged_rest(10, lazy_parse=True)
+        lun = UnityLunList(cli=cli)[3]
+        parsed = lun._parsed_resource
+        assert_that(parsed, instance_of(LazyParsedRecord))
+        assert_that(lun.name, equal_to('lun_3'))
+        assert_that(parsed._converted, is_not(has_key('size_total')))
+        assert_that(len(mock_rest.urls), equal_to(2))
+
+    def test_related_resource(self):
+        cli, _ = get_relation_client(lazy_parse=True)
+        luns = UnityLunList(cli=cli)
+        assert_that(luns[1].pool.name, equal_to('p2'))
+        assert_that(luns[1].host_access[0].host.get_id(),
+                    equal_to('Host_2'))
+
+    def test_not_lazy_by_default(self):
+        cli, _ = t_paged_rest(10)
+        lun = UnityLunList(cli=cli)[3]
+        assert_that(lun._parsed_resource, instance_of(dict))
+
+
+class UnityResourceListCompactTest(TestCase):
+    def test_record(self):
+        cli, mock_rest = t_paged_rest(10)
+        luns = UnityLunList(cli=cli, compact=True)
+        assert_that(luns[3], instance_of(ResourceRecord))
+        assert_that(luns[3].name, equal_to('lun_3'))
+        assert_that(luns.name[:2], equal_to(['lun_0', 'lun_1']))
+        assert_that(luns[3].is_thin_enabled, none())
+        assert_that(len(mock_rest.urls), equal_to(2))
+
+    def test_promote(self):
+        cli, _ = t_paged_rest(10)
+        luns = UnityLunList(cli=cli, compact=True)
+        assert_that(luns[3].get_id(), equal_to('sv_3'))
+        lun = luns[3]._promote()
+        assert_that(lun, instance_of(UnityLun))
+        assert_that(lun._cli, same_instance(cli))
+
+    def test_related_resource(self):
+        cli, _ = get_relation_client()
+        luns = UnityLunList(cli=cli, compact=True)
+        assert_that(luns[1].pool.name, equal_to('p2'))
+
+    def test_promote_sparse(self):
+        cli, mock_rest = t_paged_rest(10)
+        luns = UnityLunList(cli=cli, fields='name', compact=True)
+        lun = luns[3]._promote()
+        assert_that(lun.description, equal_to('description of lun_3'))
+        assert_that(mock_rest.urls[-1], contains_string(
+            '/api/instances/lun/sv_3'))
+
+    def test_not_loaded_field(self):
+        cli, mock_rest = t_paged_rest(10)
+        luns = UnityLunList(cli=cli, fields='name', compact=True)
+        assert_that(luns[3].description, equal_to('description of lun_3'))
+        assert_that(mock_rest.urls[-1], contains_string(
+            '/api/instances/lun/sv_3'))
+
+    @unittest.skipIf(tracemalloc is None, 'tracemalloc not available.')
+    def test_footprint(self):
+        def get_size_per_row(compact):
+            cli, _ = t_paged_rest(2000)
+            tracemalloc.start()
+            try:
+                luns = UnityLunList(cli=cli, compact=compact).update()
+                snapshot = tracemalloc.take_snapshot()
+            finally:
+                tracemalloc.stop()
+            size = sum(stat.size for stat in snapshot.statistics('lineno'))
+            return size / float(len(luns))
+
+        # warm up the caches like the parser configs and the record class
+        # so that they are not counted in either mode
+        for compact in (True, False):
+            cli, _ = t_paged_rest(10)
+            UnityLunList(cli=cli, compact=compact).update()
+
+        assert_that(get_size_per_row(True),
+                    less_than(get_size_per_row(False) * 0.8))
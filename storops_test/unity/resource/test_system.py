@@ -93,6 +93,11 @@ class UnitySystemTest(TestCase):
         system = UnitySystem('10.244.223.66', 'admin', 'Password123!')
         assert_that(system.model, equal_to('Unity 500'))
 
+    def test_init_lazy_parse(self):
+        system = UnitySystem('10.244.223.66', 'admin', 'Password123!',
+                             lazy_parse=True)
+        assert_that(system._cli.lazy_parse, equal_to(True))
+
     @patch_rest
     def test_get_all(self):
         systems = UnitySystemList(cli=t_rest())
@@ -19,6 +19,11 @@ import functools
 import json
 import logging
 import os
+import re
+import threading
+import time
+
+from six.moves.urllib.parse import urlparse, parse_qs
 
 from mock import patch
 
@@ -26,6 +31,7 @@ from storops.exception import MockFileNotFoundError
 from storops.lib.common import cache, allow_omit_parentheses
 from storops.unity.client import UnityClient
 import storops.unity.resource.system
+from storops_test.unity.rest_server import compile_filter
 from storops_test.utils import ConnectorMock, read_test_file
 
 __author__ = 'Cedric Zhuang'
@@ -115,6 +121,188 @@ class MockRestClient(ConnectorMock):
         return ret
 
 
+class PagedRestMock(object):
+    """ serve a synthetic collection page by page.
+
+    Entries are like `{'id': 'sv_<n>', 'name': 'lun_<n>', ...}`.  Only
+    the requested fields are returned.  Calls and the maximum number of
+    concurrent requests are recorded.
+    """
+
+    def __init__(self, entry_count, latency=0, default_per_page=2000):
+        self.entry_count = entry_count
+        self.latency = latency
+        self.default_per_page = default_per_page
+        self.urls = []
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def page_urls(self):
+        return [url for url in self.urls if '/instances?' in url]
+
+    @staticmethod
+    def get_entry(index):
+        return {'id': 'sv_{}'.format(index), 'name': 'lun_{}'.format(index),
+                'sizeTotal': (index + 1) * 1024 ** 3,
+                'description': 'description of lun_{}'.format(index)}
+
+    @staticmethod
+    def _project(entry, params):
+        fields = params.get('fields', [''])[0]
+        if fields:
+            fields = fields.split(',')
+            entry = {k: v for k, v in entry.items() if k in fields}
+        return entry
+
+    def get(self, url, **kwargs):
+        with self._lock:
+            self.urls.append(url)
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            return self._get_page(url)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _get_page(self, url):
+        parsed = urlparse(url)
+        params = parse_qs(parsed.query)
+        if parsed.path.startswith('/api/instances/'):
+            index = int(parsed.path.split('_')[-1])
+            return {'content': self._project(self.get_entry(index), params)}
+        if not parsed.path.endswith('/instances'):
+            # type metadata query
+            attributes = [{'name': name} for name in sorted(
+                self.get_entry(0).keys())]
+            return {'content': {'name': parsed.path.split('/')[-1],
+                                'attributes': attributes}}
+        page = int(params.get('page', [1])[0])
+        per_page = int(params.get('per_page', [self.default_per_page])[0])
+        if 'filter' in params:
+            indices = self._filter(params['filter'][0])
+        else:
+            indices = range(self.entry_count)
+        start = (page - 1) * per_page
+        end = min(start + per_page, len(indices))
+        ret = {
+            'links': [{'rel': 'self', 'href': '&page={}'.format(page)}],
+            'entries': [{'content': self._project(self.get_entry(i), params)}
+                        for i in indices[start:end]]}
+        if end < len(indices):
+            ret['links'].append(
+                {'rel': 'next', 'href': '&page={}'.format(page + 1)})
+        if 'with_entrycount' in params:
+            ret['entryCount'] = len(indices)
+        return ret
+
+    def _filter(self, the_filter):
+        # support `id eq "sv_<n>" or name eq "lun_<n>"` only
+        ret = set()
+        for value in re.findall(r'(?:id|name) eq "(?:sv|lun)_(\d+)"',
+                                the_filter):
+            if int(value) < self.entry_count:
+                ret.add(int(value))
+        return sorted(ret)
+
+
+def t_paged_rest(entry_count, latency=0, default_per_page=2000, **kwargs):
+    """ get a unity client backed by a `PagedRestMock`.
+
+    :param kwargs: options of the `UnityClient`.
+    :return: tuple of the client and the mock
+    """
+    client = UnityClient('10.244.223.61', 'admin', 'Password123!',
+                         verify=False, **kwargs)
+    mock_rest = PagedRestMock(entry_count, latency, default_per_page)
+    client._rest = mock_rest
+    return client, mock_rest
+
+
+class CollectionRestMock(object):
+    """ serve the collections of the resources in memory.
+
+    Override `collections` to return the dictionary of the type name to
+    the contents of the resources.  Instances, type metadata and the
+    collections with the rest filters and the paging are served.
+    """
+
+    # type name to the attribute names in the metadata.  Keys of the first
+    # content are used if the type is not here.
+    attributes = {}
+
+    def __init__(self):
+        self.urls = []
+
+    @property
+    def collections(self):
+        raise NotImplementedError()
+
+    @property
+    def instance_urls(self):
+        return [url for url in self.urls if 'instances' in url]
+
+    def get_list_urls(self, type_name):
+        prefix = '/api/types/{}/instances'.format(type_name)
+        return [url for url in self.urls if url.startswith(prefix)]
+
+    def get_contents(self, type_name):
+        return self.collections.get(type_name, [])
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        parsed = urlparse(url)
+        params = parse_qs(parsed.query)
+        names = parsed.path.strip('/').split('/')
+        if names[1] == 'instances':
+            ret = self._get_instance(names[2], names[3])
+        elif len(names) == 3:
+            ret = {'content': {'name': names[2],
+                               'attributes': self._get_attributes(names[2])}}
+        else:
+            ret = self._get_page(names[2], params)
+        return ret
+
+    def _get_instance(self, type_name, _id):
+        for content in self.get_contents(type_name):
+            if content['id'] == _id:
+                ret = {'content': content}
+                break
+        else:
+            ret = {'error': {'errorCode': 131149829, 'httpStatusCode': 404,
+                             'messages': [{'en-US': 'not found.'}]}}
+        return ret
+
+    def _get_attributes(self, type_name):
+        names = self.attributes.get(type_name)
+        if names is None:
+            contents = self.get_contents(type_name)
+            names = contents[0].keys() if contents else ('id',)
+        return [{'name': name} for name in names]
+
+    def _get_page(self, type_name, params):
+        contents = self.get_contents(type_name)
+        if 'filter' in params:
+            matched = compile_filter(params['filter'][0])
+            contents = [c for c in contents if matched(c)]
+        page = int(params.get('page', [1])[0])
+        per_page = int(params.get('per_page', [2000])[0])
+        start = (page - 1) * per_page
+        ret = {'entries': [{'content': c}
+                           for c in contents[start:start + per_page]],
+               'links': [{'rel': 'self', 'href': '&page={}'.format(page)}]}
+        if start + per_page < len(contents):
+            ret['links'].append(
+                {'rel': 'next', 'href': '&page={}'.format(page + 1)})
+        if 'with_entrycount' in params:
+            ret['entryCount'] = len(contents)
+        return ret
+
+
 @allow_omit_parentheses
 def patch_rest(output=None, mock_map=None):
     rest = MockRestClient(output, mock_map)
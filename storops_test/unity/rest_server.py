@@ -0,0 +1,538 @@
+# coding=utf-8
+# Copyright (c) 2015 EMC Corporation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+from __future__ import unicode_literals
+
+import base64
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import six
+from six.moves import BaseHTTPServer, socketserver
+from six.moves.urllib.parse import urlparse, parse_qs
+
+from storops.unity.client import UnityClient
+from storops_test.utils import read_test_file
+
+__author__ = 'Cedric Zhuang'
+
+log = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(
+    r'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|([^\s()"]+))')
+
+
+def _tokenize(expression):
+    ret = []
+    pos = 0
+    expression = expression.strip()
+    while pos < len(expression):
+        matched = _TOKEN_PATTERN.match(expression, pos)
+        if matched is None:
+            raise ValueError('invalid filter: {}.'.format(expression))
+        left, right, quoted, word = matched.groups()
+        if left:
+            ret.append(('(', None))
+        elif right:
+            ret.append((')', None))
+        elif quoted is not None:
+            ret.append(('value', quoted.replace('\\"', '"')))
+        else:
+            ret.append(('word', word))
+        pos = matched.end()
+    return ret
+
+
+def _to_value(word):
+    lower = word.lower()
+    if lower in ('true', 'false'):
+        ret = lower == 'true'
+    elif lower == 'null':
+        ret = None
+    else:
+        try:
+            ret = int(word)
+        except ValueError:
+            try:
+                ret = float(word)
+            except ValueError:
+                ret = word
+    return ret
+
+
+def get_value(content, path):
+    """ get the value of a dotted path like `pool.id` from the content. """
+    ret = content
+    for key in path.split('.'):
+        if not isinstance(ret, dict):
+            return None
+        ret = ret.get(key)
+    return ret
+
+
+def _like(value, pattern):
+    regex = '.*'.join(re.escape(p) for p in pattern.split('%'))
+    return (isinstance(value, six.string_types) and
+            re.match('^{}$'.format(regex), value) is not None)
+
+
+def _compare(op, value, expected):
+    if op == 'eq':
+        ret = value == expected
+    elif op == 'ne':
+        ret = value != expected
+    elif op == 'lk':
+        ret = _like(value, expected)
+    elif value is None or expected is None:
+        ret = False
+    elif op == 'lt':
+        ret = value < expected
+    elif op == 'le':
+        ret = value <= expected
+    elif op == 'gt':
+        ret = value > expected
+    elif op == 'ge':
+        ret = value >= expected
+    else:
+        raise ValueError('filter operator {} not supported.'.format(op))
+    return ret
+
+
+def compile_filter(expression):
+    """ compile the rest filter to a function checking the content.
+
+    Comparisons like `sizeTotal gt 100` or `name lk "lun%"` are supported,
+    combined with `and`, `or` and parentheses.
+    """
+    tokens = _tokenize(expression)
+    pos = [0]
+
+    def peek():
+        return tokens[pos[0]] if pos[0] < len(tokens) else (None, None)
+
+    def take():
+        ret = peek()
+        pos[0] += 1
+        return ret
+
+    def is_keyword(token, keyword):
+        return token[0] == 'word' and token[1].lower() == keyword
+
+    def parse_or():
+        terms = [parse_and()]
+        while is_keyword(peek(), 'or'):
+            take()
+            terms.append(parse_and())
+        return lambda c: any(t(c) for t in terms)
+
+    def parse_and():
+        factors = [parse_factor()]
+        while is_keyword(peek(), 'and'):
+            take()
+            factors.append(parse_factor())
+        return lambda c: all(f(c) for f in factors)
+
+    def parse_factor():
+        kind, word = take()
+        if kind == '(':
+            ret = parse_or()
+            if take()[0] != ')':
+                raise ValueError('missing ) in filter: {}.'.format(
+                    expression))
+            return ret
+        if kind != 'word':
+            raise ValueError('invalid filter: {}.'.format(expression))
+        path = word
+        _, op = take()
+        kind, raw = take()
+        if op is None or kind is None:
+            raise ValueError('invalid filter: {}.'.format(expression))
+        op = op.lower()
+        expected = raw if kind == 'value' else _to_value(raw)
+        return lambda c: _compare(op, get_value(c, path), expected)
+
+    ret = parse_or()
+    if pos[0] != len(tokens):
+        raise ValueError('invalid filter: {}.'.format(expression))
+    return ret
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn,
+                           BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _handle(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        data = self.rfile.read(length) if length else b''
+        status, body, headers = self.server.simulator.dispatch(
+            self.command, self.path, self.headers, data)
+        payload = b'' if body is None else json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        if payload:
+            self.wfile.write(payload)
+
+    do_GET = _handle
+    do_POST = _handle
+    do_DELETE = _handle
+
+    def log_message(self, fmt, *args):
+        log.debug(fmt, *args)
+
+
+class UnityRestSimulator(object):
+    """ in-process http server simulating the unity rest api.
+
+    The resources are seeded from the `rest_data` fixtures or generated.
+    Collections are served page by page with the `fields` and `filter`
+    parameters.  Writes require the csrf token of the session.  Latency
+    and errors could be injected for the performance tests.
+
+    Only http is served.  Use `get_client` to get a client connected to
+    the simulator.
+    """
+
+    CSRF_TOKEN = 'EMC-CSRF-TOKEN'
+    NOT_FOUND = 131149829
+
+    def __init__(self, username='admin', password='Password123!',
+                 latency=0, default_per_page=2000, error_rate=0,
+                 error_status=503, seed=None):
+        """ create the simulator.
+
+        :param latency: seconds to wait before each response.
+        :param default_per_page: page size if `per_page` is not specified.
+        :param error_rate: probability of a request failing with
+            `error_status`.
+        :param seed: seed of the random errors.
+        """
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.default_per_page = default_per_page
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.collections = {}
+        self.types = {}
+        self.csrf_token = self._new_token()
+        self.requests = []
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._faults = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @staticmethod
+    def _new_token():
+        return uuid.uuid4().hex
+
+    def load_fixtures(self, *type_names):
+        """ add the resources in `all.json` of the `rest_data` fixtures.
+
+        The type metadata is taken from `type.json` if available.
+        """
+        for type_name in type_names:
+            folder = os.path.join('unity', 'rest_data', type_name)
+            output = json.loads(read_test_file(folder, 'all.json'))
+            self.add(type_name, [e['content']
+                                 for e in output.get('entries', [])])
+            try:
+                output = json.loads(read_test_file(folder, 'type.json'))
+                self.types[type_name] = output['content']
+            except IOError:
+                pass
+        return self
+
+    def add(self, type_name, contents):
+        collection = self.collections.setdefault(type_name, OrderedDict())
+        with self._lock:
+            for content in contents:
+                collection[content['id']] = content
+        return self
+
+    def generate(self, type_name, count, factory=None, start=0):
+        """ add synthetic resources.
+
+        :param factory: function returning the content of the resource of
+            an index.  Contents like `{'id': 'lun_1', 'name': 'lun 1'}` by
+            default.
+        """
+        if factory is None:
+            def factory(i):
+                return {'id': '{}_{}'.format(type_name, i),
+                        'name': '{} {}'.format(type_name, i)}
+        return self.add(type_name,
+                        (factory(i) for i in range(start, start + count)))
+
+    def get_instance(self, type_name, _id):
+        return self.collections.get(type_name, {}).get(_id)
+
+    def inject(self, status, count=1, method=None, path=None):
+        """ fail the next `count` requests matching the method and the
+        path pattern with the http status.
+        """
+        pattern = None if path is None else re.compile(path)
+        with self._lock:
+            self._faults.append([status, count, method, pattern])
+
+    def expire_session(self):
+        """ change the csrf token, writes with the old one get 401. """
+        self.csrf_token = self._new_token()
+
+    def start(self):
+        self._server = _ThreadingHTTPServer(('127.0.0.1', 0),
+                                            _RequestHandler)
+        self._server.simulator = self
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}'.format(self.port)
+
+    def get_client(self, **kwargs):
+        """ get a unity client connected to the simulator. """
+        client = UnityClient('127.0.0.1', self.username, self.password,
+                             port=self.port, **kwargs)
+        # noinspection PyProtectedMember
+        client._rest.http_client.base_url = self.url
+        return client
+
+    def dispatch(self, method, url, headers, data):
+        """ handle the request.
+
+        :return: tuple of the http status, the body and the headers.
+        """
+        with self._lock:
+            self.requests.append('{} {}'.format(method, url))
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            return self._dispatch(method, url, headers, data)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _dispatch(self, method, url, headers, data):
+        parsed = urlparse(url)
+        path = parsed.path
+        params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+
+        status = self._get_fault(method, path)
+        if status is not None:
+            return self._error(status, 'injected error.')
+        if not self._is_authenticated(headers):
+            return 401, None, {}
+        if method == 'GET':
+            ret_headers = {self.CSRF_TOKEN: self.csrf_token}
+        elif headers.get(self.CSRF_TOKEN) != self.csrf_token:
+            return self._error(401, 'csrf token mismatch.')
+        else:
+            ret_headers = {}
+
+        names = path.strip('/').split('/')
+        body = json.loads(data.decode('utf-8')) if data else {}
+        try:
+            status, ret = self._route(method, names, params, body)
+        except ValueError as e:
+            status, ret, _ = self._error(422, str(e))
+        return status, ret, ret_headers
+
+    def _route(self, method, names, params, body):
+        if len(names) < 3 or names[0] != 'api':
+            return self._error(404, 'invalid url.')[:2]
+        kind, type_name = names[1], names[2]
+        if kind == 'types' and len(names) == 3 and method == 'GET':
+            ret = 200, {'content': self._get_type(type_name)}
+        elif kind == 'types' and names[3:] == ['instances']:
+            if method == 'GET':
+                ret = 200, self._get_page(type_name, params)
+            else:
+                ret = 201, {'content': {'id': self._create(type_name, body)}}
+        elif kind == 'instances' and len(names) >= 4:
+            ret = self._route_instance(method, type_name, names[3],
+                                       names[4:], params, body)
+        else:
+            ret = self._error(404, 'invalid url.')[:2]
+        return ret
+
+    def _route_instance(self, method, type_name, _id, action, params, body):
+        content = self.get_instance(type_name, _id)
+        if content is None:
+            return self._error(404, 'The requested resource does not '
+                                    'exist.', self.NOT_FOUND)[:2]
+        if method == 'GET' and not action:
+            ret = 200, {'content': self._project(
+                content, params.get('fields'))}
+        elif method == 'DELETE' and not action:
+            with self._lock:
+                del self.collections[type_name][_id]
+            ret = 204, None
+        elif method == 'POST' and action == ['action', 'modify']:
+            with self._lock:
+                content.update(body)
+            ret = 204, None
+        elif method == 'POST' and action[:1] == ['action']:
+            # other actions are accepted without any change
+            ret = 200, {}
+        else:
+            ret = self._error(404, 'invalid url.')[:2]
+        return ret
+
+    def _get_fault(self, method, path):
+        with self._lock:
+            for fault in self._faults:
+                status, count, fault_method, pattern = fault
+                if fault_method is not None and fault_method != method:
+                    continue
+                if pattern is not None and not pattern.search(path):
+                    continue
+                fault[1] -= 1
+                if fault[1] <= 0:
+                    self._faults.remove(fault)
+                return status
+            if self.error_rate and self._random.random() < self.error_rate:
+                return self.error_status
+        return None
+
+    def _is_authenticated(self, headers):
+        auth = headers.get('Authorization') or ''
+        if not auth.startswith('Basic '):
+            return False
+        expected = '{}:{}'.format(self.username, self.password)
+        return base64.b64decode(auth[6:]).decode('utf-8') == expected
+
+    @staticmethod
+    def _error(status, message, error_code=0):
+        body = {'error': {'errorCode': error_code,
+                          'httpStatusCode': status,
+                          'messages': [{'en-US': message}]}}
+        return status, body, {}
+
+    def _get_type(self, type_name):
+        ret = self.types.get(type_name)
+        if ret is None:
+            names = OrderedDict()
+            for content in self.collections.get(type_name, {}).values():
+                names.update((key, None) for key in content)
+            ret = {'name': type_name,
+                   'attributes': [{'name': name} for name in names]}
+        return ret
+
+    def _create(self, type_name, body):
+        collection = self.collections.setdefault(type_name, OrderedDict())
+        with self._lock:
+            content = dict(body)
+            content.setdefault('id', '{}_{}'.format(
+                type_name, len(collection) + 1))
+            collection[content['id']] = content
+        return content['id']
+
+    def _get_page(self, type_name, params):
+        contents = list(self.collections.get(type_name, {}).values())
+        if params.get('filter'):
+            matched = compile_filter(params['filter'])
+            contents = [c for c in contents if matched(c)]
+        page = int(params.get('page', 1))
+        per_page = int(params.get('per_page', self.default_per_page))
+        start = (page - 1) * per_page
+        end = min(start + per_page, len(contents))
+        fields = params.get('fields')
+        ret = {'links': [{'rel': 'self', 'href': '&page={}'.format(page)}],
+               'entries': [{'content': self._project(c, fields)}
+                           for c in contents[start:end]]}
+        if end < len(contents):
+            ret['links'].append(
+                {'rel': 'next', 'href': '&page={}'.format(page + 1)})
+        if params.get('with_entrycount', '').lower() == 'true':
+            ret['entryCount'] = len(contents)
+        return ret
+
+    def _project(self, content, fields):
+        if not fields:
+            return content
+        tree = OrderedDict()
+        for field in fields.split(','):
+            node = tree
+            for key in field.split('.'):
+                node = node.setdefault(key, OrderedDict())
+        return self._project_tree(content, tree)
+
+    def _project_tree(self, content, tree):
+        ret = {}
+        for key, children in tree.items():
+            if key not in content:
+                continue
+            value = content[key]
+            if children:
+                value = self._project_nested(key, value, children)
+            ret[key] = value
+        return ret
+
+    def _project_nested(self, key, value, children):
+        if isinstance(value, list):
+            ret = [self._project_nested(key, v, children) for v in value]
+        elif isinstance(value, dict):
+            # resolve the reference like `{'id': 'pool_1'}` by the key
+            referenced = self.get_instance(key, value.get('id'))
+            if referenced is not None:
+                merged = dict(referenced)
+                merged.update(value)
+                value = merged
+            ret = self._project_tree(value, children)
+            if 'id' in value:
+                ret['id'] = value['id']
+        else:
+            ret = value
+        return ret
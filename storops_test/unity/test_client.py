@@ -16,16 +16,23 @@
 
 from __future__ import unicode_literals
 
+import os
+import shutil
+import tempfile
 import unittest
 
+import mock
 from hamcrest import assert_that, equal_to, only_contains, none, any_of, \
-    contains_string, raises
+    contains_string, raises, calling
 
-from storops.unity.client import UnityClient, UnityDoc
+from storops.exception import UnityException
+from storops.unity.client import UnityClient, UnityDoc, UnityMetadataCache
 from storops.unity.enums import RaidTypeEnum, HealthEnum, RaidTypeEnumList, \
     ServiceLevelEnum, ServiceLevelEnumList
 from storops.unity.resource.lun import UnityLun, UnityLunList
-from storops_test.unity.rest_mock import patch_rest, t_rest
+from storops.unity.resource.system import UnitySystem
+from storops_test.unity.rest_mock import patch_rest, t_rest, t_paged_rest, \
+    PagedRestMock
 
 __author__ = 'Cedric Zhuang'
 
@@ -159,6 +166,31 @@ class UnityClientTest(unittest.TestCase):
         ret = UnityClient.dict_to_filter_string({'a': levels})
         assert_that(ret, any_of('a eq 2 or a eq 4', 'a eq 4 or a eq 2'))
 
+    def test_dict_to_filter_string_operator(self):
+        ret = UnityClient.dict_to_filter_string(
+            {'sizeTotal__gt': 1024, 'name__lk': 'lun%'})
+        assert_that(ret, equal_to('name lk "lun%" and sizeTotal gt 1024'))
+
+    def test_dict_to_filter_string_in(self):
+        ret = UnityClient.dict_to_filter_string({'id__in': ['a', 'b']})
+        assert_that(ret, equal_to('id eq "a" or id eq "b"'))
+        ret = UnityClient.dict_to_filter_string({'id__in': 'a'})
+        assert_that(ret, equal_to('id eq "a"'))
+
+    def test_dict_to_filter_string_or_in_parentheses(self):
+        ret = UnityClient.dict_to_filter_string(
+            {'id__in': ['a', 'b'], 'sizeTotal__le': 10, 'type': [1]})
+        assert_that(ret, equal_to('(id eq "a" or id eq "b") and '
+                                  'sizeTotal le 10 and type eq 1'))
+
+    def test_dict_to_filter_string_invalid_operator(self):
+        assert_that(calling(UnityClient.dict_to_filter_string).with_args(
+            {'sizeTotal__abc': 1}), raises(ValueError, 'not a valid filter'))
+
+    def test_dict_to_filter_string_list_with_operator(self):
+        assert_that(calling(UnityClient.dict_to_filter_string).with_args(
+            {'sizeTotal__gt': [1, 2]}), raises(ValueError, 'list'))
+
     def test_dict_to_filter_string_value_none(self):
         ret = UnityClient.dict_to_filter_string({'a': None, 'b': 'c'})
         assert_that(ret, equal_to('b eq "c"'))
@@ -177,6 +209,80 @@ class UnityClientTest(unittest.TestCase):
     def test_system_version(self):
         assert_that(t_rest().system_version, equal_to('4.1.0'))
 
+    def test_get_all_sequential_pages(self):
+        cli, mock_rest = t_paged_rest(25, default_per_page=10)
+        resp = cli.get_all('lun', base_fields=('id', 'name'))
+        assert_that(len(resp.entries), equal_to(25))
+        assert_that(len(mock_rest.page_urls), equal_to(3))
+        assert_that(mock_rest.max_in_flight, equal_to(1))
+
+    def test_get_all_concurrent_pages(self):
+        cli, mock_rest = t_paged_rest(95, latency=0.05)
+        resp = cli.get_all('lun', base_fields=('id', 'name'),
+                           per_page=10, page_workers=4)
+        ids = [c['id'] for c in resp.contents]
+        assert_that(ids, equal_to(['sv_{}'.format(i) for i in range(95)]))
+        assert_that(len(mock_rest.page_urls), equal_to(10))
+        assert_that(mock_rest.page_urls[0], contains_string('with_entrycount'))
+        assert_that(mock_rest.max_in_flight, equal_to(4))
+
+    def test_get_all_concurrent_default_per_page(self):
+        cli, mock_rest = t_paged_rest(25, default_per_page=10)
+        cli.page_workers = 8
+        resp = cli.get_all('lun', base_fields=('id', 'name'))
+        assert_that(len(resp.entries), equal_to(25))
+        assert_that(len(mock_rest.page_urls), equal_to(3))
+
+    def test_get_all_concurrent_single_page(self):
+        cli, mock_rest = t_paged_rest(5)
+        resp = cli.get_all('lun', base_fields=('id', 'name'),
+                           page_workers=4)
+        assert_that(len(resp.entries), equal_to(5))
+        assert_that(len(mock_rest.page_urls), equal_to(1))
+
+    @staticmethod
+    def fail_second_page(mock_rest):
+        get = mock_rest.get
+
+        def failed_get(url, **kwargs):
+            ret = get(url, **kwargs)
+            if 'page=2' in url:
+                ret = {'error': {'errorCode': 100666111,
+                                 'httpStatusCode': 503,
+                                 'messages': [{'en-US': 'busy.'}]}}
+            return ret
+
+        mock_rest.get = failed_get
+
+    def test_get_all_sequential_page_error(self):
+        cli, mock_rest = t_paged_rest(25, default_per_page=10)
+        self.fail_second_page(mock_rest)
+        assert_that(calling(cli.get_all).with_args(
+            'lun', base_fields=('id', 'name')), raises(UnityException))
+
+    def test_get_all_concurrent_page_error(self):
+        cli, mock_rest = t_paged_rest(25, default_per_page=10,
+                                      page_workers=4)
+        self.fail_second_page(mock_rest)
+        assert_that(calling(cli.get_all).with_args(
+            'lun', base_fields=('id', 'name')), raises(UnityException))
+
+    def test_page_options(self):
+        system = UnitySystem('10.244.223.61', 'admin', 'Password123!',
+                             per_page=100, page_workers=4)
+        assert_that(system._cli.per_page, equal_to(100))
+        assert_that(system._cli.page_workers, equal_to(4))
+
+    def test_get_all_not_modify_shared_first_page(self):
+        cli, mock_rest = t_paged_rest(25, default_per_page=10)
+        first_page = mock_rest.get(
+            '/api/types/lun/instances?compact=True&fields=id,name')
+        mock_rest.get = lambda url, **kwargs: (
+            first_page if 'page=' not in url else
+            PagedRestMock.get(mock_rest, url))
+        cli.get_all('lun', base_fields=('id', 'name'))
+        assert_that(len(first_page['entries']), equal_to(10))
+
 
 class UnityDocTest(unittest.TestCase):
     @patch_rest
@@ -230,3 +336,205 @@ class UnityDocTest(unittest.TestCase):
         props = [('a', 'b')]
         assert_that(UnityDoc.format_prop(props, header=('name', 'value')),
                     equal_to(['name  value', 'a     b']))
+
+
+class MetadataRestMock(object):
+    """ array with the type metadata, the metrics and the system info. """
+
+    def __init__(self, serial_number='FNM00150600267', version='4.1.0'):
+        self.serial_number = serial_number
+        self.version = version
+        self.urls = []
+
+    @staticmethod
+    def type_content(name):
+        return {'name': name,
+                'description': 'type {}'.format(name),
+                'attributes': [{'name': 'id'}, {'name': 'name'},
+                               {'name': 'description'}]}
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        path = url.split('?')[0]
+        if path == '/api/instances/system/0':
+            ret = {'content': {'serialNumber': self.serial_number}}
+        elif path == '/api/instances/basicSystemInfo/0':
+            ret = {'content': {'softwareVersion': self.version}}
+        elif path == '/api/types':
+            ret = {'entries': [{'content': self.type_content(name)}
+                               for name in ('lun', 'pool')]}
+        elif path == '/api/types/metric/instances':
+            ret = {'entries': [{'content': {'id': i, 'path': path}}
+                               for i, path in enumerate(
+                                   ('sp.*.cpu.summary.busyTicks',
+                                    'sp.*.storage.lun.*.reads'))]}
+        elif path in ('/api/types/lun', '/api/types/pool'):
+            ret = {'content': self.type_content(path.split('/')[-1])}
+        elif path.startswith('/api/types/'):
+            ret = {'error': {'errorCode': 131149829, 'httpStatusCode': 404}}
+        else:
+            ret = {'entries': [{'content': {'id': 'sv_1', 'name': 'lun_1'}}]}
+        return ret
+
+    @property
+    def type_urls(self):
+        return [url for url in self.urls
+                if url.startswith('/api/types/') and
+                '/instances' not in url]
+
+
+class UnityMetadataCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def get_client(self, mock_rest=None):
+        if mock_rest is None:
+            mock_rest = MetadataRestMock()
+        cache = UnityMetadataCache(mock_rest.serial_number,
+                                   mock_rest.version,
+                                   folder=self.folder).load()
+        client = UnityClient('10.244.223.61', 'admin', 'Password123!',
+                             metadata_cache=cache)
+        client._rest = mock_rest
+        return client
+
+    def test_disabled_by_default(self):
+        client = UnityClient('10.244.223.61', 'admin', 'Password123!')
+        assert_that(client.metadata_cache, none())
+
+    def test_filename_by_serial(self):
+        cache = UnityMetadataCache('FNM0/1', '4.1.0', folder=self.folder)
+        assert_that(cache.filename,
+                    equal_to(os.path.join(self.folder, 'unity_FNM0_1.json')))
+
+    def test_type_cached_across_clients(self):
+        mock_rest = MetadataRestMock()
+        client = self.get_client(mock_rest)
+        assert_that(client.get_fields('lun'),
+                    equal_to(('description', 'id', 'name')))
+        assert_that(len(mock_rest.type_urls), equal_to(1))
+
+        another = MetadataRestMock()
+        client = self.get_client(another)
+        assert_that(client.get_fields('lun'),
+                    equal_to(('description', 'id', 'name')))
+        assert_that(another.type_urls, equal_to([]))
+
+    def test_unsupported_type_cached(self):
+        client = self.get_client()
+        assert_that(client.get_all('abc').contents, equal_to([]))
+        mock_rest = MetadataRestMock()
+        client = self.get_client(mock_rest)
+        assert_that(client.get_all('abc').contents, equal_to([]))
+        assert_that(mock_rest.type_urls, equal_to([]))
+
+    def test_invalidated_when_version_changed(self):
+        self.get_client().get_fields('lun')
+        mock_rest = MetadataRestMock(version='4.2.0')
+        client = self.get_client(mock_rest)
+        client.get_fields('lun')
+        assert_that(len(mock_rest.type_urls), equal_to(1))
+
+    def test_doc_from_cache(self):
+        self.get_client().get_fields('lun')
+        mock_rest = MetadataRestMock()
+        client = self.get_client(mock_rest)
+        assert_that(client.get_doc(UnityLun), contains_string('type lun'))
+        assert_that(mock_rest.type_urls, equal_to([]))
+
+    def test_warm_up(self):
+        mock_rest = MetadataRestMock()
+        client = self.get_client(mock_rest)
+        client.warm_up_metadata()
+        assert_that(mock_rest.type_urls, equal_to([]))
+        assert_that(len(mock_rest.urls), equal_to(2))
+
+        another = MetadataRestMock()
+        client = self.get_client(another)
+        client.get_fields('lun')
+        client.get_fields('pool')
+        assert_that(client.get_metric_paths(),
+                    equal_to(['sp.*.cpu.summary.busyTicks',
+                              'sp.*.storage.lun.*.reads']))
+        assert_that(another.urls, equal_to([]))
+
+    def test_warm_up_types(self):
+        mock_rest = MetadataRestMock()
+        client = self.get_client(mock_rest)
+        cache = client.warm_up_metadata(['lun', 'abc'])
+        assert_that(cache.get_type('pool'), none())
+        assert_that(cache.is_unsupported('abc'), equal_to(True))
+
+    def test_warm_up_not_enabled(self):
+        client = UnityClient('10.244.223.61', 'admin', 'Password123!')
+        assert_that(calling(client.warm_up_metadata),
+                    raises(ValueError, 'not enabled'))
+
+    def test_identity_from_array(self):
+        mock_rest = MetadataRestMock()
+        client = UnityClient('10.244.223.61', 'admin', 'Password123!',
+                             metadata_cache=True)
+        client._rest = mock_rest
+        with mock.patch('storops.unity.client.get_local_folder',
+                        new=lambda: self.folder):
+            cache = client.metadata_cache
+        assert_that(cache.serial_number, equal_to('FNM00150600267'))
+        assert_that(client.system_version, equal_to('4.1.0'))
+        assert_that(len(mock_rest.urls), equal_to(2))
+
+    def test_corrupted_file(self):
+        cache = UnityMetadataCache('FNM0', '4.1.0', folder=self.folder)
+        with open(cache.filename, 'w') as f:
+            f.write('{abc')
+        assert_that(cache.load().get_type('lun'), none())
+
+    def test_identity_retrieved_outside_of_lock(self):
+        from storops.unity import client as client_module
+
+        def get_identity():
+            assert_that(client_module._metadata_cache_lock.locked(),
+                        equal_to(False))
+            return 'FNM00150600267', '4.1.0'
+
+        client = UnityClient('10.244.223.61', 'admin', 'Password123!',
+                             metadata_cache=True)
+        client._get_system_identity = get_identity
+        with mock.patch('storops.unity.client.get_local_folder',
+                        new=lambda: self.folder):
+            cache = client.metadata_cache
+        assert_that(cache.serial_number, equal_to('FNM00150600267'))
+        assert_that(client.metadata_cache, equal_to(cache))
+
+    def test_batch_saved_once(self):
+        client = self.get_client()
+        cache = client.metadata_cache
+        with mock.patch.object(cache, 'save',
+                               wraps=cache.save) as save:
+            with client.metadata_batch():
+                client.get_fields('lun')
+                client.get_fields('pool')
+                client.get_all('abc')
+                assert_that(save.call_count, equal_to(0))
+                assert_that(os.path.exists(cache.filename), equal_to(False))
+            assert_that(save.call_count, equal_to(1))
+        loaded = UnityMetadataCache(cache.serial_number,
+                                    cache.software_version,
+                                    folder=self.folder).load()
+        assert_that(loaded.get_type('pool'), equal_to(cache.get_type('pool')))
+        assert_that(loaded.is_unsupported('abc'), equal_to(True))
+
+    def test_batch_not_saved_without_change(self):
+        client = self.get_client()
+        cache = client.metadata_cache
+        with mock.patch.object(cache, 'save') as save:
+            with client.metadata_batch():
+                pass
+        assert_that(save.call_count, equal_to(0))
+
+    def test_batch_not_enabled(self):
+        client = UnityClient('10.244.223.61', 'admin', 'Password123!')
+        with client.metadata_batch() as cache:
+            assert_that(cache, none())
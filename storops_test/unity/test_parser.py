@@ -15,11 +15,15 @@
 #    under the License.
 from __future__ import unicode_literals
 
+import pickle
 from unittest import TestCase
 
-from hamcrest import assert_that, equal_to, only_contains
+from hamcrest import assert_that, equal_to, only_contains, instance_of
 
-from storops.unity.parser import NestedProperties
+from storops.unity.enums import RaidTypeEnum
+from storops.unity.parser import NestedProperties, get_unity_parser, \
+    LazyParsedRecord
+from storops.unity.resource.pool import UnityPool
 
 
 class NestedPropertiesTest(TestCase):
@@ -55,3 +59,73 @@ class NestedPropertiesTest(TestCase):
         assert_that(sub1sub.get_properties(), only_contains('c', 'd'))
         sub2 = nested_props.get_child_subtree('aaa_bb')
         assert_that(sub2.get_properties(), only_contains('ccc_dd', 'ee_ff'))
+
+
+class UnityRestParserTest(TestCase):
+    def test_parse(self):
+        parser = get_unity_parser('UnityLun')
+        parsed = parser.parse({'id': 'sv_1', 'sizeTotal': 1,
+                               'pool': {'id': 'pool_1'}, 'abc': 'def'})
+        assert_that(sorted(parsed.keys()),
+                    equal_to(['id', 'pool', 'size_total']))
+        assert_that(parsed['pool'], instance_of(UnityPool))
+
+    def test_parse_enum(self):
+        parser = get_unity_parser('UnityPool')
+        parsed = parser.parse({'raidType': 1})
+        assert_that(parsed['raid_type'], equal_to(RaidTypeEnum.RAID5))
+
+    def test_parse_with_properties(self):
+        parser = get_unity_parser('UnityLun')
+        properties = [parser.get_property('name')]
+        parsed = parser._parse_object({'id': 'sv_1', 'name': 'a'},
+                                      properties=properties)
+        assert_that(parsed, equal_to({'name': 'a'}))
+
+    def test_parse_list(self):
+        parser = get_unity_parser('UnityLun')
+        assert_that(parser.parse([{'id': 'sv_1'}]), equal_to({}))
+
+    def test_plan(self):
+        parser = get_unity_parser('UnityLun')
+        key, func = parser.plan['sizeTotal'][0]
+        assert_that(key, equal_to('size_total'))
+
+
+class LazyParsedRecordTest(TestCase):
+    @staticmethod
+    def get_record():
+        parser = get_unity_parser('UnityLun')
+        return parser.parse({'id': 'sv_1', 'sizeTotal': 1,
+                             'pool': {'id': 'pool_1'}, 'abc': 'def'},
+                            lazy=True)
+
+    def test_parse_lazy(self):
+        parsed = self.get_record()
+        assert_that(parsed, instance_of(LazyParsedRecord))
+        assert_that(sorted(parsed.keys()),
+                    equal_to(['id', 'pool', 'size_total']))
+        assert_that(parsed._converted, equal_to({}))
+
+    def test_convert_on_access(self):
+        parsed = self.get_record()
+        pool = parsed['pool']
+        assert_that(pool, instance_of(UnityPool))
+        assert_that(list(parsed._converted.keys()), equal_to(['pool']))
+        assert_that(parsed['pool'] is pool, equal_to(True))
+
+    def test_not_found(self):
+        parsed = self.get_record()
+        assert_that(parsed.get('name'), equal_to(None))
+        assert_that(parsed.get('abc'), equal_to(None))
+
+    def test_same_as_eager(self):
+        parser = get_unity_parser('UnityPool')
+        raw = {'id': 'pool_1', 'raidType': 1, 'name': 'p'}
+        assert_that(parser.parse(raw, lazy=True),
+                    equal_to(parser.parse(raw)))
+
+    def test_pickle(self):
+        parsed = pickle.loads(pickle.dumps(self.get_record()))
+        assert_that(parsed, instance_of(dict))
+        assert_that(parsed['size_total'], equal_to(1))
@@ -47,6 +47,15 @@ class RestResponseTest(TestCase):
         resp = RestResponse(read_json('metric', 'metrics_page_1.json'))
         assert_that(resp.current_page, equal_to(1))
 
+    def test_next_page_with_per_page(self):
+        resp = RestResponse({'links': [
+            {'rel': 'next', 'href': '&per_page=100&page=3'}]})
+        assert_that(resp.next_page, equal_to(3))
+
+    def test_entry_count(self):
+        resp = RestResponse({'entryCount': 30, 'entries': []})
+        assert_that(resp.entry_count, equal_to(30))
+
 
 class UnityErrorTest(TestCase):
     def test_get_properties(self):
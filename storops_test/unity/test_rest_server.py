@@ -0,0 +1,148 @@
+# coding=utf-8
+# Copyright (c) 2015 EMC Corporation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+from __future__ import unicode_literals
+
+from unittest import TestCase
+
+from hamcrest import assert_that, equal_to, calling, raises, has_item, \
+    greater_than, contains_string, only_contains
+
+from storops.unity.resource.lun import UnityLun, UnityLunList
+from storops.unity.resource.system import UnitySystem
+from storops_test.unity.rest_server import UnityRestSimulator, \
+    compile_filter
+
+__author__ = 'Cedric Zhuang'
+
+
+def get_lun(i):
+    return {'id': 'sv_{}'.format(i), 'name': 'lun_{}'.format(i),
+            'sizeTotal': (i + 1) * 1024 ** 3,
+            'isThinEnabled': i % 2 == 0,
+            'pool': {'id': 'pool_{}'.format(i % 2 + 1)}}
+
+
+def get_pool(i):
+    return {'id': 'pool_{}'.format(i), 'name': 'p{}'.format(i)}
+
+
+class CompileFilterTest(TestCase):
+    contents = [get_lun(i) for i in range(6)]
+
+    def check(self, expression, expected):
+        matched = compile_filter(expression)
+        assert_that([c['id'] for c in self.contents if matched(c)],
+                    equal_to(expected))
+
+    def test_eq(self):
+        self.check('name eq "lun_1"', ['sv_1'])
+
+    def test_or(self):
+        self.check('id eq "sv_1" or id eq "sv_3"', ['sv_1', 'sv_3'])
+
+    def test_and_or_with_parentheses(self):
+        self.check('(id eq "sv_1" or id eq "sv_2") and isThinEnabled eq true',
+                   ['sv_2'])
+
+    def test_compare_number(self):
+        self.check('sizeTotal gt 4294967296', ['sv_4', 'sv_5'])
+
+    def test_like(self):
+        self.check('name lk "lun_%"', ['sv_{}'.format(i) for i in range(6)])
+
+    def test_nested(self):
+        self.check('pool.id eq "pool_2"', ['sv_1', 'sv_3', 'sv_5'])
+
+    def test_invalid(self):
+        assert_that(calling(compile_filter).with_args('(name eq "a"'),
+                    raises(ValueError, 'missing'))
+
+
+class UnityRestSimulatorTest(TestCase):
+    def setUp(self):
+        self.simulator = UnityRestSimulator().start()
+        self.simulator.generate('lun', 50, get_lun)
+        self.simulator.generate('pool', 2, get_pool, start=1)
+        self.client = self.simulator.get_client()
+
+    def tearDown(self):
+        self.simulator.stop()
+
+    def get_urls(self, prefix):
+        return [url for url in self.simulator.requests
+                if url.startswith(prefix)]
+
+    def test_load_fixtures(self):
+        self.simulator.load_fixtures('pool')
+        pools = UnitySystem(cli=self.client).get_pool()
+        assert_that(pools.name, has_item('perfpool1130'))
+
+    def test_paging(self):
+        self.client.per_page = 20
+        luns = UnityLunList(cli=self.client)
+        assert_that(len(luns), equal_to(50))
+        assert_that(len(self.get_urls('GET /api/types/lun/instances')),
+                    equal_to(3))
+
+    def test_fields(self):
+        luns = UnityLunList(cli=self.client, fields=['name'])
+        assert_that(luns[3].name, equal_to('lun_3'))
+        url = self.get_urls('GET /api/types/lun/instances')[0]
+        assert_that(url, contains_string('fields=id,name'))
+
+    def test_filter(self):
+        luns = UnityLunList(cli=self.client, name='lun_7')
+        assert_that(luns.id, equal_to(['sv_7']))
+
+    def test_nested_fields(self):
+        lun = UnityLunList(cli=self.client, fields=['name'],
+                           prefetch='pool')[1]
+        assert_that(lun.pool.name, equal_to('p2'))
+
+    def test_not_found(self):
+        assert_that(UnityLun(_id='sv_99', cli=self.client).existed,
+                    equal_to(False))
+
+    def test_modify_with_csrf_token(self):
+        self.client.modify('lun', 'sv_1', description='first')
+        self.simulator.expire_session()
+        self.client.modify('lun', 'sv_1', description='second')
+        assert_that(self.simulator.get_instance('lun', 'sv_1')['description'],
+                    equal_to('second'))
+        # the token is retrieved again after it expired
+        assert_that(len(self.get_urls('GET /api/types/user/instances')),
+                    equal_to(2))
+
+    def test_inject(self):
+        self.simulator.inject(503, count=2, path='/api/instances/lun/')
+        for _ in range(3):
+            resp = self.client.rest_get('/api/instances/lun/sv_1')
+        assert_that(resp.has_error(), equal_to(False))
+        stats = self.client.get_stats()['GET /api/instances/lun/{id}']
+        assert_that(stats['count'], equal_to(3))
+        assert_that(sum(stats['errors'].values()), equal_to(2))
+
+    def test_latency_concurrent_pages(self):
+        self.simulator.latency = 0.05
+        self.client.per_page = 10
+        self.client.page_workers = 4
+        luns = UnityLunList(cli=self.client)
+        assert_that(luns.name, only_contains(contains_string('lun_')))
+        assert_that(self.simulator.max_in_flight, greater_than(1))
+
+    def test_scale(self):
+        self.simulator.generate('lun', 20000, get_lun)
+        assert_that(len(UnityLunList(cli=self.client)), equal_to(20000))
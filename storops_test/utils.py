@@ -169,6 +169,21 @@ class PersistedDict(object):
             os.remove(self.lock_file_name)
 
 
+class FakeClock(object):
+    """ clock and sleep function for the time dependent tests. """
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.waits = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.waits.append(seconds)
+        self.now += seconds
+
+
 class IsNaN(BaseMatcher):
     def __init__(self):
         self.value = None
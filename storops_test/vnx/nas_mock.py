@@ -69,8 +69,29 @@ class MockXmlPost(ConnectorMock):
             node = children[0]
         return os.path.join(*ret)
 
+    post_count = 0
+
     def mock_post(self, body):
-        return self.get_mock_output(body)
+        MockXmlPost.post_count += 1
+        packet = ET.fromstring(body.encode('utf-8'))
+        if len(packet) > 1:
+            ret = self.mock_batch_post(packet)
+        else:
+            ret = self.get_mock_output(body)
+        return ret
+
+    def mock_batch_post(self, packet):
+        # answer each query with its own response file, then merge the
+        # `Response` nodes like the array does.
+        ret = ET.Element('{{{}}}ResponsePacket'.format(XML_NS))
+        for request in packet:
+            single = ET.Element(packet.tag, packet.attrib)
+            single.append(request)
+            body = ET.tostring(single, encoding='utf-8').decode('utf-8')
+            output = ET.fromstring(self.get_mock_output(body).encode('utf-8'))
+            for response in output:
+                ret.append(response)
+        return ET.tostring(ret, encoding='utf-8').decode('utf-8')
 
     @staticmethod
     def delete_ns(tag):
@@ -18,7 +18,8 @@ from __future__ import unicode_literals
 from unittest import TestCase
 
 from hamcrest import assert_that, equal_to, contains_string, has_item, \
-    only_contains, raises, instance_of, none, is_not, not_none, close_to
+    only_contains, raises, instance_of, none, is_not, not_none, close_to, \
+    same_instance
 
 from storops.exception import VNXCompressionError, \
     VNXDedupError, VNXLunNotFoundError, \
@@ -31,6 +32,7 @@ from storops.exception import VNXCompressionError, \
     EnumValueNotFoundError, VNXLunHasSnapMountPointError, \
     VNXLunUsedByFeatureError, VNXNameInUseError
 from storops.lib.common import instance_cache, cache
+from storops.vnx.block_cli import CliClient
 from storops.vnx.enums import VNXProvisionEnum, VNXTieringEnum, \
     VNXCompressionRate, VNXSPEnum, VNXPoolRaidType
 from storops.vnx.resource.lun import VNXLun, VNXLunList
@@ -784,6 +786,40 @@ class VNXLunListTest(TestCase):
         assert_that(self.lun_list, instance_of(VNXLunList))
         assert_that(len(self.lun_list), equal_to(183))
 
+    @patch_cli
+    def test_identity_map(self):
+        cli = CliClient('10.244.212.182', heartbeat_interval=0,
+                        identity_map=True)
+        lun_list = VNXLunList(cli).update()
+        lun = lun_list.get(148)
+        assert_that(VNXLunList(cli).update().get(148), same_instance(lun))
+        assert_that(len(cli.identity_map), equal_to(183))
+
+    @patch_cli
+    def test_without_identity_map(self):
+        lun = self.lun_list.get(148)
+        assert_that(VNXLunList(t_cli()).update().get(148),
+                    is_not(same_instance(lun)))
+
+    @patch_cli
+    def test_watch(self):
+        changes = list(VNXLunList(t_cli()).watch(interval=0, polls=2))
+        assert_that(len(changes), equal_to(183))
+        assert_that(changes[0].event, equal_to('added'))
+        assert_that(changes[0].resource, instance_of(VNXLun))
+        assert_that(changes[0].key, equal_to(changes[0].resource.lun_id))
+
+    @patch_cli
+    def test_compact(self):
+        lun_list = VNXLunList(t_cli())
+        lun_list.compact = True
+        lun_list.update()
+        lun = lun_list.get(148)
+        assert_that(lun.lun_id, equal_to(148))
+        assert_that(lun._promote(), instance_of(VNXLun))
+        assert_that(lun._promote()._cli, same_instance(t_cli()))
+        assert_that(lun.get_index(), equal_to(148))
+
     @patch_cli
     def test_get_lun_by_id_found(self):
         lun = self.lun_list.get(148)
@@ -16,6 +16,7 @@
 from __future__ import unicode_literals
 
 import logging
+import pickle
 from unittest import TestCase
 
 from hamcrest import assert_that, equal_to, none, instance_of, raises,\
@@ -507,6 +508,12 @@ class VNXSystemTest(TestCase):
         vnx.disable_persist_perf_stats()
         assert_that(vnx.is_perf_stats_persisted(), equal_to(False))
 
+    def test_pickle_identity_map(self):
+        vnx = VNXSystem('10.244.211.30', heartbeat_interval=0,
+                        identity_map=True)
+        copied = pickle.loads(pickle.dumps(vnx))
+        assert_that(copied._cli.identity_map, is_not(none()))
+
     @patch_cli
     def test_collect_perf_record(self):
         record = self.vnx.collect_perf_record([VNXLun, VNXDisk])
@@ -17,10 +17,13 @@ from __future__ import unicode_literals
 
 from unittest import TestCase
 
+import mock
 from hamcrest import assert_that, contains_string, equal_to, calling, raises, \
-    greater_than, has_items
+    greater_than, has_items, is_not, none
 
-from storops.exception import VNXSystemDownError, VNXCredentialError
+from storops.exception import VNXSystemDownError, VNXCredentialError, \
+    VNXSPDownError, CircuitBreakerOpenError
+from storops.lib.limiter import ArrayLimiter
 from storops.vnx.block_cli import CliClient
 from storops.vnx.enums import VNXTieringEnum, VNXProvisionEnum, \
     VNXSPEnum, VNXMigrationRate, VNXLunType, VNXRaidType, VNXUserRoleEnum
@@ -881,3 +884,72 @@ class CliClientTest(TestCase):
         csv = lun_list.get_metrics_csv()
         assert_that(csv, contains_string('LUN 4'))
         assert_that(csv, contains_string('LUN 5'))
+
+
+class CliClientCircuitBreakerTest(TestCase):
+    def setUp(self):
+        self.client = CliClient('10.0.0.2', heartbeat_interval=0,
+                                circuit_breaker=True)
+
+    @mock.patch('storops.vnx.block_cli.full_jitter', return_value=0)
+    def test_sp_down_stop_retry(self, _):
+        down = VNXSPDownError('10.0.0.2 is not available.')
+        with mock.patch.object(CliClient, 'do',
+                               side_effect=down) as mocked_do:
+            assert_that(calling(self.client.execute).with_args(
+                ['getagent'], ip='10.0.0.2'),
+                raises(CircuitBreakerOpenError, '10.0.0.2'))
+        breaker = self.client.get_circuit_breaker('10.0.0.2')
+        assert_that(mocked_do.call_count,
+                    equal_to(breaker.failure_threshold))
+
+    @mock.patch('storops.vnx.block_cli.full_jitter', return_value=0)
+    def test_circuit_breaker_disabled_by_default(self, _):
+        client = CliClient('10.0.0.2', heartbeat_interval=0)
+        assert_that(client.get_circuit_breaker('10.0.0.2'), none())
+        down = VNXSPDownError('10.0.0.2 is not available.')
+        # keep retrying after more failures than the breaker threshold
+        with mock.patch.object(CliClient, 'do',
+                               side_effect=[down] * 6 + ['OK']) as mocked_do:
+            assert_that(client.execute(['getagent'], ip='10.0.0.2'),
+                        equal_to('OK'))
+        assert_that(mocked_do.call_count, equal_to(7))
+
+    def test_circuit_breaker_per_ip(self):
+        assert_that(self.client.get_circuit_breaker('10.0.0.2'),
+                    is_not(self.client.get_circuit_breaker('10.0.0.3')))
+
+    @mock.patch('storops.vnx.block_cli.full_jitter', return_value=0)
+    def test_sp_down_retry_stats(self, _):
+        down = VNXSPDownError('10.0.0.2 is not available.')
+        hb = self.client._heart_beat
+        with mock.patch.object(hb, 'get_cmd_prefix', return_value=[]), \
+                mock.patch.object(hb, 'execute_cmd',
+                                  side_effect=[down, down, 'OK']):
+            self.client.execute(['lun', '-list'], ip='10.0.0.2')
+        stats = self.client.get_stats()['lun -list']
+        assert_that(stats['retries'], equal_to(2))
+
+    def test_single_flight_disabled_by_default(self):
+        c = CliClient('10.0.0.2', heartbeat_interval=0)
+        assert_that(c.heartbeat._single_flight, none())
+        c = CliClient('10.0.0.2', heartbeat_interval=0, single_flight=True)
+        assert_that(c.heartbeat._single_flight, is_not(none()))
+
+    def test_limiter_per_sp(self):
+        c = CliClient('10.0.0.2', heartbeat_interval=0, limiter=True)
+        assert_that(c.get_limiter('10.0.0.2'),
+                    equal_to(c.get_limiter('10.0.0.2')))
+        assert_that(c.get_limiter('10.0.0.2'),
+                    is_not(c.get_limiter('10.0.0.3')))
+
+    def test_limiter_shrink_on_sp_down(self):
+        limiter = ArrayLimiter('10.0.0.2', initial_window=8)
+        c = CliClient('10.0.0.2', heartbeat_interval=0, limiter=limiter)
+        hb = c._heart_beat
+        down = VNXSPDownError('10.0.0.2 is not available.')
+        with mock.patch.object(hb, 'get_cmd_prefix', return_value=[]), \
+                mock.patch.object(hb, 'execute_cmd', side_effect=down):
+            assert_that(calling(c.do).with_args('10.0.0.2', ['getagent']),
+                        raises(VNXSPDownError))
+        assert_that(limiter.window.limit, equal_to(4))
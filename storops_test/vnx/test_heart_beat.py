@@ -20,7 +20,7 @@ from unittest import TestCase
 import time
 from hamcrest import assert_that, equal_to, ends_with, contains_string, \
     greater_than, less_than_or_equal_to, greater_than_or_equal_to, raises, \
-    has_items
+    has_items, calling
 
 from storops_test.vnx.cli_mock import patch_cli
 from storops.exception import VNXSystemDownError, VNXCredentialError
@@ -181,6 +181,16 @@ class NodeHeartBeatTest(TestCase):
             pass
         assert_that(hb.is_credential_valid, equal_to(False))
 
+    @patch_cli(output='credential_error.txt')
+    def test_execute_cmd_error_stats(self):
+        hb = self.get_test_hb()
+        assert_that(calling(hb.execute_cmd).with_args(
+            '1.1.1.1', ['naviseccli', '-h', '1.1.1.1', 'getagent']),
+            raises(VNXCredentialError))
+        stats = hb.telemetry.get_stats('getagent')
+        assert_that(stats['count'], equal_to(1))
+        assert_that(stats['errors'], equal_to({'VNXCredentialError': 1}))
+
     @patch_cli(output='ip_error.txt')
     def test_execute_cmd_ip_error(self):
         def f():
@@ -18,10 +18,13 @@ from __future__ import unicode_literals
 import os
 from unittest import TestCase
 
-from hamcrest import assert_that, equal_to
+from hamcrest import assert_that, equal_to, is_not, none, calling, raises
 
+from storops.vnx.resource.fs import VNXFileSystemList
+from storops.vnx.xmlapi import NasXmlBuilder, XML_NS
+from storops.vnx.xmlapi_parser import XMLAPIParser
 from storops_test.utils import read_test_file
-from storops_test.vnx.nas_mock import MockXmlPost
+from storops_test.vnx.nas_mock import MockXmlPost, patch_post, t_nas
 
 __author__ = 'Cedric Zhuang'
 
@@ -42,3 +45,58 @@ class NasMockTest(TestCase):
         expected = os.path.join(self.get_folder(), 'Query',
                                 'FileSystemQueryParams')
         assert_that(folder, equal_to(expected))
+
+
+class NasXmlBatchTest(TestCase):
+    def test_batch_query_package(self):
+        packet = NasXmlBuilder.batch_query_package(
+            [NasXmlBuilder.get_mover(), NasXmlBuilder.get_vdm()])
+        assert_that(len(packet), equal_to(2))
+        assert_that(packet[1].find('Query/VdmQueryParams'),
+                    is_not(none()))
+
+    def test_batch_task_not_allowed(self):
+        assert_that(calling(NasXmlBuilder.batch_query_package).with_args(
+            [NasXmlBuilder.get_vdm(), NasXmlBuilder.delete_vdm(1)]),
+            raises(ValueError, 'only queries'))
+
+    def test_parse_all(self):
+        xml = ('<ResponsePacket xmlns="{}">'
+               '<Response><QueryStatus maxSeverity="ok"/>'
+               '<Vdm vdm="1" name="vdm_1"/><Vdm vdm="2" name="vdm_2"/>'
+               '</Response>'
+               '<Response><QueryStatus maxSeverity="warning"/></Response>'
+               '</ResponsePacket>').format(XML_NS)
+        results = XMLAPIParser().parse_all(xml)
+        assert_that(len(results), equal_to(2))
+        assert_that(len(results[0]['objects']), equal_to(2))
+        assert_that(results[0]['maxSeverity'], equal_to('ok'))
+        assert_that(results[1]['objects'], equal_to([]))
+        assert_that(results[1]['maxSeverity'], equal_to('warning'))
+
+    def test_parse_all_fault(self):
+        xml = ('<ResponsePacket xmlns="{}"><Fault maxSeverity="error"/>'
+               '</ResponsePacket>').format(XML_NS)
+        results = XMLAPIParser().parse_all(xml)
+        assert_that(len(results), equal_to(1))
+        assert_that(results[0]['type'], equal_to('Fault'))
+
+    @patch_post
+    def test_get_nas_inventory_single_post(self):
+        nas = t_nas()
+        count = MockXmlPost.post_count
+        inventory = nas.get_nas_inventory()
+        assert_that(MockXmlPost.post_count - count, equal_to(1))
+        assert_that(list(inventory.keys()),
+                    equal_to(['mover', 'vdm', 'filesystem', 'fs_snap',
+                              'fs_mp', 'mover_host', 'nas_pool']))
+        for name, response in inventory.items():
+            expected = getattr(nas, 'get_{}'.format(name))()
+            assert_that(response.objects, equal_to(expected.objects))
+
+    @patch_post
+    def test_nas_inventory_update_list(self):
+        inventory = t_nas().get_nas_inventory()
+        fs_list = VNXFileSystemList(t_nas())
+        fs_list.update(inventory['filesystem'])
+        assert_that(len(fs_list), equal_to(len(VNXFileSystemList(t_nas()))))
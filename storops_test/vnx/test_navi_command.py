@@ -15,12 +15,16 @@
 #    under the License.
 from __future__ import unicode_literals
 
+import threading
 import time
+from multiprocessing.pool import ThreadPool
 from unittest import TestCase
 
-from hamcrest import equal_to, assert_that, raises, less_than
+import mock
+from hamcrest import equal_to, assert_that, raises, less_than, only_contains
 
 from storops.exception import VNXCredentialError
+from storops.lib.common import daemon
 from storops.vnx.navi_command import NaviCommand
 from storops_test.vnx.cli_mock import patch_cli
 
@@ -89,3 +93,126 @@ class NaviCommandTest(TestCase):
         cmd.execute('python'.split(), timeout=0.1)
         dt = time.time() - start
         assert_that(dt, less_than(1))
+
+    def test_get_verb(self):
+        assert_that(NaviCommand.get_verb(['lun', '-list', '-name', 'l1']),
+                    equal_to('lun -list'))
+        assert_that(NaviCommand.get_verb(['getagent']), equal_to('getagent'))
+        assert_that(NaviCommand.get_verb(
+            ['-h', '10.0.0.1', '-t', '10', 'storagegroup', '-addhlu']),
+            equal_to('storagegroup -addhlu'))
+
+    def test_is_read_only(self):
+        prefix = ['naviseccli', '-h', '10.0.0.1', '-user', 'admin',
+                  '-password', '-set', '-scope', '0']
+        assert_that(NaviCommand.is_read_only(prefix + ['getagent']),
+                    equal_to(True))
+        assert_that(NaviCommand.is_read_only(prefix + ['lun', '-list']),
+                    equal_to(True))
+        assert_that(NaviCommand.is_read_only(
+            ['naviseccli', 'security', '-certificate', '-getLevel']),
+            equal_to(True))
+        assert_that(NaviCommand.is_read_only(
+            prefix + ['lun', '-create', '-capacity', '1']), equal_to(False))
+        assert_that(NaviCommand.is_read_only(
+            ['naviseccli', 'security', '-certificate', '-setLevel', 'low']),
+            equal_to(False))
+        assert_that(NaviCommand.is_read_only(prefix + ['-np', 'bind']),
+                    equal_to(False))
+
+    def test_read_only_commands_share_one_call(self):
+        calls = []
+        start = threading.Event()
+        navi = NaviCommand(single_flight=True)
+
+        def slow_execute(cmd):
+            # heart beat threads of other tests might call it as well
+            if '10.0.0.1' in cmd:
+                calls.append(cmd)
+            time.sleep(0.5)
+            return 'agent'
+
+        def run(_):
+            start.wait()
+            return navi.execute_naviseccli(
+                ['naviseccli', '-h', '10.0.0.1', 'getagent'])
+
+        with mock.patch.object(NaviCommand, 'execute',
+                               side_effect=slow_execute):
+            pool = ThreadPool(50)
+            try:
+                result = pool.map_async(run, range(50))
+                start.set()
+                outputs = result.get(10)
+            finally:
+                pool.close()
+                pool.join()
+        assert_that(len(calls), equal_to(1))
+        assert_that(outputs, only_contains('agent'))
+
+    def test_read_only_commands_not_shared_by_default(self):
+        calls = []
+
+        def execute(cmd):
+            if '10.0.0.1' in cmd:
+                calls.append(cmd)
+            time.sleep(0.1)
+            return 'agent'
+
+        navi = NaviCommand()
+        with mock.patch.object(NaviCommand, 'execute', side_effect=execute):
+            pool = ThreadPool(5)
+            try:
+                pool.map(lambda _: navi.execute_naviseccli(
+                    ['naviseccli', '-h', '10.0.0.1', 'getagent']), range(5))
+            finally:
+                pool.close()
+                pool.join()
+        assert_that(len(calls), equal_to(5))
+
+    def test_read_not_joined_after_modify(self):
+        navi = NaviCommand(single_flight=True)
+        list_cmd = ['naviseccli', '-h', '10.0.0.1', 'lun', '-list']
+        listing = threading.Event()
+        release = threading.Event()
+        outputs = {'luns': 'lun_1'}
+
+        def execute(cmd):
+            if '-create' in cmd:
+                outputs['luns'] = 'lun_1 lun_2'
+                return ''
+            ret = outputs['luns']
+            if not listing.is_set():
+                # the first list is still running after the creation
+                listing.set()
+                release.wait(5)
+            return ret
+
+        with mock.patch.object(NaviCommand, 'execute', side_effect=execute):
+            early = daemon(navi.execute_naviseccli, list_cmd)
+            listing.wait(5)
+            navi.execute_naviseccli(
+                ['naviseccli', '-h', '10.0.0.1', 'lun', '-create'])
+            late = navi.execute_naviseccli(list_cmd)
+            release.set()
+            early.join()
+        assert_that(late, equal_to('lun_1 lun_2'))
+
+    def test_modify_commands_not_shared(self):
+        calls = []
+
+        def execute(cmd):
+            if '10.0.0.1' in cmd:
+                calls.append(cmd)
+            return ''
+
+        with mock.patch.object(NaviCommand, 'execute', side_effect=execute):
+            pool = ThreadPool(5)
+            try:
+                pool.map(lambda _: NaviCommand().execute_naviseccli(
+                    ['naviseccli', '-h', '10.0.0.1', 'lun', '-destroy',
+                     '-l', '1']), range(5))
+            finally:
+                pool.close()
+                pool.join()
+        assert_that(len(calls), equal_to(5))
@@ -102,6 +102,24 @@ class VNXCliParserTest(TestCase):
 
         assert_that(f, raises(AttributeError))
 
+    def test_parse_plan(self):
+        output = """
+                ID: test
+                Prop A (Name): ab (c)
+                Prop C: abc
+                """
+        parser = DemoParser()
+        parsed = parser.parse(output)
+        assert_that(parsed.prop_a, equal_to('ab (c)'))
+        assert_that(parsed.prop_b, none())
+        assert_that(parsed.prop_c, equal_to('abc'))
+        assert_that(len(parser.plan), equal_to(4))
+
+    def test_parse_plan_index_missing(self):
+        parser = DemoParser()
+        assert_that(parser.parse_single('Prop A (Name): ab'),
+                    equal_to({}))
+
     def test_parse_empty_prop(self):
         output = """
                 ID: test